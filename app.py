@@ -1,35 +1,84 @@
 from datetime import datetime
 import streamlit as st
-import torch
-from transformers import pipeline
+from logic.backends import INFERENCE_BACKEND
 from logic.chat_history import ChatHistory
+from logic.context import CONTEXT_TURNS, get_assembler
+from logic.long_summary import summarize_long
+from logic.model_registry import PRELOAD_SESSION, registry as model_registry
+from logic.model_store import memory_report
+from logic.progress import ProgressStore
+from logic.ocr import ocr_settings
+from logic.quiz import generate_quiz
+from logic.resources import resource_fetcher
+from logic import retention
+from logic.retrieval import PassageIndex, answer_from_passages
 from logic.ui_components import (
     chat_message_ui,
     sidebar_chat_history_ui, user_input_ui
 )
-from logic.utils import extract_text_from_image, extract_text_from_pdf
+from logic.extraction_cache import extraction_cache
+from logic.inference_cache import inference_cache
+from logic.jobs import QueueFull, job_manager
+from logic.metrics import ProfileCapture, metrics, span
+from logic.startup import mark, startup_report, warm_up
+from logic.utils import EXTRACTOR_VERSION, extract_text_from_image, iter_pdf_pages
+import io
+import json
+import os
+import time
 import uuid
 
 # --- Init ---
-ChatHistory.init_db()
 st.set_page_config(page_title="EduMate", layout="wide", page_icon="📚")
+rerun_started = time.perf_counter()
+
+# --- Profiling ---
+# A capture is normally stopped at the end of the rerun it started in; one
+# cut short by st.rerun() is stopped here instead, at the next rerun.
+if st.session_state.get("profile_capture"):
+    st.session_state.last_profile = st.session_state.pop("profile_capture").stop()
+if st.session_state.get("profile_next_rerun"):
+    try:
+        st.session_state.profile_capture = ProfileCapture(st.session_state.pop("profile_next_rerun")).start()
+    except RuntimeError as e:
+        st.session_state.profile_error = str(e)
 
 # --- Load Models Once ---
+# Pipelines live in the process-wide registry and are shared by every session;
+# each session only holds a reference, never its own copy of the weights.
+DEVICE = -1
+QA_MODEL = ("question-answering", "deepset/tinyroberta-squad2")
+SUMMARY_MODEL = ("summarization", "t5-small")
+QUIZ_MODEL = ("text2text-generation", "google/flan-t5-small")
+# Cached answers are keyed by backend too; int8/onnx outputs differ slightly.
+QA_CACHE_ID = f"{QA_MODEL[1]}@{INFERENCE_BACKEND}"
+SUMMARY_CACHE_ID = f"{SUMMARY_MODEL[1]}@{INFERENCE_BACKEND}"
+
+
+# Background jobs have no script context, so they pass the session id in.
+def get_qa_pipeline(session_id=None):
+    return model_registry.acquire(session_id or st.session_state.session_id, *QA_MODEL, device=DEVICE)
+
+
+def get_summarizer(session_id=None):
+    return model_registry.acquire(session_id or st.session_state.session_id, *SUMMARY_MODEL, device=DEVICE)
+
+
+def get_quiz_pipeline(session_id=None):
+    return model_registry.acquire(session_id or st.session_state.session_id, *QUIZ_MODEL, device=DEVICE)
+
+
+@span("app.load_models")
 def load_models():
-    if "models_loaded" not in st.session_state:
-        with st.spinner("Preparing your EduMate Assistant..."):
-            device = -1  
-            st.session_state.qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/tinyroberta-squad2",
-                device=device
-            )
-            st.session_state.summarizer = pipeline(
-                "summarization",
-                model="t5-small",
-                device=device
-            )
-        st.session_state.models_loaded = True
+    st.session_state.setdefault("session_id", str(uuid.uuid4()))
+    # Models load on a background thread while the page renders; a job that
+    # needs one first waits on the registry's load lock instead of loading twice.
+    warm_up({
+        QA_MODEL[1]: lambda: model_registry.preload(*QA_MODEL, device=DEVICE),
+        SUMMARY_MODEL[1]: lambda: model_registry.preload(*SUMMARY_MODEL, device=DEVICE),
+    })
+    # Drop models no session has used within the idle timeout.
+    model_registry.evict(unreferenced=False)
 
 # --- Prompt Logic ---
 def get_context_prompt(level):
@@ -39,10 +88,63 @@ def get_context_prompt(level):
         "Tertiary": "Provide detailed academic explanation: "
     }.get(level, "")
 
+# --- Study Plan ---
+def plan_subtopics(study_goal, n):
+    subtopics = []
+    prompt = f"List {n} important subtopics to study for {study_goal}."
+    try:
+        output = get_quiz_pipeline()(prompt, max_length=128, num_return_sequences=1)
+    except (OSError, RuntimeError, ValueError):
+        # The model could not be loaded or failed to generate; a wrong
+        # output shape is a bug and is left to surface.
+        output = None
+    if output:
+        # Either shape, as logic/quiz.py accepts.
+        result = (output[0] if isinstance(output, list) else output)["generated_text"]
+        if '\n' in result:
+            subtopics = [line.strip('- ').strip() for line in result.split('\n') if line.strip()]
+        else:
+            subtopics = [s.strip() for s in result.split(',') if s.strip()]
+    # Fallback to template
+    if len(subtopics) < n:
+        subtopics = [f"Subtopic {i+1} of {study_goal}" for i in range(n)]
+    return subtopics[:n]
+
 # --- Answer ---
-def answer_question(question, context="", level="Basic"):
+@span("app.answer_question")
+def answer_question(question, context="", level="Basic", index=None, session_id=None, check=None):
+    # `check` is a job's Job.check, called between stages so a cancel or
+    # timeout takes effect before the next model call rather than never.
+    task = "qa-passages" if context and index is not None else "qa"
+    return inference_cache.get_or_compute(
+        task, QA_CACHE_ID, level, question, context,
+        lambda: _run_qa(question, context, level, index, session_id, check)
+    )
+
+
+@span("app.answer_followup")
+def answer_followup(question, thread_id, level="Basic", index=None, session_id=None, check=None):
+    # Recent turns of the conversation, then the upload's best passages,
+    # packed into the QA model's window with cached token counts.
+    pipe = get_qa_pipeline(session_id)
+    if check:
+        check()
+    passages = [index.passages[i] for i in index.top_k(question)] if index is not None else []
+    turns = ChatHistory.last_messages(thread_id, CONTEXT_TURNS)
+    context = get_assembler(pipe.tokenizer).assemble(question, turns, passages)
+    return answer_question(question, context=context, level=level, session_id=session_id, check=check)
+
+
+def _run_qa(question, context, level, index, session_id=None, check=None):
     prompt = get_context_prompt(level) + question
-    result = st.session_state.qa_pipeline(
+    # Acquiring the pipeline may wait on a model load.
+    pipe = get_qa_pipeline(session_id)
+    if check:
+        check()
+    if context and index is not None:
+        # Only the best-matching passages of the upload go through the model.
+        return answer_from_passages(pipe, prompt, index, query=question)["answer"]
+    result = pipe(
         question=prompt,
         context=context or prompt,
         max_length=512
@@ -50,35 +152,61 @@ def answer_question(question, context="", level="Basic"):
     return result["answer"]
 
 # --- Summarize ---
-def summarize_text(text, level="Basic"):
-    prompt = f"summarize: {text}"
-    summary = st.session_state.summarizer(
-        prompt,
+@span("app.summarize_text")
+def summarize_text(text, level="Basic", session_id=None, progress=None, on_text=None):
+    return inference_cache.get_or_compute(
+        "summarize", SUMMARY_CACHE_ID, level, "", text,
+        lambda: _run_summary(text, level, session_id, progress, on_text)
+    )
+
+
+def _run_summary(text, level, session_id=None, progress=None, on_text=None):
+    # Long documents are chunked to the model's window and reduced map-reduce style.
+    return summarize_long(
+        get_summarizer(session_id),
+        text,
         max_length=130 if level == "Basic" else 200,
-        min_length=30
+        min_length=30,
+        prefix="summarize: ",
+        progress=progress,
+        on_text=on_text
     )
-    return summary[0]["summary_text"]
 
 
 def cleanup_models():
-    st.session_state.pop("qa_pipeline", None)
-    st.session_state.pop("summarizer", None)
-    torch.cuda.empty_cache()
+    model_registry.release(st.session_state.get("session_id"))
+    # Models preloaded but not yet used by any session are fair game too.
+    model_registry.release(PRELOAD_SESSION)
+    return model_registry.evict()
 
 
 # sourcery skip: 
 for key, val in {
-    "history": ChatHistory.load_history(),
     "active_chat_id": None,
     "education_level": "Basic",
-    "search_query": "",
     "dark_mode": False,
     "main_dark_mode": False,
     "paused": False,
+    "pending_jobs": [],
     "smart_context": ""
 }.items():
     st.session_state.setdefault(key, val)
 
+# --- Chat Deletion ---
+# Before the sidebar renders, so its listing no longer shows the chat.
+if st.session_state.get("delete_chat"):
+    ChatHistory.delete_chat(st.session_state["delete_chat"])
+    st.session_state.active_chat_id = None
+    st.session_state.delete_chat = None
+    st.toast("Chat deleted!", icon="🗑️")
+
+# --- Student Identity ---
+# Progress is stored per ?student=<id>. A new visitor is given one in the
+# URL, so a bookmark brings the same dashboard back in a later session.
+if "student" not in st.query_params:
+    st.query_params["student"] = uuid.uuid4().hex[:12]
+st.session_state.student_id = st.query_params["student"]
+
 load_models()
 
 
@@ -130,7 +258,7 @@ with st.container():
     
 
 # --- Sidebar ---
-with st.sidebar:
+with st.sidebar, span("ui.sidebar"):
     st.title("📚 EduMate")
     st.session_state.education_level = st.selectbox(
         "🎓 Education Level", ["Basic", "SHS", "Tertiary"]
@@ -151,44 +279,51 @@ with st.sidebar:
         submit_plan = st.form_submit_button("Generate Study Plan")
     st.markdown("---")
     # Chat History
-    filtered_history = [
-        c for c in st.session_state.history
-        if st.session_state.search_query.lower() in c["title"].lower()
-    ]
-    sidebar_chat_history_ui(filtered_history)
+    sidebar_chat_history_ui()
     
     if st.button("🧹 Free Up Memory", help="Clear loaded models from memory"):
-        cleanup_models()
-        st.success("Memory freed!")
+        freed = cleanup_models()
+        st.success(f"Memory freed! ({freed / (1024 * 1024):.0f} MB released)")
+    answer_cache = inference_cache.stats()
+    st.caption(
+        f"Answer cache: {answer_cache['hit_rate']:.0%} hit rate, "
+        f"{answer_cache['bytes_saved'] / 1024:.0f} KB served without the model"
+    )
+    with st.expander("🧠 Loaded Models", expanded=False):
+        st.caption(f"Inference backend: {INFERENCE_BACKEND}")
+        worker_memory = memory_report()
+        if worker_memory:
+            st.caption(
+                f"This worker: {worker_memory['unique_mb']:.0f} MB unique, "
+                f"{worker_memory['shared_mb']:.0f} MB shared with other processes"
+            )
+        for info in model_registry.stats():
+            st.caption(
+                f"{info['model']} ({info['task']}): {info['size_mb']} MB, {info['sessions']} session(s), "
+                f"loaded in {info['load_seconds']}s"
+            )
+            if info["batching"]:
+                st.caption(f"↳ {info['batching']['requests']} requests in {info['batching']['batches']} batches")
     st.markdown("---")
 
 
+def set_study_plan(study_goal, plan):
+    st.session_state['study_plan_id'] = ProgressStore.save_plan(st.session_state.student_id, study_goal, plan)
+    st.session_state['study_plan'] = plan
+    st.session_state['study_plan_completed'] = [False] * len(plan)
+
+
 if 'study_plan' not in st.session_state:
-    st.session_state['study_plan'] = None
+    latest = ProgressStore.latest_plan(st.session_state.student_id)
+    st.session_state['study_plan_id'], steps = latest or (None, [])
+    st.session_state['study_plan'] = [step["step"] for step in steps] or None
+    st.session_state['study_plan_completed'] = [step["completed"] for step in steps]
 
 if submit_plan and study_goal:
-    subtopics = []
     n = int(study_duration)
-    
-    if 'quiz_gen_pipeline' in st.session_state and st.session_state.quiz_gen_pipeline:
-        try:
-            prompt = f"List {n} important subtopics to study for {study_goal}."
-            result = st.session_state.quiz_gen_pipeline(prompt, max_length=128, num_return_sequences=1)[0]["generated_text"]
-            
-            if '\n' in result:
-                subtopics = [line.strip('- ').strip() for line in result.split('\n') if line.strip()]
-            else:
-                subtopics = [s.strip() for s in result.split(',') if s.strip()]
-            if len(subtopics) < n:
-                raise Exception("Not enough subtopics")
-        except Exception:
-            subtopics = []
-            
-    # Fallback to template
-    if not subtopics or len(subtopics) < n:
-        subtopics = [f"Subtopic {i+1} of {study_goal}" for i in range(n)]
+    subtopics = plan_subtopics(study_goal, n)
     plan = [f"Week {i+1}: Study {subtopics[i]}" for i in range(n)]
-    st.session_state['study_plan'] = plan
+    set_study_plan(study_goal, plan)
     st.success("Study plan generated!")
 
 
@@ -241,31 +376,13 @@ if st.session_state.get('show_mobile_sidebar_modal') and st.session_state.get('m
                 study_duration = st.number_input("How many weeks do you want to study?", min_value=1, max_value=52, value=1, key="mobile_study_duration")
                 submit_plan = st.form_submit_button("Generate Study Plan (Mobile)")
             if submit_plan and study_goal:
-                subtopics = []
                 n = int(study_duration)
-                if 'quiz_gen_pipeline' in st.session_state and st.session_state.quiz_gen_pipeline:
-                    try:
-                        prompt = f"List {n} important subtopics to study for {study_goal}."
-                        result = st.session_state.quiz_gen_pipeline(prompt, max_length=128, num_return_sequences=1)[0]["generated_text"]
-                        if '\n' in result:
-                            subtopics = [line.strip('- ').strip() for line in result.split('\n') if line.strip()]
-                        else:
-                            subtopics = [s.strip() for s in result.split(',') if s.strip()]
-                        if len(subtopics) < n:
-                            raise Exception("Not enough subtopics")
-                    except Exception:
-                        subtopics = []
-                if not subtopics or len(subtopics) < n:
-                    subtopics = [f"Subtopic {i+1} of {study_goal}" for i in range(n)]
+                subtopics = plan_subtopics(study_goal, n)
                 plan = [f"Week {i+1}: Study {subtopics[i]}" for i in range(n)]
-                st.session_state['study_plan'] = plan
+                set_study_plan(study_goal, plan)
                 st.success("Study plan generated!")
         elif st.session_state['mobile_sidebar_feature'] == "Chat History":
-            filtered_history = [
-                c for c in st.session_state.history
-                if st.session_state.search_query.lower() in c["title"].lower()
-            ]
-            sidebar_chat_history_ui(filtered_history)
+            sidebar_chat_history_ui(key="mobile")
 # --- App Description Card ---
 st.info(
     """
@@ -310,20 +427,12 @@ elif main_feature == "Curated Learning Resources":
     resource_topic = st.text_input("Enter a topic to get articles and videos:", key="resource_topic")
     if st.button("Get Resources", key="get_resources"):
         if resource_topic.strip():
+            # Cached per topic on disk; a cold topic waits a few seconds at most.
             with st.spinner("Fetching resources..."):
-                import requests
-                wiki_results = []
-                try:
-                    resp = requests.get(f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={resource_topic}&format=json")
-                    for item in resp.json()["query"]["search"][:2]:
-                        title = item["title"]
-                        url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-                        wiki_results.append((title, url))
-                except Exception:
-                    wiki_results = []
-                yt_results = [
-                    ("YouTube Search", f"https://www.youtube.com/results?search_query={resource_topic.replace(' ', '+')}")
-                ]
+                resources = resource_fetcher.get(resource_topic)
+            wiki_results = resources["wikipedia"]
+            book_results = resources["wikibooks"]
+            yt_results = resources["youtube"]
             style = st.session_state.get("learning_style", "Reading/Writing (articles/text)")
             if "Visual" in style:
                 st.subheader("YouTube Videos (Visual)")
@@ -341,6 +450,10 @@ elif main_feature == "Curated Learning Resources":
                 st.subheader("Wikipedia Articles (Reading/Writing)")
                 for title, url in wiki_results:
                     st.markdown(f"- [{title}]({url})")
+                if book_results:
+                    st.subheader("Wikibooks")
+                    for title, url in book_results:
+                        st.markdown(f"- [{title}]({url})")
                 st.subheader("YouTube Videos")
                 for title, url in yt_results:
                     st.markdown(f"- [{title}]({url})")
@@ -350,6 +463,10 @@ elif main_feature == "Curated Learning Resources":
                 st.subheader("Wikipedia Articles")
                 for title, url in wiki_results:
                     st.markdown(f"- [{title}]({url})")
+                if book_results:
+                    st.subheader("Wikibooks")
+                    for title, url in book_results:
+                        st.markdown(f"- [{title}]({url})")
                 st.subheader("YouTube Videos")
                 for title, url in yt_results:
                     st.markdown(f"- [{title}]({url})")
@@ -360,60 +477,27 @@ elif main_feature == "Auto-Generated Quiz":
     num_questions = st.selectbox("Number of questions:", [5, 10, 15, 20], index=0, key="num_questions")
     if st.button("Generate Quiz", key="generate_quiz"):
         if quiz_topic.strip():
-            questions = []
-            options = []
-            correct_indices = []
             n = num_questions
-            if st.session_state.quiz_gen_pipeline:
-                try:
-                    prompt = f"Generate {n} multiple choice quiz questions about {quiz_topic} with 1 correct answer and 2 distractors for each. Format: Q: ...\nA) ...\nB) ...\nC) ...\nCorrect: ..."
-                    result = st.session_state.quiz_gen_pipeline(prompt, max_length=512, num_return_sequences=1)[0]["generated_text"]
-                    for block in result.split("Q:"):
-                        lines = [l.strip() for l in block.strip().split("\n") if l.strip()]
-                        if len(lines) >= 4:
-                            q = lines[0]
-                            opts = [l[3:].strip() if l.startswith(('A)', 'B)', 'C)')) else l for l in lines[1:4]]
-                            correct = lines[4].replace("Correct:", "").strip()
-                            if correct in opts:
-                                correct_idx = opts.index(correct)
-                            else:
-                                correct_idx = 0
-                            questions.append(q)
-                            options.append(opts)
-                            correct_indices.append(correct_idx)
-                        if len(questions) >= n:
-                            break
-                    if not questions:
-                        raise Exception("Parsing failed")
-                except Exception:
-                    questions = []
-                    options = []
-                    correct_indices = []
-            if not questions or len(questions) < n:
-                fallback_qs = [
-                    f"What is the main idea of {quiz_topic}?",
-                    f"List one important fact about {quiz_topic}.",
-                    f"Why is {quiz_topic} important?"
-                ]
-                fallback_opts = [
-                    ["It is a key concept.", "It is a random topic.", "It is not important."],
-                    ["It is widely studied.", "It is rarely discussed.", "It is a new discovery."],
-                    ["It has a big impact.", "It is not useful.", "It is only for fun."]
-                ]
-                fallback_correct = [0, 0, 0]
-                while len(questions) < n:
-                    idx = len(questions) % 3
-                    questions.append(fallback_qs[idx])
-                    options.append(fallback_opts[idx])
-                    correct_indices.append(fallback_correct[idx])
+            # Repeat topics come straight from the quiz bank; only the
+            # shortfall is generated, one prompt per question, in batches.
+            with st.spinner("Preparing your quiz..."):
+                quiz_stats = {}
+                quiz = generate_quiz(
+                    get_quiz_pipeline(), quiz_topic.strip(), st.session_state.education_level, n, stats=quiz_stats
+                )
+            questions = [q["question"] for q in quiz]
+            options = [q["options"] for q in quiz]
+            correct_indices = [q["correct"] for q in quiz]
+            st.caption(
+                f"{quiz_stats['from_bank']} from the quiz bank, {quiz_stats['generated']} newly generated"
+            )
+            st.session_state["quiz_topic_taken"] = quiz_topic.strip()
             st.session_state["quiz_questions"] = questions[:n]
             st.session_state["quiz_options"] = options[:n]
             st.session_state["quiz_correct_indices"] = correct_indices[:n]
             st.session_state["quiz_mc_answers"] = [None for _ in questions[:n]]
             st.session_state["quiz_mc_feedback"] = None
             st.session_state["quiz_score"] = None
-            if "quiz_progress" not in st.session_state:
-                st.session_state["quiz_progress"] = {"taken": 0, "correct": 0}
     if "quiz_questions" in st.session_state and "quiz_options" in st.session_state:
         with st.form("quiz_form_mc"):
             user_mc_answers = []
@@ -432,8 +516,14 @@ elif main_feature == "Auto-Generated Quiz":
                     feedback.append(f"❌ Not quite. You chose: {opts[user_idx]}\nCorrect answer: {opts[correct_idx]}")
             st.session_state["quiz_mc_feedback"] = feedback
             st.session_state["quiz_score"] = score
-            st.session_state["quiz_progress"]["taken"] += 1
-            st.session_state["quiz_progress"]["correct"] += score
+            ProgressStore.record_quiz(
+                st.session_state.student_id,
+                st.session_state["quiz_topic_taken"],
+                st.session_state.education_level,
+                st.session_state["quiz_questions"],
+                st.session_state["quiz_mc_answers"],
+                st.session_state["quiz_correct_indices"],
+            )
         if st.session_state.get("quiz_mc_feedback"):
             st.subheader("Quiz Feedback")
             for i, feedback in enumerate(st.session_state["quiz_mc_feedback"]):
@@ -442,21 +532,29 @@ elif main_feature == "Auto-Generated Quiz":
 
 elif main_feature == "Progress Dashboard":
     with st.expander("📊 Progress Dashboard", expanded=True):
-        quizzes_taken = st.session_state.get("quiz_progress", {}).get("taken", 0)
-        total_correct = st.session_state.get("quiz_progress", {}).get("correct", 0)
-        avg_score = (total_correct / quizzes_taken) if quizzes_taken else 0
-        st.markdown(f"**Quizzes Taken:** {quizzes_taken}")
-        st.markdown(f"**Total Correct Answers:** {total_correct}")
-        st.markdown(f"**Average Score:** {avg_score:.2f}")
+        # Counters come from the rollup tables, kept current on every write.
+        progress = ProgressStore.summary(st.session_state.student_id)
+        st.markdown(f"**Quizzes Taken:** {progress['quizzes_taken']}")
+        st.markdown(f"**Total Correct Answers:** {progress['correct']}")
+        st.markdown(f"**Average Score:** {progress['average_score']:.2f}")
+        st.markdown(f"**Accuracy:** {progress['accuracy']:.0%}")
+        st.markdown(f"**Daily Streak:** {progress['current_streak']} (best {progress['best_streak']})")
+        topics = ProgressStore.topic_accuracy(st.session_state.student_id)
+        if topics:
+            st.markdown("**Accuracy by Topic:**")
+            for topic in topics:
+                st.markdown(f"- {topic['topic']}: {topic['accuracy']:.0%} over {topic['attempts']} quiz(zes)")
         if st.session_state.get('study_plan'):
             st.markdown("---")
             st.markdown("**Study Plan Steps:**")
-            if 'study_plan_completed' not in st.session_state:
-                st.session_state['study_plan_completed'] = [False] * len(st.session_state['study_plan'])
             for i, step in enumerate(st.session_state['study_plan']):
-                st.session_state['study_plan_completed'][i] = st.checkbox(step, value=st.session_state['study_plan_completed'][i], key=f'study_step_{i}')
+                done = st.checkbox(step, value=st.session_state['study_plan_completed'][i], key=f'study_step_{i}')
+                if done != st.session_state['study_plan_completed'][i]:
+                    ProgressStore.set_step(st.session_state['study_plan_id'], i, done)
+                    st.session_state['study_plan_completed'][i] = done
             completed = sum(st.session_state['study_plan_completed'])
             st.markdown(f"**Completed:** {completed} / {len(st.session_state['study_plan'])}")
+        st.caption(f"Progress is saved to this page's link (student {st.session_state.student_id}).")
 
 # --- Chat Options Modal ---
 if st.session_state.get("show_menu_for"):
@@ -465,37 +563,136 @@ if st.session_state.get("show_menu_for"):
 
 
 st.header("🤖 EduMate Assistant")
+mark("shell_rendered")
+
+# --- Background Jobs ---
+# Model work runs on the shared job pool; the script only submits and polls.
+def submit_chat_job(title, question, compute, done_message, skip_duplicates=False, thread_id=None):
+    if st.session_state.paused:
+        st.info("EduMate is paused. Press ▶️ to resume.")
+        return
+    chat = {"id": thread_id or str(uuid.uuid4()), "title": title, "question": question, "pinned": False}
+
+    def save_chat(job, answer):
+        if thread_id:
+            # A follow-up is appended to its conversation, not a new chat.
+            ChatHistory.append_messages(thread_id, [("user", question), ("assistant", answer)])
+            return
+        if skip_duplicates and ChatHistory.chat_exists(question, answer):
+            job.meta["duplicate"] = True
+            return
+        ChatHistory.save_chat({**chat, "answer": answer})
+
+    try:
+        job_id = job_manager.submit(
+            compute,
+            session_id=st.session_state.session_id,
+            on_done=save_chat,
+            chat_id=chat["id"],
+            question=question,
+            done_message=done_message,
+        )
+    except QueueFull:
+        st.warning("EduMate is busy right now. Please try again in a moment.")
+        return
+    st.session_state.pending_jobs.append(job_id)
+
+
+# Short enough that streamed tokens show up well under a second after decode.
+JOB_POLL_SECONDS = 0.25
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_status_ui():
+    finished = False
+    for job_id in list(st.session_state.pending_jobs):
+        job = job_manager.get(job_id)
+        if job is None:
+            st.session_state.pending_jobs.remove(job_id)
+            continue
+        if not job.finished and job.partial:
+            chat_message_ui({"id": job_id, "message": job.partial, "timestamp": "typing..."}, is_user=False, streaming=True)
+            continue
+        if not job.finished:
+            st.progress(job.progress or 0.0, text=f"⏳ {job.message or 'Working on it...'}")
+            continue
+        st.session_state.pending_jobs.remove(job_id)
+        finished = True
+        if job.status == "done" and job.meta.get("duplicate"):
+            st.toast("Summary already exists!", icon="ℹ️")
+        elif job.status == "done":
+            st.session_state.active_chat_id = job.meta["chat_id"]
+            st.toast(job.meta["done_message"], icon="✅")
+        elif job.status == "cancelled":
+            st.toast("Request cancelled.", icon="⏸️")
+        else:
+            st.session_state.job_error = job.error
+        if job.status != "done" and job.meta["question"] == st.session_state.get("last_user_input"):
+            # Let the student send the same question again.
+            st.session_state.reset_user_input = True
+    if finished:
+        st.rerun()
+
 
 # --- Upload & Summarize ---
-uploaded_file = st.file_uploader("📎 Upload PDF/Image", type=["pdf", "jpg", "png", "jpeg"])
-if uploaded_file:
-    text = extract_text_from_pdf(uploaded_file) if uploaded_file.type == "application/pdf" else extract_text_from_image(uploaded_file)
+@span("extract.pdf_preview")
+def extract_pdf_with_preview(data):
+    # Pages stream in from the worker pool; show the opening page as soon as it lands.
+    pages = {}
+    status = st.empty()
+    preview = st.empty()
+    for page_no, page_text in iter_pdf_pages(data):
+        pages[page_no] = page_text
+        status.caption(f"📄 Extracted {len(pages)} page(s)...")
+        if page_no == min(pages) and page_text:
+            preview.text(page_text[:1000])
+    status.empty()
+    preview.empty()
+    return "\n".join(pages[n] for n in sorted(pages) if pages[n]).strip()
+
+
+def extract_upload(uploaded_file):
+    # Reruns and re-uploads of the same bytes cost a hash, not a re-extraction.
+    data = uploaded_file.getvalue()
+    if uploaded_file.type == "application/pdf":
+        return extraction_cache.get_or_extract(data, "pdf", EXTRACTOR_VERSION, lambda: extract_pdf_with_preview(data))
+    return extraction_cache.get_or_extract(
+        data, "image", EXTRACTOR_VERSION, lambda: extract_text_from_image(io.BytesIO(data)), settings=ocr_settings()
+    )
+
+
+uploaded_files = st.file_uploader(
+    "📎 Upload PDF/Image", type=["pdf", "jpg", "png", "jpeg", "tif", "tiff"], accept_multiple_files=True
+)
+if uploaded_files:
+    text = "\n\n".join(extract_upload(f) for f in uploaded_files).strip()
+    cache_stats = extraction_cache.stats()
+    st.caption(
+        f"Extraction cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+        f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)"
+    )
     st.session_state.smart_context = text  
+    if st.session_state.get("passage_index_key") != hash(text):
+        st.session_state.passage_index = PassageIndex(text)
+        st.session_state.passage_index_key = hash(text)
 
     if st.button("📝 Summarize"):
-        with st.spinner("🔍 Analyzing document..."):
-            summary = summarize_text(text, st.session_state.education_level)
-            # Prevent duplicate summary chats
-            exists = any(
-                c["question"] == f"Summarize this document ({st.session_state.education_level})" and c["answer"] == summary
-                for c in st.session_state.history
+        level = st.session_state.education_level
+        session_id = st.session_state.session_id
+
+        # Script globals keep changing after submit; bind what the job needs.
+        def run_summary(job, text=text, level=level, session_id=session_id):
+            job.report(message="🔍 Analyzing document...")
+            return summarize_text(
+                text, level, session_id=session_id,
+                progress=lambda chunks: job.report(message=f"🔍 Summarized {chunks} sections..."),
+                on_text=job.stream
             )
-            if not exists:
-                chat = {
-                    "id": str(uuid.uuid4()),
-                    "title": f"Summary ({st.session_state.education_level})",
-                    "question": f"Summarize this document ({st.session_state.education_level})",
-                    "answer": summary,
-                    "pinned": False
-                }
-                ChatHistory.save_chat(chat)
-                chat_id = chat["id"]
-                st.session_state.history = ChatHistory.load_history()
-                st.session_state.active_chat_id = chat_id
-                st.toast("Summary generated!", icon="✅")
-                st.rerun()
-            else:
-                st.toast("Summary already exists!", icon="ℹ️")
+
+        submit_chat_job(
+            f"Summary ({level})", f"Summarize this document ({level})",
+            run_summary, "Summary generated!", skip_duplicates=True
+        )
 
 # --- Smart Suggestions ---
 if st.session_state.smart_context and not st.session_state.get("active_chat_id"):
@@ -508,56 +705,102 @@ if st.session_state.smart_context and not st.session_state.get("active_chat_id")
     ]
     for s in suggestions:
         if st.button(s, key=f"suggestion-{s}"):
-            with st.spinner("💡 Thinking..."):
-                response = answer_question(
-                    s,
-                    context=st.session_state.smart_context,
-                    level=st.session_state.education_level
-                )
-                chat = {
-                    "id": str(uuid.uuid4()),
-                    "title": s,
-                    "question": s,
-                    "answer": response,
-                    "pinned": False
-                }
-                ChatHistory.save_chat(chat)
-                chat_id = chat["id"]
-                st.session_state.history = ChatHistory.load_history()
-                st.session_state.active_chat_id = chat_id
-                st.toast("Suggestion answered!", icon="💡")
-                st.rerun()
+            context = st.session_state.smart_context
+            level = st.session_state.education_level
+            index = st.session_state.get("passage_index")
+            session_id = st.session_state.session_id
+            submit_chat_job(
+                s, s,
+                lambda job, question=s, context=context, level=level, index=index, session_id=session_id:
+                    answer_question(question, context=context, level=level, index=index, session_id=session_id, check=job.check),
+                "Suggestion answered!"
+            )
 
 # --- Chat Display ---
 if st.session_state.active_chat_id:
-    chat = ChatHistory.get_chat(st.session_state.active_chat_id)
-    if chat:
-        chat_message_ui({"id": chat["id"], "message": chat["question"], "timestamp": chat["created_at"]}, is_user=True)
-        chat_message_ui({"id": chat["id"], "message": chat["answer"], "timestamp": chat["updated_at"]}, is_user=False)
+    # While a chat is open, questions continue it; this starts a fresh one.
+    if st.button("➕ New chat", key="new_chat", help="Start a new conversation"):
+        st.session_state.active_chat_id = None
+        st.rerun()
+    turns = ChatHistory.last_messages(st.session_state.active_chat_id)
+    if turns and turns[0]["seq"] > 1:
+        st.caption("Showing the latest messages of this conversation.")
+    for turn in turns:
+        turn_id = f"{turn['thread_id']}-{turn['seq']}" if turn["seq"] else turn["thread_id"]
+        chat_message_ui(
+            {"id": turn_id, "message": turn["content"], "timestamp": turn["created_at"]}, is_user=turn["role"] == "user"
+        )
 
 # --- Chat Input ---
+if st.session_state.pop("reset_user_input", False):
+    # Before the text box exists in this run, so its value can still be set.
+    st.session_state.user_input = ""
+    st.session_state.pop("last_user_input", None)
 user_input = user_input_ui()
-if user_input:
-    with st.spinner("💭 Processing..."):
-        response = answer_question(user_input, level=st.session_state.education_level)
-        chat = {
-            "id": str(uuid.uuid4()),
-            "title": f"{st.session_state.education_level} - {user_input[:25]}{'...' if len(user_input) > 25 else ''}",
-            "question": user_input,
-            "answer": response,
-            "pinned": False
-        }
-        ChatHistory.save_chat(chat)
-        chat_id = chat["id"]
-        st.session_state.history = ChatHistory.load_history()
-        st.session_state.active_chat_id = chat_id
-        st.toast("Response saved!", icon="💾")
-        st.rerun()
+if st.session_state.paused:
+    job_manager.cancel_session(st.session_state.session_id)
+# The text box keeps its value across reruns; only submit a new question once.
+if user_input and user_input != st.session_state.get("last_user_input"):
+    st.session_state.last_user_input = user_input
+    level = st.session_state.education_level
+    session_id = st.session_state.session_id
+    thread_id = st.session_state.active_chat_id
+    if thread_id:
+        index = st.session_state.get("passage_index")
+        submit_chat_job(
+            None, user_input,
+            lambda job, question=user_input, thread_id=thread_id, level=level, index=index, session_id=session_id:
+                answer_followup(question, thread_id, level=level, index=index, session_id=session_id, check=job.check),
+            "Response saved!", thread_id=thread_id
+        )
+    else:
+        submit_chat_job(
+            f"{level} - {user_input[:25]}{'...' if len(user_input) > 25 else ''}", user_input,
+            lambda job, question=user_input, level=level, session_id=session_id:
+                answer_question(question, level=level, session_id=session_id, check=job.check),
+            "Response saved!"
+        )
 
-# --- Chat Deletion ---
-if st.session_state.get("delete_chat"):
-    ChatHistory.delete_chat(st.session_state["delete_chat"])
-    st.session_state.history = ChatHistory.load_history()
-    st.session_state.active_chat_id = None
-    st.session_state.delete_chat = None
-    st.toast("Chat deleted!", icon="🗑️")
+if st.session_state.pending_jobs:
+    job_status_ui()
+if st.session_state.get("job_error"):
+    st.error(f"Something went wrong: {st.session_state.pop('job_error')}")
+
+# --- Admin Metrics Panel ---
+ADMIN_PANEL = os.environ.get("EDUMATE_ADMIN_PANEL", "0") == "1"
+
+
+def admin_panel_ui():
+    with st.sidebar.expander("📈 Performance Metrics", expanded=False):
+        snapshot = metrics.snapshot()
+        if snapshot:
+            st.dataframe([{"span": name, **stats} for name, stats in snapshot.items()], hide_index=True)
+        else:
+            st.caption("No timings recorded yet.")
+        st.download_button("Prometheus", metrics.to_prometheus(), file_name="edumate.prom", mime="text/plain")
+        st.download_button("JSON", json.dumps(snapshot, indent=2), file_name="edumate.json", mime="application/json")
+        kind = st.selectbox("Profiler", ["cprofile", "pyinstrument"], key="profiler_kind")
+        if st.button("⏱️ Profile next rerun"):
+            st.session_state.profile_next_rerun = kind
+            st.rerun()
+        if st.session_state.get("last_profile"):
+            st.caption(f"Last profile: {st.session_state.last_profile}")
+        if st.session_state.get("profile_error"):
+            st.warning(st.session_state.pop("profile_error"))
+        st.caption("Startup")
+        st.json(startup_report(), expanded=False)
+        st.caption("Progress (all students)")
+        st.json(ProgressStore.overview(), expanded=False)
+        st.caption("History database")
+        st.json(retention.last_report or retention.database_size(), expanded=False)
+
+
+if ADMIN_PANEL:
+    admin_panel_ui()
+
+metrics.observe("app.rerun", (time.perf_counter() - rerun_started) * 1000)
+if st.session_state.get("profile_capture"):
+    st.session_state.last_profile = st.session_state.pop("profile_capture").stop()
+metrics.maybe_export()
+# Archives old chats and compacts the database on a background thread when due.
+retention.maybe_run()
@@ -0,0 +1,117 @@
+"""OCR throughput and accuracy: raw full-resolution tesseract vs logic.ocr.
+
+    python -m benchmarks.ocr_benchmark --generate 6
+    python -m benchmarks.ocr_benchmark --fixtures path/to/fixtures --output ocr.json
+
+A fixture set is a directory of images, each with a sibling `<name>.txt`
+holding the ground-truth text.
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import time
+
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+
+from logic.ocr import ocr_image, ocr_settings
+
+FIXTURE_DIR = "benchmarks/fixtures/ocr"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+WORDS = (
+    "photosynthesis energy cell membrane algebra equation triangle history empire "
+    "river climate student teacher lesson chapter summary example theory motion "
+    "force velocity atom molecule reaction grammar sentence poem author"
+).split()
+
+
+def generate_fixtures(directory: str, count: int, seed: int = 0):
+    # Tall, high-resolution pages approximate phone photos of handouts.
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    font = ImageFont.load_default(size=40)
+    for n in range(count):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(60 + 20 * n)]
+        image = Image.new("RGB", (2480, 80 * len(lines) + 200), "white")
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(lines):
+            draw.text((120, 100 + 80 * i), line, fill="black", font=font)
+        name = os.path.join(directory, f"page_{n:02d}")
+        image.save(f"{name}.png", dpi=(600, 600) if n % 2 else (72, 72))
+        with open(f"{name}.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def load_fixtures(directory: str):
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(name)
+        truth_path = os.path.join(directory, f"{base}.txt")
+        if ext.lower() in IMAGE_EXTENSIONS and os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as f:
+                fixtures.append((os.path.join(directory, name), f.read()))
+    return fixtures
+
+
+def edit_distance(a: str, b: str) -> int:
+    # difflib's opcodes give a close, much cheaper stand-in for Levenshtein
+    # distance on page-sized strings.
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+
+
+def char_accuracy(predicted: str, truth: str) -> float:
+    predicted = " ".join(predicted.split())
+    truth = " ".join(truth.split())
+    if not truth:
+        return 1.0 if not predicted else 0.0
+    return max(0.0, 1.0 - edit_distance(predicted, truth) / len(truth))
+
+
+def run_mode(name: str, extract, fixtures):
+    started = time.perf_counter()
+    outputs = [extract(path) for path, _ in fixtures]
+    elapsed = time.perf_counter() - started
+    chars = sum(len(text) for text in outputs)
+    accuracy = [char_accuracy(text, truth) for text, (_, truth) in zip(outputs, fixtures)]
+    return {
+        "mode": name,
+        "images": len(fixtures),
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(len(fixtures) / elapsed, 3) if elapsed else 0.0,
+        "chars_per_sec": round(chars / elapsed, 1) if elapsed else 0.0,
+        "char_accuracy": round(sum(accuracy) / len(accuracy), 4) if accuracy else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--generate", type=int, default=0, help="write N synthetic fixtures first")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate_fixtures(args.fixtures, args.generate)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error(f"no fixtures found in {args.fixtures}")
+
+    report = {
+        "settings": ocr_settings(),
+        "results": [
+            run_mode("baseline", lambda path: pytesseract.image_to_string(Image.open(path)), fixtures),
+            run_mode("engine", ocr_image, fixtures),
+        ],
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Offline stand-ins for the HF pipelines, for benchmarking the code around them.
+
+They implement just enough of the pipeline and tokenizer interfaces that
+logic.long_summary and logic.retrieval use, with cheap deterministic
+outputs, so a run measures chunking, ranking and batching rather than
+network access or model weights.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+class StubTokenizer:
+    model_max_length = 512
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.words: List[str] = []
+
+    def _encode(self, text: str) -> List[int]:
+        ids = []
+        for word in text.split():
+            if word not in self.ids:
+                self.ids[word] = len(self.words)
+                self.words.append(word)
+            ids.append(self.ids[word])
+        return ids
+
+    def __call__(self, text, add_special_tokens: bool = True, **kwargs):
+        if isinstance(text, list):
+            return {"input_ids": [self._encode(t) for t in text]}
+        return {"input_ids": self._encode(text)}
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True) -> str:
+        return " ".join(self.words[i] for i in ids)
+
+
+class StubSummarizer:
+    """Keeps the first max_length // 2 words of each input."""
+
+    task = "summarization"
+
+    def __init__(self):
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, inputs, max_length: int = 130, **kwargs):
+        texts = inputs if isinstance(inputs, list) else [inputs]
+        return [{"summary_text": " ".join(text.split()[: max(1, max_length // 2)])} for text in texts]
+
+
+class StubQuestionAnswerer:
+    """Answers with the first context word that also appears in the question."""
+
+    task = "question-answering"
+
+    def __init__(self):
+        self.tokenizer = StubTokenizer()
+
+    def _answer(self, question: str, context: str) -> Dict:
+        asked = set(re.findall(r"\w+", question.lower()))
+        for match in re.finditer(r"\w+", context):
+            if match.group().lower() in asked:
+                return {"answer": match.group(), "score": 0.9, "start": match.start(), "end": match.end()}
+        return {"answer": "", "score": 0.0, "start": 0, "end": 0}
+
+    def __call__(self, inputs=None, question: str = "", context: str = "", **kwargs):
+        if inputs is None:
+            return self._answer(question, context)
+        if isinstance(inputs, dict):
+            return self._answer(inputs["question"], inputs["context"])
+        return [self._answer(item["question"], item["context"]) for item in inputs]
+
+
+class StubMediaWiki:
+    """Local stand-in for the MediaWiki search API, with a configurable delay.
+
+    Point a ResourceFetcher at stub.api_url to exercise pooling, timeouts
+    and the cache without network access.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                topic = parse_qs(urlparse(self.path).query).get("srsearch", [""])[0]
+                body = json.dumps({"query": {"search": [{"title": f"{topic} {n}"} for n in range(1, 4)]}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.api_url = f"http://127.0.0.1:{self.server.server_address[1]}/w/api.php"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,468 @@
+"""Offline benchmark suite: extraction, inference and chat history storage.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --only history --rows 1000,1000000
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+
+Fixtures (PDFs, page images, chat databases of 1k to 1M rows) are generated
+under benchmarks/fixtures on first use and reused afterwards. Inference
+runs against stub pipelines unless --models hf is given, in which case the
+named models are loaded through logic.backends (point HF_HUB_OFFLINE=1 at
+a warm cache to stay offline; tiny test models work too). The app's
+summarize_text and answer_question are thin cache wrappers around
+summarize_long and answer_from_passages, which is what is timed here.
+
+Each scenario reports p50/p95 latency, throughput and peak RSS. With
+--baseline, the run exits non-zero when any scenario's p95 regresses by
+more than --threshold.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.stubs import StubMediaWiki, StubQuestionAnswerer, StubSummarizer
+
+FIXTURE_DIR = "benchmarks/fixtures"
+DEFAULT_ROWS = "1000,10000,100000,1000000"
+WORDS = (
+    "photosynthesis energy cell membrane algebra equation triangle history empire "
+    "river climate student teacher lesson chapter summary example theory motion "
+    "force velocity atom molecule reaction grammar sentence poem author kumasi "
+    "volta harmattan cocoa market fraction decimal percentage ratio gravity"
+).split()
+
+
+class Skip(Exception):
+    pass
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def document(rng: random.Random, paragraphs: int, sentences: int = 6) -> str:
+    return "\n\n".join(
+        " ".join(words(rng, rng.randint(8, 16)).capitalize() + "." for _ in range(sentences))
+        for _ in range(paragraphs)
+    )
+
+
+# --- Fixtures ---
+def make_pdf(pages: List[str]) -> bytes:
+    # Minimal hand-written PDF: one Helvetica text stream per page.
+    count = len(pages)
+    font_id = 3 + 2 * count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(count))}] /Count {count} >>",
+    ]
+    for i, page in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        stream = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({line}) '" for line in page.split("\n")) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def pdf_fixture(pages: int) -> str:
+    path = os.path.join(FIXTURE_DIR, f"document_{pages}p.pdf")
+    if not os.path.exists(path):
+        rng = random.Random(pages)
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(make_pdf(["\n".join(words(rng, 12) for _ in range(55)) for _ in range(pages)]))
+    return path
+
+
+def image_fixture() -> str:
+    from PIL import Image, ImageDraw, ImageFont
+
+    path = os.path.join(FIXTURE_DIR, "page.png")
+    if not os.path.exists(path):
+        rng = random.Random(0)
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        lines = [words(rng, 6) for _ in range(60)]
+        image = Image.new("RGB", (2480, 80 * len(lines) + 200), "white")
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=40)
+        for i, line in enumerate(lines):
+            draw.text((120, 100 + 80 * i), line, fill="black", font=font)
+        image.save(path, dpi=(300, 300))
+    return path
+
+
+def history_fixture(rows: int) -> str:
+    from logic import chat_history
+    from logic.chat_history import ChatHistory
+
+    path = os.path.join(FIXTURE_DIR, f"history_{rows}.db")
+    chat_history.DB_PATH = path
+    if os.path.exists(path):
+        return path
+    # Write to a temporary name so an interrupted build is never reused.
+    chat_history.DB_PATH = building = path + ".building"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+    rng = random.Random(rows)
+    start = datetime(2024, 1, 1)
+    for first in range(0, rows, 10_000):
+        ChatHistory.save_chats([
+            {
+                "id": f"chat-{n:07d}",
+                "title": words(rng, 4).title(),
+                "question": words(rng, 12) + "?",
+                "answer": words(rng, 80),
+                "pinned": n % 500 == 0,
+                "created_at": (start + timedelta(seconds=30 * n)).isoformat(),
+            }
+            for n in range(first, min(first + 10_000, rows))
+        ])
+    with ChatHistory.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    for conn in chat_history._pools.pop(building).queue:
+        conn.close()
+    chat_history._initialized_paths.discard(building)
+    os.replace(building, path)
+    chat_history.DB_PATH = path
+    return path
+
+
+# --- Measurement ---
+def _reset_peak_rss():
+    # Linux lets a process reset its own high-water mark (VmHWM).
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is KiB on Linux, bytes on macOS; either way a process-wide peak.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    # Nearest-rank percentile.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def measure(fn: Callable[[], object], repeats: int, items: int = 1, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        fn()
+    _reset_peak_rss()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {
+        "repeats": repeats,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "throughput_per_sec": round(repeats * items / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+# --- Scenarios ---
+# Each builder returns (fn, repeats, items per call[, teardown]) or raises Skip.
+def load_models(mode: str, summary_model: str, qa_model: str):
+    if mode == "stub":
+        return StubSummarizer(), StubQuestionAnswerer()
+    from logic.backends import build_pipeline
+
+    return build_pipeline("summarization", summary_model), build_pipeline("question-answering", qa_model)
+
+
+def pdf_scenario(pages: int):
+    def build(_models):
+        try:
+            from logic.utils import extract_text_from_pdf
+        except ImportError as e:
+            raise Skip(str(e))
+        with open(pdf_fixture(pages), "rb") as f:
+            data = f.read()
+        return (lambda: extract_text_from_pdf(data)), 2 if pages > 50 else 5, pages
+    return build
+
+
+def ocr_scenario(_models):
+    try:
+        import pytesseract
+        from logic.ocr import ocr_image
+        pytesseract.get_tesseract_version()
+    except (ImportError, OSError) as e:
+        raise Skip(str(e))
+    except Exception as e:  # TesseractNotFoundError
+        raise Skip(f"tesseract unavailable: {e}")
+    path = image_fixture()
+    return (lambda: ocr_image(path)), 3, 1
+
+
+def summarize_scenario(paragraphs: int):
+    def build(models):
+        from logic.long_summary import summarize_long
+
+        text = document(random.Random(paragraphs), paragraphs)
+        summarizer = models[0]
+        return (lambda: summarize_long(summarizer, text, prefix="summarize: ")), 5, 1
+    return build
+
+
+def index_scenario(_models):
+    try:
+        from logic.retrieval import PassageIndex
+    except ImportError as e:
+        raise Skip(str(e))
+
+    text = document(random.Random(1), 400)
+    return (lambda: PassageIndex(text)), 10, 1
+
+
+def answer_scenario(models):
+    try:
+        from logic.retrieval import PassageIndex, answer_from_passages
+    except ImportError as e:
+        raise Skip(str(e))
+
+    index = PassageIndex(document(random.Random(2), 400))
+    rng = random.Random(3)
+    qa = models[1]
+    return (lambda: answer_from_passages(qa, f"What is {words(rng, 2)}?", index)), 50, 1
+
+
+def resource_scenario(cached: bool):
+    # Cold topics pay the (stubbed, 200ms) upstream; repeat topics come from disk.
+    def build(_models):
+        import shutil
+        import tempfile
+
+        try:
+            from logic.resources import ResourceFetcher
+        except ImportError as e:
+            raise Skip(str(e))
+
+        stub = StubMediaWiki(delay=0.2)
+        cache_dir = tempfile.mkdtemp(prefix="edumate-resources-")
+        fetcher = ResourceFetcher({"wikipedia": stub.api_url, "wikibooks": stub.api_url}, cache_dir=cache_dir)
+        rng = random.Random(7)
+
+        def teardown():
+            stub.close()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        if cached:
+            fetcher.get("photosynthesis")
+            return (lambda: fetcher.get("Photosynthesis ")), 200, 1, teardown
+        return (lambda: fetcher.get(f"{words(rng, 2)} {rng.random()}")), 10, 1, teardown
+    return build
+
+
+def history_scenarios(rows: int):
+    def prepare():
+        from logic import chat_history
+
+        history_fixture(rows)
+        return chat_history.ChatHistory
+
+    def load_page(_models):
+        history = prepare()
+        return (lambda: history.load_page()), 50, 1
+
+    def load_deep_page(_models):
+        history = prepare()
+        _, cursor = history.load_page(limit=min(rows // 2, 5000))
+        return (lambda: history.load_page(after=cursor)), 50, 1
+
+    def search(_models):
+        history = prepare()
+        rng = random.Random(4)
+        return (lambda: history.search(rng.choice(WORDS) + " " + rng.choice(WORDS)[:4])), 50, 1
+
+    def get_chat(_models):
+        history = prepare()
+        rng = random.Random(5)
+        return (lambda: history.get_chat(f"chat-{rng.randrange(rows):07d}")), 200, 1
+
+    def save_chat(_models):
+        history = prepare()
+        rng = random.Random(6)
+        saved = []
+
+        def run():
+            chat = {"title": words(rng, 4), "question": words(rng, 12), "answer": words(rng, 80)}
+            history.save_chat(chat)
+            saved.append(chat["id"])
+
+        def teardown():
+            # Keep the fixture at its nominal size for the next run.
+            for chat_id in saved:
+                history.delete_chat(chat_id)
+        return run, 50, 1, teardown
+
+    def thread(op):
+        # One conversation of `rows` turns in a scratch database; appends
+        # and the last-N fetch should not grow with its length.
+        def build(_models):
+            import shutil
+            import tempfile
+
+            from logic import chat_history
+
+            directory = tempfile.mkdtemp(prefix="edumate-thread-")
+            chat_history.DB_PATH = os.path.join(directory, "thread.db")
+            history = chat_history.ChatHistory
+            history.save_chat({"id": "thread", "title": "Thread", "question": "Opening?", "answer": "Opening."})
+            rng = random.Random(8)
+            for first in range(0, rows, 10_000):
+                history.append_messages(
+                    "thread", [("user" if n % 2 == 0 else "assistant", words(rng, 30)) for n in range(first, min(first + 10_000, rows))]
+                )
+
+            def teardown():
+                for conn in chat_history._pools.pop(chat_history.DB_PATH).queue:
+                    conn.close()
+                chat_history._initialized_paths.discard(chat_history.DB_PATH)
+                shutil.rmtree(directory, ignore_errors=True)
+
+            if op == "append":
+                return (lambda: history.append_messages("thread", [("user", words(rng, 12)), ("assistant", words(rng, 40))])), 50, 1, teardown
+            return (lambda: history.last_messages("thread", 20)), 200, 1, teardown
+        return build
+
+    return {
+        f"history_load_page_{rows}": load_page,
+        f"history_load_deep_page_{rows}": load_deep_page,
+        f"history_search_{rows}": search,
+        f"history_get_chat_{rows}": get_chat,
+        f"history_save_chat_{rows}": save_chat,
+        f"thread_append_{rows}": thread("append"),
+        f"thread_last_messages_{rows}": thread("last"),
+    }
+
+
+def scenarios(rows: List[int]) -> Dict[str, Callable]:
+    registry = {
+        "extract_pdf_10p": pdf_scenario(10),
+        "extract_pdf_100p": pdf_scenario(100),
+        "extract_image": ocr_scenario,
+        "summarize_short": summarize_scenario(3),
+        "summarize_long": summarize_scenario(300),
+        "passage_index_build": index_scenario,
+        "answer_passages": answer_scenario,
+        "resources_cold": resource_scenario(cached=False),
+        "resources_cached": resource_scenario(cached=True),
+    }
+    for count in rows:
+        registry.update(history_scenarios(count))
+    return registry
+
+
+# --- Baseline comparison ---
+def compare(report: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or "p95_ms" not in previous or "p95_ms" not in current:
+            continue
+        delta = current["p95_ms"] - previous["p95_ms"]
+        # Sub-millisecond jitter is noise, not a regression.
+        if delta > min_delta_ms and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms "
+                f"(+{delta / previous['p95_ms']:.0%})"
+            )
+    return regressions
+
+
+def run(only: Optional[List[str]], rows: List[int], models) -> Dict:
+    results = {}
+    for name, build in scenarios(rows).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        try:
+            fn, repeats, items, *teardown = build(models)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+            print(f"{name}: skipped ({e})", file=sys.stderr)
+            continue
+        try:
+            results[name] = measure(fn, repeats, items)
+        finally:
+            for cleanup in teardown:
+                cleanup()
+        print(f"{name}: p50 {results[name]['p50_ms']}ms p95 {results[name]['p95_ms']}ms", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help="comma-separated scenario name prefixes")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="chat database sizes to benchmark")
+    parser.add_argument("--models", choices=("stub", "hf"), default="stub")
+    parser.add_argument("--summary-model", default="t5-small")
+    parser.add_argument("--qa-model", default="deepset/tinyroberta-squad2")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    rows = [int(n) for n in args.rows.split(",") if n.strip()]
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "models": args.models if args.models == "stub" else [args.summary_model, args.qa_model],
+        "scenarios": run(only, rows, load_models(args.models, args.summary_model, args.qa_model)),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,21 @@
 # create_db.py
-import sqlite3
+import os
 
-DB_PATH = "history.db"
+from logic import chat_history
+from logic.chat_history import ChatHistory
+from logic.history_io import LEGACY_DB_PATH
 
 
 def create_database():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS chat_history (
-            id TEXT PRIMARY KEY,
-            title TEXT,
-            question TEXT,
-            answer TEXT,
-            pinned INTEGER,
-            timestamp TEXT
+    # The app's schema (chats, messages and the search index) lives in
+    # logic/chat_history.py; this only makes sure the database exists.
+    ChatHistory.init_db()
+    print(f"✅ Database '{chat_history.DB_PATH}' created or already exists.")
+    if os.path.exists(LEGACY_DB_PATH):
+        print(
+            f"ℹ️ Found '{LEGACY_DB_PATH}' from an older version. Copy its chats with:\n"
+            f"   python -m logic.history_io migrate --source {LEGACY_DB_PATH}"
         )
-    """
-    )
-    conn.commit()
-    conn.close()
-    print("✅ Database 'history.db' created or already exists.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+import argparse
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, List
+
+from logic.model_store import is_prepared, load_mmap_pipeline, prepared_path
+from logic.startup import import_module
+
+# torch: fp32 PyTorch (default); int8: dynamic int8 quantization of the
+# Linear layers; onnx: exported ONNX Runtime graph (needs optimum[onnxruntime]).
+BACKENDS = ("torch", "int8", "onnx")
+INFERENCE_BACKEND = os.environ.get("EDUMATE_INFERENCE_BACKEND", "torch")
+ARTIFACT_DIR = os.environ.get("EDUMATE_MODEL_CACHE_DIR", "data/model_cache")
+# Mean token-F1 against fp32 below which a faster backend is rejected.
+ACCURACY_THRESHOLD = float(os.environ.get("EDUMATE_BACKEND_MIN_ACCURACY", "0.9"))
+
+logger = logging.getLogger(__name__)
+
+ACCURACY_FIXTURES = {
+    "question-answering": [
+        {"question": "What do plants use to make food?", "context": "Plants use sunlight, water and carbon dioxide to make glucose through photosynthesis in their leaves."},
+        {"question": "Who wrote Things Fall Apart?", "context": "Things Fall Apart is a 1958 novel by the Nigerian author Chinua Achebe about pre-colonial life in Igboland."},
+        {"question": "What is the capital of Ghana?", "context": "Ghana is a country in West Africa. Its capital and largest city is Accra, on the Gulf of Guinea."},
+        {"question": "How many sides does a hexagon have?", "context": "A hexagon is a polygon with six sides and six angles. Honeycomb cells are shaped like regular hexagons."},
+        {"question": "What is the powerhouse of the cell?", "context": "Mitochondria are called the powerhouse of the cell because they produce most of the cell's supply of ATP."},
+    ],
+    "summarization": [
+        "Photosynthesis is the process by which green plants use sunlight to turn water and carbon dioxide into glucose and oxygen. It takes place mainly in the leaves, inside chloroplasts that contain the green pigment chlorophyll. The oxygen released is what most living things breathe, and the glucose is used by the plant for energy and growth.",
+        "The Ashanti Empire was a powerful state in what is now Ghana. It rose in the late seventeenth century under Osei Tutu, who united several Akan states. Its capital, Kumasi, became a centre of trade in gold and kola nuts, and the Golden Stool became the symbol of Ashanti unity.",
+        "Newton's first law states that an object at rest stays at rest and an object in motion keeps moving at the same speed and direction unless a force acts on it. This tendency to resist changes in motion is called inertia, and it explains why passengers lurch forward when a bus brakes suddenly.",
+    ],
+}
+ACCURACY_FIXTURES["text2text-generation"] = [
+    "Answer the question: " + fixture["question"] for fixture in ACCURACY_FIXTURES["question-answering"]
+]
+
+
+def _artifact_path(kind: str, model: str) -> str:
+    return os.path.join(ARTIFACT_DIR, kind, model.replace("/", "--"))
+
+
+# torch and transformers take seconds to import, so they are only pulled in
+# by the first model load rather than when the app starts.
+def _torch_pipeline(task: str, model: str, device: int = -1, dtype: str = "float32"):
+    # Models written by `python -m logic.model_store prepare` load offline
+    # and share their weights with the other workers on the host.
+    if is_prepared(model):
+        return load_mmap_pipeline(task, model, device, dtype)
+    torch = import_module("torch")
+    pipeline = import_module("transformers").pipeline
+    return pipeline(task, model=model, device=device, torch_dtype=getattr(torch, dtype))
+
+
+def _int8_pipeline(task: str, model: str):
+    # Quantizing takes about a second on load, so only the accuracy report
+    # is cached on disk for this backend.
+    torch = import_module("torch")
+    pipe = _torch_pipeline(task, model)
+    quantization = getattr(torch, "ao", torch).quantization
+    pipe.model = quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def _onnx_pipeline(task: str, model: str):
+    try:
+        from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise RuntimeError("The onnx backend needs `pip install optimum[onnxruntime]`") from e
+    transformers = import_module("transformers")
+
+    model_class = ORTModelForQuestionAnswering if task == "question-answering" else ORTModelForSeq2SeqLM
+    path = _artifact_path("onnx", model)
+    if os.path.isdir(path):
+        ort_model = model_class.from_pretrained(path)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(path)
+    else:
+        source = prepared_path(model) if is_prepared(model) else model
+        ort_model = model_class.from_pretrained(source, export=True)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(source)
+        ort_model.save_pretrained(path)
+        tokenizer.save_pretrained(path)
+    return transformers.pipeline(task, model=ort_model, tokenizer=tokenizer)
+
+
+def _run_fixtures(pipe, task: str) -> List[str]:
+    fixtures = ACCURACY_FIXTURES[task]
+    if task == "question-answering":
+        return [pipe(question=f["question"], context=f["context"])["answer"] for f in fixtures]
+    key = "summary_text" if task == "summarization" else "generated_text"
+    prefix = "summarize: " if task == "summarization" else ""
+    return [pipe(prefix + text, max_length=60, min_length=10 if prefix else 0)[0][key] for text in fixtures]
+
+
+def token_f1(predicted: str, reference: str) -> float:
+    predicted_tokens = re.findall(r"\w+", predicted.lower())
+    reference_tokens = re.findall(r"\w+", reference.lower())
+    if not predicted_tokens or not reference_tokens:
+        return float(predicted_tokens == reference_tokens)
+    overlap = sum((Counter(predicted_tokens) & Counter(reference_tokens)).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(predicted_tokens)
+    recall = overlap / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def check_accuracy(task: str, model: str, backend: str, candidate=None) -> Dict:
+    candidate = candidate or _build(task, model, backend)
+    reference = _run_fixtures(_torch_pipeline(task, model), task)
+    outputs = _run_fixtures(candidate, task)
+    scores = [token_f1(out, ref) for out, ref in zip(outputs, reference)]
+    report = {
+        "task": task,
+        "model": model,
+        "backend": backend,
+        "mean_f1": round(sum(scores) / len(scores), 4),
+        "min_f1": round(min(scores), 4),
+        "threshold": ACCURACY_THRESHOLD,
+    }
+    report["passed"] = report["mean_f1"] >= ACCURACY_THRESHOLD
+    path = _artifact_path("accuracy", f"{backend}--{model}") + ".json"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def _cached_report(task: str, model: str, backend: str):
+    path = _artifact_path("accuracy", f"{backend}--{model}") + ".json"
+    try:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        return None
+    # A stricter threshold invalidates the old verdict.
+    return report if report.get("task") == task and report.get("threshold") == ACCURACY_THRESHOLD else None
+
+
+def _build(task: str, model: str, backend: str):
+    if backend == "int8":
+        return _int8_pipeline(task, model)
+    if backend == "onnx":
+        return _onnx_pipeline(task, model)
+    raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+
+
+def build_pipeline(task: str, model: str, device: int = -1, dtype: str = "float32", backend: str = INFERENCE_BACKEND):
+    # int8 and onnx are CPU-only and only served once they have matched the
+    # fp32 outputs on the fixture set; otherwise fall back to fp32.
+    if backend == "torch" or device != -1:
+        return _torch_pipeline(task, model, device, dtype)
+    pipe = _build(task, model, backend)
+    report = _cached_report(task, model, backend) or check_accuracy(task, model, backend, candidate=pipe)
+    if not report["passed"]:
+        logger.warning(
+            "%s backend for %s scored %.3f token-F1 against fp32 (< %.2f); using fp32",
+            backend, model, report["mean_f1"], ACCURACY_THRESHOLD,
+        )
+        return _torch_pipeline(task, model, device, dtype)
+    return pipe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a model for a backend and check it against fp32.")
+    parser.add_argument("task", choices=sorted(ACCURACY_FIXTURES))
+    parser.add_argument("model")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="int8")
+    args = parser.parse_args(argv)
+    print(json.dumps(check_accuracy(args.task, args.model, args.backend), indent=2))
+
+
+if __name__ == "__main__":
+    main()
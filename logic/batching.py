@@ -0,0 +1,186 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+from logic.metrics import metrics
+
+MAX_BATCH_SIZE = int(os.environ.get("EDUMATE_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.environ.get("EDUMATE_MAX_BATCH_WAIT_MS", "25"))
+# Inputs in one forward pass may differ in length by at most this factor;
+# longer spreads are split so short inputs are not padded to the longest.
+BUCKET_RATIO = float(os.environ.get("EDUMATE_BATCH_BUCKET_RATIO", "2.0"))
+
+_STOP = object()
+# Tasks whose pipelines return a single input's result as a bare dict. The
+# generation pipelines (summarization, text2text-generation, ...) wrap it in
+# a list of candidates, even for one sequence.
+_BARE_SINGLE_TASKS = ("question-answering", "document-question-answering")
+
+
+def _input_length(item) -> int:
+    if isinstance(item, dict):
+        return sum(len(str(value)) for value in item.values())
+    return len(str(item))
+
+
+def _kwargs_key(kwargs: Dict) -> tuple:
+    return tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+
+
+class _Request:
+    __slots__ = ("item", "kwargs", "key", "length", "future", "enqueued_at")
+
+    def __init__(self, item, kwargs: Dict):
+        self.item = item
+        self.kwargs = kwargs
+        self.key = _kwargs_key(kwargs)
+        self.length = _input_length(item)
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+def length_buckets(requests: List[_Request], max_batch_size: int, ratio: float = BUCKET_RATIO) -> List[List[_Request]]:
+    buckets: List[List[_Request]] = []
+    for request in sorted(requests, key=lambda r: r.length):
+        bucket = buckets[-1] if buckets else None
+        if (
+            bucket is None
+            or len(bucket) >= max_batch_size
+            or request.length > max(bucket[0].length, 1) * ratio
+        ):
+            buckets.append([request])
+        else:
+            bucket.append(request)
+    return buckets
+
+
+class BatchedPipeline:
+    """Drop-in wrapper that merges concurrent calls to one HF pipeline.
+
+    Every caller, from any session or job thread, enqueues its inputs; one
+    worker thread flushes the queue as a padded batch when it reaches
+    max_batch_size or the oldest request has waited max_wait_ms, whichever
+    comes first, and routes each output back to its caller.
+    """
+
+    def __init__(self, pipe, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.pipe = pipe
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._serve, name="edumate-batcher", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        # tokenizer, model, task, ... come from the wrapped pipeline.
+        if name == "pipe":
+            raise AttributeError(name)
+        return getattr(self.pipe, name)
+
+    def __call__(self, inputs=None, **kwargs):
+        if inputs is None and "question" in kwargs:
+            inputs = {"question": kwargs.pop("question"), "context": kwargs.pop("context")}
+        kwargs.pop("batch_size", None)
+        single = not isinstance(inputs, list)
+        requests = [_Request(item, kwargs) for item in ([inputs] if single else inputs)]
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                for request in requests:
+                    self._queue.put(request)
+        if closed:
+            # Evicted while a caller still held it: nothing serves the queue
+            # any more, so run this call unbatched on the wrapped pipeline.
+            return self.pipe(inputs, **kwargs)
+        results = [request.future.result() for request in requests]
+        return self._single(results[0]) if single else results
+
+    def _single(self, output):
+        # Batched calls hand back one entry per input: the bare record for
+        # num_return_sequences=1. Re-wrap it where the pipeline itself would.
+        if isinstance(output, dict) and getattr(self.pipe, "task", None) not in _BARE_SINGLE_TASKS:
+            return [output]
+        return output
+
+    def close(self):
+        # Requests queued before the stop marker are still served; the
+        # worker fails anything left behind it on the way out.
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+
+    def _fail_pending(self):
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not _STOP and not request.future.done():
+                request.future.set_exception(RuntimeError("pipeline closed before this request was served"))
+
+    def _collect(self) -> List[_Request]:
+        first = self._queue.get()
+        if first is _STOP:
+            return []
+        pending = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(pending) < self.max_batch_size:
+            # Past the deadline, still take whatever queued up while the
+            # previous batch was running, just without waiting for more.
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._queue.put(_STOP)
+                break
+            pending.append(request)
+        return pending
+
+    def _serve(self):
+        while True:
+            pending = self._collect()
+            if not pending:
+                self._fail_pending()
+                return
+            groups: Dict[tuple, List[_Request]] = {}
+            for request in pending:
+                groups.setdefault(request.key, []).append(request)
+            for group in groups.values():
+                for bucket in length_buckets(group, self.max_batch_size):
+                    self._run(bucket)
+
+    def _run(self, bucket: List[_Request]):
+        try:
+            # Tokenization, the padded forward pass and decoding, per batch.
+            with metrics.span(f"model.batch.{getattr(self.pipe, 'task', 'pipeline')}"):
+                outputs: Any = self.pipe([r.item for r in bucket], batch_size=len(bucket), **bucket[0].kwargs)
+            # A list of one input comes back unwrapped from some pipelines.
+            if len(bucket) == 1 and not (isinstance(outputs, list) and len(outputs) == 1):
+                outputs = [outputs]
+            for request, output in zip(bucket, outputs):
+                request.future.set_result(output)
+        except Exception as e:
+            for request in bucket:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        self.batches += 1
+        self.requests += len(bucket)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
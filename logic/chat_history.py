@@ -1,59 +1,335 @@
+import json
 import os
+import queue
+import re
 import sqlite3
+import threading
 import uuid
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from logic.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always there
+    zstandard = None
 
 DB_PATH = "data/history.db"
+POOL_SIZE = int(os.environ.get("EDUMATE_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.environ.get("EDUMATE_DB_BUSY_TIMEOUT_MS", "5000"))
+# NORMAL is durable across application crashes in WAL mode; only an OS
+# crash or power loss can drop the last few commits.
+SYNCHRONOUS = os.environ.get("EDUMATE_DB_SYNCHRONOUS", "NORMAL")
+STATEMENT_CACHE_SIZE = 256
+PAGE_SIZE = 50
+# Codec for archived chat bodies; each archived row records its own.
+ARCHIVE_CODEC = os.environ.get("EDUMATE_ARCHIVE_CODEC", "zstd" if zstandard else "zlib")
+THREAD_TAIL = 20
+
+_pools: Dict[str, "queue.LifoQueue[sqlite3.Connection]"] = {}
+_pools_lock = threading.Lock()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+# Bumped whenever a pooled connection commits a change, so callers can key
+# caches of listing pages on (path, version) instead of re-querying.
+_versions: Dict[str, int] = {}
+_versions_lock = threading.Lock()
+# PRAGMA data_version last seen on each pooled connection, by id(): it moves
+# when any other connection, in this process or another, commits.
+_data_versions: Dict[int, int] = {}
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Pooled connections move between Streamlit's per-rerun script threads,
+    # but each is only ever used by one thread at a time.
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # Only takes effect on a new file, and must come before WAL; existing
+    # databases are converted by logic.retention's first compaction.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def compress(text: str, codec: str = ARCHIVE_CODEC) -> bytes:
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("the zstd archive codec needs `pip install zstandard`")
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress(blob: bytes, codec: str) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("reading zstd-archived chats needs `pip install zstandard`")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _pool(path: str) -> "queue.LifoQueue[sqlite3.Connection]":
+    with _pools_lock:
+        return _pools.setdefault(path, queue.LifoQueue(maxsize=POOL_SIZE))
 
 
 class ChatHistory:
+    @staticmethod
+    @contextmanager
+    def connection() -> Iterator[sqlite3.Connection]:
+        path = DB_PATH
+        # The schema is created on first use, not at import, so a CLI's
+        # --db is in place before any database is touched.
+        if path not in _initialized_paths:
+            ChatHistory.init_db()
+        pool = _pool(path)
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = _open_connection(path)
+        changes = conn.total_changes
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if conn.total_changes != changes:
+                with _versions_lock:
+                    _versions[path] = _versions.get(path, 0) + 1
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                _data_versions.pop(id(conn), None)
+                conn.close()
+
+    @staticmethod
+    def version() -> int:
+        # The in-process counter misses commits made elsewhere (a CLI import,
+        # retention in another worker); the database's own data_version
+        # catches those, at the cost of one pragma.
+        path = DB_PATH
+        with ChatHistory.connection() as conn:
+            seen = conn.execute("PRAGMA data_version").fetchone()[0]
+            with _versions_lock:
+                if _data_versions.get(id(conn), seen) != seen:
+                    _versions[path] = _versions.get(path, 0) + 1
+                _data_versions[id(conn)] = seen
+                return _versions.get(path, 0)
+
+    @staticmethod
+    def timed(operation: str):
+        return metrics.span(f"history.{operation}")
+
+    @staticmethod
+    def latency_stats() -> Dict[str, Dict]:
+        return {
+            name[len("history."):]: stats
+            for name, stats in metrics.snapshot("history.").items()
+        }
+
     @staticmethod
     def init_db():
-        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.execute(
-                """
-            CREATE TABLE IF NOT EXISTS chats (
-                id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                pinned INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
+        path = DB_PATH
+        with _init_lock, ChatHistory.timed("init_db"):
+            if path in _initialized_paths:
+                return
+            conn = _open_connection(path)
+            try:
+                with conn:
+                    conn.execute(
+                        """
+                    CREATE TABLE IF NOT EXISTS chats (
+                        id TEXT PRIMARY KEY,
+                        title TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        answer TEXT NOT NULL,
+                        pinned INTEGER DEFAULT 0,
+                        created_at TEXT NOT NULL,
+                        updated_at TEXT NOT NULL
+                    )
+                    """
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_pinned ON chats(pinned)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON chats(created_at)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_listing ON chats(pinned, created_at, id)")
+                    # Follow-up turns of a chat. The chats row is the opening
+                    # question and answer; messages are only ever appended, at
+                    # seq 1, 2, ... per thread, and never rewritten.
+                    conn.execute(
+                        """
+                    CREATE TABLE IF NOT EXISTS messages (
+                        thread_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        created_at TEXT NOT NULL,
+                        PRIMARY KEY (thread_id, seq)
+                    ) WITHOUT ROWID
+                    """
+                    )
+                    # Chats moved out by logic.retention: bodies and follow-up
+                    # turns compressed, out of the listing and search index,
+                    # still readable through get_chat and last_messages.
+                    conn.execute(
+                        """
+                    CREATE TABLE IF NOT EXISTS chats_archive (
+                        id TEXT PRIMARY KEY,
+                        title TEXT NOT NULL,
+                        codec TEXT NOT NULL,
+                        question BLOB NOT NULL,
+                        answer BLOB NOT NULL,
+                        turns BLOB,
+                        created_at TEXT NOT NULL,
+                        updated_at TEXT NOT NULL,
+                        archived_at TEXT NOT NULL
+                    )
+                    """
+                    )
+                    ChatHistory._init_search(conn)
+            finally:
+                conn.close()
+            _initialized_paths.add(path)
+
+    @staticmethod
+    def _init_search(conn: sqlite3.Connection):
+        # External-content FTS5 index over chats, kept in sync by triggers.
+        # It is keyed on chats' implicit rowid, which a full VACUUM may
+        # renumber, so any full VACUUM must be followed by a 'rebuild'.
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chats_fts'"
+        ).fetchone()
+        conn.execute(
             """
+            CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts USING fts5(
+                title, question, answer,
+                content='chats', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
             )
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_pinned ON chats(pinned)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON chats(created_at)")
-            conn.commit()
+            """
+        )
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS chats_fts_insert AFTER INSERT ON chats BEGIN
+                INSERT INTO chats_fts(rowid, title, question, answer)
+                VALUES (new.rowid, new.title, new.question, new.answer);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chats_fts_delete AFTER DELETE ON chats BEGIN
+                INSERT INTO chats_fts(chats_fts, rowid, title, question, answer)
+                VALUES ('delete', old.rowid, old.title, old.question, old.answer);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chats_fts_update AFTER UPDATE OF title, question, answer ON chats BEGIN
+                INSERT INTO chats_fts(chats_fts, rowid, title, question, answer)
+                VALUES ('delete', old.rowid, old.title, old.question, old.answer);
+                INSERT INTO chats_fts(rowid, title, question, answer)
+                VALUES (new.rowid, new.title, new.question, new.answer);
+            END;
+            """
+        )
+        if not exists:
+            # Index chats saved before search existed.
+            conn.execute("INSERT INTO chats_fts(chats_fts) VALUES ('rebuild')")
 
     @staticmethod
-    def save_chat(chat: Dict):
+    def _chat_row(chat: Dict, now: str) -> tuple:
         if not chat.get("id"):
             chat["id"] = str(uuid.uuid4())
-        now = datetime.now().isoformat()
         chat.setdefault("created_at", now)
         chat["updated_at"] = now
+        return (
+            chat["id"],
+            chat["title"],
+            chat["question"],
+            chat["answer"],
+            int(chat.get("pinned", False)),
+            chat["created_at"],
+            chat["updated_at"],
+        )
 
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.execute(
+    @staticmethod
+    def save_chat(chat: Dict):
+        ChatHistory.save_chats([chat])
+
+    @staticmethod
+    def save_chats(chats: List[Dict]):
+        now = datetime.now().isoformat()
+        rows = [ChatHistory._chat_row(chat, now) for chat in chats]
+        with ChatHistory.timed("save_chats"), ChatHistory.connection() as conn, conn:
+            conn.executemany(
                 """
                 INSERT INTO chats (id, title, question, answer, pinned, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-                (
-                    chat["id"],
-                    chat["title"],
-                    chat["question"],
-                    chat["answer"],
-                    int(chat.get("pinned", False)),
-                    chat["created_at"],
-                    chat["updated_at"],
-                ),
+                rows,
             )
-            conn.commit()
+
+    @staticmethod
+    def append_messages(thread_id: str, messages: List[Tuple[str, str]]) -> int:
+        """Appends (role, content) turns to a chat; returns the last seq.
+
+        The next seq comes from the primary-key index, so an append costs
+        the same however long the thread already is.
+        """
+        now = datetime.now().isoformat()
+        with ChatHistory.timed("append_messages"), ChatHistory.connection() as conn, conn:
+            # A conversation picked up again comes back out of the archive.
+            ChatHistory._restore(conn, thread_id)
+            last = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO messages (thread_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(thread_id, last + i, role, content, now) for i, (role, content) in enumerate(messages, 1)],
+            )
+        return last + len(messages)
+
+    @staticmethod
+    def last_messages(thread_id: str, n: int = THREAD_TAIL) -> List[Dict]:
+        """The last n turns of a chat, oldest first, opening pair included.
+
+        The opening question and answer come from the chats row, at seq 0.
+        """
+        with ChatHistory.timed("last_messages"), ChatHistory.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT seq, role, content, created_at FROM messages
+                WHERE thread_id = ? ORDER BY seq DESC LIMIT ?
+            """,
+                (thread_id, n),
+            ).fetchall()
+            opening = None
+            if len(rows) < n:
+                opening = conn.execute(
+                    "SELECT question, answer, created_at, updated_at FROM chats WHERE id = ?", (thread_id,)
+                ).fetchone()
+            archived = None if rows or opening else ChatHistory._archived(conn, thread_id)
+        if archived:
+            opening = (archived["question"], archived["answer"], archived["created_at"], archived["updated_at"])
+            rows = [tuple(turn) for turn in reversed(archived["turns"][-n:])]
+        turns = [
+            {"thread_id": thread_id, "seq": seq, "role": role, "content": content, "created_at": created_at}
+            for seq, role, content, created_at in reversed(rows)
+        ]
+        if opening:
+            question, answer, created_at, updated_at = opening
+            head = [
+                {"thread_id": thread_id, "seq": 0, "role": "user", "content": question, "created_at": created_at},
+                {"thread_id": thread_id, "seq": 0, "role": "assistant", "content": answer, "created_at": updated_at},
+            ]
+            turns = head[len(head) - min(len(head), n - len(rows)):] + turns
+        return turns
 
     @staticmethod
     def load_history(pinned_only: bool = False) -> List[Dict]:
@@ -61,27 +337,172 @@ class ChatHistory:
         if pinned_only:
             query = "SELECT * FROM chats WHERE pinned = 1 ORDER BY created_at DESC"
 
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute(query)
-            rows = cursor.fetchall()
-            return [ChatHistory.dict_from_row(row) for row in rows]
+        with ChatHistory.timed("load_history"), ChatHistory.connection() as conn:
+            rows = conn.execute(query).fetchall()
+        return [ChatHistory.dict_from_row(row) for row in rows]
+
+    @staticmethod
+    def load_page(limit: int = PAGE_SIZE, after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        # Keyset pagination over (pinned, created_at, id), newest pinned first.
+        # Pass the returned cursor back as `after` for the next page; it is
+        # None once the listing is exhausted. Rows carry no question/answer
+        # bodies; use get_chat for those.
+        query = "SELECT id, title, pinned, created_at FROM chats"
+        params: list = []
+        if after is not None:
+            query += " WHERE (pinned, created_at, id) < (?, ?, ?)"
+            params.extend(after)
+        query += " ORDER BY pinned DESC, created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with ChatHistory.timed("load_page"), ChatHistory.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        page = [
+            {"id": row[0], "title": row[1], "pinned": bool(row[2]), "created_at": row[3]}
+            for row in rows[:limit]
+        ]
+        cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            cursor = (last[2], last[3], last[0])
+        return page, cursor
+
+    @staticmethod
+    def search(query: str, limit: int = PAGE_SIZE, offset: int = 0) -> List[Dict]:
+        # Every word must match, as a prefix, in the title, question or answer.
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+        with ChatHistory.timed("search"), ChatHistory.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT c.id, c.title, c.pinned, c.created_at,
+                       snippet(chats_fts, -1, '**', '**', '…', 12),
+                       bm25(chats_fts, 10.0, 2.0, 1.0) AS rank
+                FROM chats_fts JOIN chats c ON c.rowid = chats_fts.rowid
+                WHERE chats_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """,
+                (match, limit, offset),
+            ).fetchall()
+        return [
+            {"id": row[0], "title": row[1], "pinned": bool(row[2]), "created_at": row[3], "snippet": row[4], "score": row[5]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def chat_exists(question: str, answer: str) -> bool:
+        with ChatHistory.timed("chat_exists"), ChatHistory.connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM chats WHERE question = ? AND answer = ? LIMIT 1", (question, answer)
+            ).fetchone()
+        return row is not None
 
     @staticmethod
     def get_chat(chat_id: str) -> Optional[Dict]:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,))
-            row = cursor.fetchone()
-        return ChatHistory.dict_from_row(row) if row else None
+        with ChatHistory.timed("get_chat"), ChatHistory.connection() as conn:
+            row = conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
+            if row:
+                return ChatHistory.dict_from_row(row)
+            archived = ChatHistory._archived(conn, chat_id)
+        if archived:
+            del archived["turns"]
+        return archived
+
+    @staticmethod
+    def _archived(conn: sqlite3.Connection, chat_id: str) -> Optional[Dict]:
+        row = conn.execute(
+            """
+            SELECT id, title, codec, question, answer, turns, created_at, updated_at
+            FROM chats_archive WHERE id = ?
+        """,
+            (chat_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        chat_id, title, codec, question, answer, turns, created_at, updated_at = row
+        return {
+            "id": chat_id,
+            "title": title,
+            "question": decompress(question, codec),
+            "answer": decompress(answer, codec),
+            "pinned": False,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "archived": True,
+            # [seq, role, content, created_at] per follow-up turn.
+            "turns": json.loads(decompress(turns, codec)) if turns else [],
+        }
+
+    @staticmethod
+    def archive_chats(chat_ids: List[str], codec: str = ARCHIVE_CODEC) -> int:
+        """Moves chats and their turns into chats_archive, compressed.
+
+        Pinned chats are never moved. Returns the number archived.
+        """
+        now = datetime.now().isoformat()
+        with ChatHistory.timed("archive_chats"), ChatHistory.connection() as conn, conn:
+            archived = 0
+            for chat_id in chat_ids:
+                row = conn.execute(
+                    "SELECT title, question, answer, created_at, updated_at FROM chats WHERE id = ? AND NOT pinned",
+                    (chat_id,),
+                ).fetchone()
+                if row is None:
+                    continue
+                title, question, answer, created_at, updated_at = row
+                turns = conn.execute(
+                    "SELECT seq, role, content, created_at FROM messages WHERE thread_id = ? ORDER BY seq",
+                    (chat_id,),
+                ).fetchall()
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO chats_archive
+                        (id, title, codec, question, answer, turns, created_at, updated_at, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        chat_id, title, codec, compress(question, codec), compress(answer, codec),
+                        compress(json.dumps(turns), codec) if turns else None, created_at, updated_at, now,
+                    ),
+                )
+                conn.execute("DELETE FROM messages WHERE thread_id = ?", (chat_id,))
+                conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
+                archived += 1
+        return archived
+
+    @staticmethod
+    def _restore(conn: sqlite3.Connection, chat_id: str):
+        if conn.execute("SELECT 1 FROM chats WHERE id = ?", (chat_id,)).fetchone():
+            return
+        chat = ChatHistory._archived(conn, chat_id)
+        if chat is None:
+            return
+        conn.execute(
+            """
+            INSERT INTO chats (id, title, question, answer, pinned, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 0, ?, ?)
+        """,
+            (chat_id, chat["title"], chat["question"], chat["answer"], chat["created_at"], chat["updated_at"]),
+        )
+        conn.executemany(
+            "INSERT INTO messages (thread_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(chat_id, *turn) for turn in chat["turns"]],
+        )
+        conn.execute("DELETE FROM chats_archive WHERE id = ?", (chat_id,))
 
     @staticmethod
     def delete_chat(chat_id: str):
-        with sqlite3.connect(DB_PATH) as conn:
+        with ChatHistory.timed("delete_chat"), ChatHistory.connection() as conn, conn:
             conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
-            conn.commit()
+            conn.execute("DELETE FROM messages WHERE thread_id = ?", (chat_id,))
+            conn.execute("DELETE FROM chats_archive WHERE id = ?", (chat_id,))
 
     @staticmethod
     def update_title(chat_id: str, new_title: str):
-        with sqlite3.connect(DB_PATH) as conn:
+        with ChatHistory.timed("update_title"), ChatHistory.connection() as conn, conn:
             conn.execute(
                 """
                 UPDATE chats SET title = ?, updated_at = ?
@@ -89,7 +510,6 @@ class ChatHistory:
             """,
                 (new_title, datetime.now().isoformat(), chat_id),
             )
-            conn.commit()
 
     @staticmethod
     def update_chat(chat_id: str, **updates):  # sourcery skip: merge-list-appends-into-extend, remove-dict-keys
@@ -100,15 +520,14 @@ class ChatHistory:
         values.append(datetime.now().isoformat())
         values.append(chat_id)
 
-        with sqlite3.connect(DB_PATH) as conn:
+        with ChatHistory.timed("update_chat"), ChatHistory.connection() as conn, conn:
             conn.execute(
                 f"UPDATE chats SET {set_clause}, updated_at = ? WHERE id = ?", values
             )
-            conn.commit()
 
     @staticmethod
     def toggle_pin(chat_id: str):
-        with sqlite3.connect(DB_PATH) as conn:
+        with ChatHistory.timed("toggle_pin"), ChatHistory.connection() as conn, conn:
             conn.execute(
                 """
                 UPDATE chats SET pinned = NOT pinned, updated_at = ?
@@ -116,7 +535,6 @@ class ChatHistory:
             """,
                 (datetime.now().isoformat(), chat_id),
             )
-            conn.commit()
 
     @staticmethod
     def dict_from_row(row) -> Dict:
@@ -129,6 +547,3 @@ class ChatHistory:
             "created_at": row[5],
             "updated_at": row[6],
         }
-
-
-ChatHistory.init_db()
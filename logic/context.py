@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+# Room left for the question, separators and special tokens.
+RESERVED_TOKENS = 64
+# Share of the budget recent turns may take when a document is also given.
+TURN_SHARE = 0.5
+TOKEN_CACHE_SIZE = 8192
+# Turns fetched for a follow-up; the budget usually keeps fewer.
+CONTEXT_TURNS = 8
+ROLE_LABELS = {"user": "Student", "assistant": "EduMate"}
+
+
+class ContextAssembler:
+    """Packs recent turns and document passages into a model's token budget.
+
+    Token ids are cached per turn. Turns are append-only, so (thread, seq)
+    identifies one for good; the opening pair, which lives on the editable
+    chats row, is keyed by its text instead. A follow-up only tokenizes the
+    newest turns, and the prompt never exceeds the model's window.
+    """
+
+    def __init__(self, tokenizer, budget: int = 0, cache_size: int = TOKEN_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.budget = budget or min(getattr(tokenizer, "model_max_length", 512), 4096)
+        self.cache_size = cache_size
+        self._ids: "OrderedDict[object, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _encode(self, key, text: str) -> List[int]:
+        with self._lock:
+            ids = self._ids.get(key)
+            if ids is not None:
+                self._ids.move_to_end(key)
+                self.stats["hits"] += 1
+                return ids
+        ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        with self._lock:
+            self.stats["misses"] += 1
+            self._ids[key] = ids
+            while len(self._ids) > self.cache_size:
+                self._ids.popitem(last=False)
+        return ids
+
+    def _turn_text(self, turn: Dict) -> str:
+        return f"{ROLE_LABELS.get(turn['role'], turn['role'])}: {turn['content']}"
+
+    def _turn_key(self, turn: Dict):
+        if turn["seq"]:
+            return ("turn", turn["thread_id"], turn["seq"])
+        return ("opening", turn["role"], hash(turn["content"]))
+
+    def _take(self, items: Sequence, budget: int, key, text) -> Tuple[List[str], int]:
+        # Greedily keeps items in the given order; the first one that does
+        # not fit is cut down to what is left, the rest are dropped.
+        kept, used = [], 0
+        for item in items:
+            if budget <= 0:
+                break
+            ids = self._encode(key(item), text(item))
+            if len(ids) <= budget:
+                kept.append(text(item))
+                used += len(ids)
+                budget -= len(ids)
+            else:
+                kept.append(self.tokenizer.decode(ids[:budget], skip_special_tokens=True))
+                used += budget
+                budget = 0
+        return kept, used
+
+    def assemble(self, question: str, turns: Sequence[Dict], passages: Sequence[str] = ()) -> str:
+        """A context string of the newest turns, then the best passages.
+
+        `turns` are oldest first (ChatHistory.last_messages); `passages` are
+        best first. The result plus the question fits in the budget.
+        """
+        question_tokens = len(self.tokenizer(question, add_special_tokens=False)["input_ids"])
+        budget = max(0, self.budget - RESERVED_TOKENS - question_tokens)
+        turn_budget = int(budget * TURN_SHARE) if passages else budget
+        # Newest turns matter most, so they are taken first and then put
+        # back in conversation order.
+        recent, used = self._take(list(reversed(turns)), turn_budget, self._turn_key, self._turn_text)
+        documents, _ = self._take(
+            passages, budget - used, lambda passage: ("passage", hash(passage)), lambda passage: passage
+        )
+        return "\n".join(recent[::-1] + documents)
+
+
+_assemblers: Dict[int, ContextAssembler] = {}
+_assemblers_lock = threading.Lock()
+
+
+def get_assembler(tokenizer) -> ContextAssembler:
+    # One per tokenizer object, so its token cache outlives a single rerun.
+    with _assemblers_lock:
+        assembler = _assemblers.get(id(tokenizer))
+        if assembler is None or assembler.tokenizer is not tokenizer:
+            assembler = _assemblers[id(tokenizer)] = ContextAssembler(tokenizer)
+        return assembler
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+CACHE_DIR = "data/extraction_cache"
+MEMORY_ENTRIES = int(os.environ.get("EDUMATE_EXTRACTION_CACHE_ENTRIES", "32"))
+DISK_BUDGET_MB = int(os.environ.get("EDUMATE_EXTRACTION_CACHE_MB", "256"))
+
+
+def cache_key(data: bytes, extractor: str, version: str, settings: Optional[Dict] = None) -> str:
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{extractor}\0{version}\0".encode())
+    digest.update(json.dumps(settings or {}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier (memory LRU + files on disk) cache of extracted document text."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, memory_entries: int = MEMORY_ENTRIES, disk_budget_mb: int = DISK_BUDGET_MB):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_budget_bytes = disk_budget_mb * 1024 * 1024
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Bytes on disk, recounted by every eviction pass (which runs after
+        # each write), so stats() never scans the directory on a rerun.
+        self._disk_bytes: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_or_extract(self, data: bytes, extractor: str, version: str, extract: Callable[[], str], settings: Optional[Dict] = None) -> str:
+        key = cache_key(data, extractor, version, settings)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        text = self._read_disk(key)
+        if text is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(key, text)
+            return text
+
+        text = extract()
+        with self._lock:
+            self.misses += 1
+            self._remember(key, text)
+        self._write_disk(key, text)
+        return text
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_usage(),
+        }
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _disk_entries(self):
+        with os.scandir(self.cache_dir) as entries:
+            return [entry for entry in entries if entry.name.endswith(".txt")]
+
+    def _disk_usage(self) -> int:
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(entry.stat().st_size for entry in self._disk_entries())
+        return self._disk_bytes
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            # mtime doubles as the last-access time for eviction.
+            os.utime(path)
+        except OSError:
+            # Missing, or evicted by another worker between the read and
+            # the touch; either way, extract again.
+            return None
+        return text
+
+    def _write_disk(self, key: str, text: str):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.disk_budget_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        self._disk_bytes = total
+
+
+extraction_cache = ExtractionCache()
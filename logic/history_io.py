@@ -0,0 +1,335 @@
+"""Bulk export, import and legacy migration for the chat history database.
+
+    python -m logic.history_io export chats.jsonl
+    python -m logic.history_io export messages.csv --table messages
+    python -m logic.history_io export archive.jsonl --table chats_archive
+    python -m logic.history_io import chats.jsonl
+    python -m logic.history_io migrate --source history.db
+
+Rows stream through in fixed-size batches in both directions, so memory
+stays flat however large the database or file is. Each import batch is one
+transaction of executemany inserts. Archived chats' compressed bodies travel
+as base64 text. `migrate` copies the legacy
+chat_history(timestamp) table written by create_db.py into chats,
+checkpointing its position with every batch so an interrupted run resumes
+where it stopped.
+"""
+import argparse
+import base64
+import csv
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from logic import chat_history
+from logic.chat_history import ChatHistory
+
+BATCH_SIZE = 5000
+LEGACY_DB_PATH = "history.db"
+LEGACY_TABLE = "chat_history"
+
+TABLES = {
+    "chats": ("id", "title", "question", "answer", "pinned", "created_at", "updated_at"),
+    "messages": ("thread_id", "seq", "role", "content", "created_at"),
+    "chats_archive": (
+        "id", "title", "codec", "question", "answer", "turns", "created_at", "updated_at", "archived_at",
+    ),
+}
+# Keyset order for export, on each table's primary index: a stable walk
+# that never holds a long read open.
+_ORDER = {"chats": ("rowid",), "messages": ("thread_id", "seq"), "chats_archive": ("rowid",)}
+# Compressed columns, which JSON and CSV can only carry as text.
+_BLOB_COLUMNS = {"chats_archive": ("question", "answer", "turns")}
+
+
+class Progress:
+    """Rows done, rate and ETA, rewritten in place on stderr."""
+
+    def __init__(self, label: str, total: Optional[int] = None, done: int = 0):
+        self.label = label
+        self.total = total
+        self.done = done
+        self.started = time.perf_counter()
+        self._first = done
+
+    def update(self, rows: int):
+        self.done += rows
+        elapsed = time.perf_counter() - self.started
+        rate = (self.done - self._first) / elapsed if elapsed else 0.0
+        line = f"{self.label}: {self.done:,}"
+        if self.total:
+            remaining = (self.total - self.done) / rate if rate else 0.0
+            line += f" / {self.total:,} ({self.done / self.total:.0%}), ETA {remaining:.0f}s"
+        sys.stderr.write(f"\r{line}, {rate:,.0f} rows/s ")
+        sys.stderr.flush()
+
+    def finish(self):
+        sys.stderr.write("\n")
+
+
+def _format(path: str, fmt: Optional[str]) -> str:
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"unknown format {fmt!r}; use jsonl or csv")
+    return fmt
+
+
+# --- Export ---
+def iter_rows(table: str, batch_size: int = BATCH_SIZE) -> Iterator[List[Tuple]]:
+    """Batches of rows of `table`, walked by keyset, one short read each."""
+    order = _ORDER[table]
+    keys = ", ".join(order)
+    query = f"SELECT {keys}, {', '.join(TABLES[table])} FROM {table}"
+    after: Optional[Tuple] = None
+    while True:
+        where = f" WHERE ({keys}) > ({', '.join('?' * len(order))})" if after else ""
+        with ChatHistory.connection() as conn:
+            rows = conn.execute(f"{query}{where} ORDER BY {keys} LIMIT ?", (*(after or ()), batch_size)).fetchall()
+        if not rows:
+            return
+        yield [row[len(order):] for row in rows]
+        after = rows[-1][:len(order)]
+
+
+def _encode_blobs(row: Tuple, blobs: List[int]) -> Tuple:
+    return tuple(
+        base64.b64encode(value).decode("ascii") if i in blobs and value is not None else value
+        for i, value in enumerate(row)
+    )
+
+
+def export(path: str, table: str = "chats", fmt: Optional[str] = None, batch_size: int = BATCH_SIZE) -> int:
+    fmt = _format(path, fmt)
+    columns = TABLES[table]
+    with ChatHistory.connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    progress = Progress(f"export {table}", total)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        blobs = [i for i, column in enumerate(columns) if column in _BLOB_COLUMNS.get(table, ())]
+        for rows in iter_rows(table, batch_size):
+            if blobs:
+                rows = [_encode_blobs(row, blobs) for row in rows]
+            if writer:
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+            progress.update(len(rows))
+    progress.finish()
+    return progress.done
+
+
+# --- Import ---
+def _read_records(path: str, fmt: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _chat_row(record: Dict, now: str) -> Tuple:
+    created_at = record.get("created_at") or now
+    return (
+        record.get("id") or str(uuid.uuid4()),
+        record.get("title") or (record.get("question") or "Untitled")[:40],
+        record.get("question") or "",
+        record.get("answer") or "",
+        int(str(record.get("pinned") or 0).lower() in ("1", "true")),
+        created_at,
+        record.get("updated_at") or created_at,
+    )
+
+
+def _message_row(record: Dict, now: str) -> Tuple:
+    return (record["thread_id"], int(record["seq"]), record["role"], record["content"], record.get("created_at") or now)
+
+
+def _archive_row(record: Dict, now: str) -> Tuple:
+    created_at = record.get("created_at") or now
+    return (
+        record["id"],
+        record.get("title") or "Untitled",
+        record["codec"],
+        base64.b64decode(record["question"]),
+        base64.b64decode(record["answer"]),
+        base64.b64decode(record["turns"]) if record.get("turns") else None,
+        created_at,
+        record.get("updated_at") or created_at,
+        record.get("archived_at") or now,
+    )
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_rows(
+    path: str, table: str = "chats", fmt: Optional[str] = None, replace: bool = False, batch_size: int = BATCH_SIZE
+) -> int:
+    """Inserts every record of a JSONL/CSV file; returns rows written.
+
+    Existing ids are kept unless `replace`, so re-running an import that
+    stopped halfway only adds what is missing.
+    """
+    fmt = _format(path, fmt)
+    columns = TABLES[table]
+    to_row = {"chats": _chat_row, "messages": _message_row, "chats_archive": _archive_row}[table]
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    now = datetime.now().isoformat()
+    progress = Progress(f"import {table}")
+    written = 0
+    for batch in _batches(_read_records(path, fmt), batch_size):
+        with ChatHistory.timed("import"), ChatHistory.connection() as conn, conn:
+            # rowcount leaves out the search index's trigger writes.
+            written += conn.executemany(sql, [to_row(record, now) for record in batch]).rowcount
+        progress.update(len(batch))
+    progress.finish()
+    return written
+
+
+# --- Legacy migration ---
+def _init_checkpoints(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migrations (
+            name TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL,
+            migrated INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _legacy_timestamp(value) -> str:
+    if not value:
+        return datetime.now().isoformat()
+    try:
+        return datetime.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return str(value)
+
+
+def migrate_legacy(
+    source: str = LEGACY_DB_PATH, batch_size: int = BATCH_SIZE, drop_legacy: bool = False
+) -> Dict[str, int]:
+    """Copies legacy chat_history rows into chats, resumably.
+
+    The source is read by rowid in batches; each batch and the checkpoint
+    recording its last rowid commit together, so a rerun after a crash
+    neither skips nor duplicates rows. `source` may be the chats database
+    itself; with `drop_legacy` the old table is then dropped once done.
+    """
+    name = f"legacy:{source}"
+    with ChatHistory.connection() as conn, conn:
+        _init_checkpoints(conn)
+        row = conn.execute("SELECT last_rowid, migrated, completed FROM migrations WHERE name = ?", (name,)).fetchone()
+    last_rowid, migrated, completed = row or (0, 0, 0)
+
+    legacy = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    try:
+        exists = legacy.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LEGACY_TABLE,)
+        ).fetchone()
+        if not exists:
+            return {"migrated": migrated, "legacy_rows": 0}
+        total = legacy.execute(f"SELECT COUNT(*) FROM {LEGACY_TABLE}").fetchone()[0]
+        remaining = legacy.execute(f"SELECT COUNT(*) FROM {LEGACY_TABLE} WHERE rowid > ?", (last_rowid,)).fetchone()[0]
+        progress = Progress("migrate", total, done=total - remaining)
+        while True:
+            rows = legacy.execute(
+                f"""
+                SELECT rowid, id, title, question, answer, pinned, timestamp FROM {LEGACY_TABLE}
+                WHERE rowid > ? ORDER BY rowid LIMIT ?
+                """,
+                (last_rowid, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            chats = [
+                _chat_row(
+                    {
+                        "id": chat_id, "title": title, "question": question, "answer": answer,
+                        "pinned": pinned, "created_at": _legacy_timestamp(timestamp),
+                    },
+                    "",
+                )
+                for _, chat_id, title, question, answer, pinned, timestamp in rows
+            ]
+            last_rowid = rows[-1][0]
+            with ChatHistory.timed("migrate"), ChatHistory.connection() as conn, conn:
+                migrated += conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO chats (id, title, question, answer, pinned, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    chats,
+                ).rowcount
+                conn.execute(
+                    """
+                    INSERT INTO migrations (name, last_rowid, migrated, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        last_rowid = excluded.last_rowid, migrated = excluded.migrated, updated_at = excluded.updated_at
+                    """,
+                    (name, last_rowid, migrated, datetime.now().isoformat()),
+                )
+            progress.update(len(rows))
+        progress.finish()
+    finally:
+        legacy.close()
+
+    with ChatHistory.connection() as conn, conn:
+        conn.execute("UPDATE migrations SET completed = 1 WHERE name = ?", (name,))
+        if drop_legacy and source == chat_history.DB_PATH:
+            conn.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}")
+    return {"migrated": migrated, "legacy_rows": total}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=chat_history.DB_PATH, help="chat history database")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write a table to JSONL or CSV")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--table", choices=sorted(TABLES), default="chats")
+    export_parser.add_argument("--format", choices=["jsonl", "csv"])
+    import_parser = commands.add_parser("import", help="load a JSONL or CSV file into a table")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--table", choices=sorted(TABLES), default="chats")
+    import_parser.add_argument("--format", choices=["jsonl", "csv"])
+    import_parser.add_argument("--replace", action="store_true", help="overwrite rows whose id already exists")
+    migrate_parser = commands.add_parser("migrate", help="copy the legacy chat_history table into chats")
+    migrate_parser.add_argument("--source", default=LEGACY_DB_PATH, help="database holding chat_history")
+    migrate_parser.add_argument("--drop-legacy", action="store_true", help="drop chat_history afterwards (same database only)")
+    args = parser.parse_args(argv)
+
+    chat_history.DB_PATH = args.db
+    if args.command == "export":
+        print(f"{export(args.path, args.table, args.format, args.batch_size)} rows exported")
+    elif args.command == "import":
+        print(f"{import_rows(args.path, args.table, args.format, args.replace, args.batch_size)} rows imported")
+    else:
+        print(json.dumps(migrate_legacy(args.source, args.batch_size, args.drop_legacy)))
+
+
+if __name__ == "__main__":
+    main()
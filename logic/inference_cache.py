@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict
+
+CACHE_DB_PATH = "data/inference_cache.db"
+TTL_SECONDS = int(os.environ.get("EDUMATE_INFERENCE_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_CACHE_MB = int(os.environ.get("EDUMATE_INFERENCE_CACHE_MB", "64"))
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().strip("?.! ").casefold()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def cache_key(task: str, model_id: str, level: str, question: str, context: str) -> str:
+    parts = [task, model_id, level, normalize_question(question), content_hash(context)]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class InferenceCache:
+    """SQLite-backed LRU + TTL cache of model outputs."""
+
+    def __init__(self, path: str = CACHE_DB_PATH, ttl_seconds: int = TTL_SECONDS, max_mb: int = MAX_CACHE_MB):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_mb * 1024 * 1024
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A cache lookup is one indexed statement; a single serialized
+        # connection is simpler than a pool and never the bottleneck.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS inference_cache (
+                    key TEXT PRIMARY KEY,
+                    task TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON inference_cache(last_access)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS inference_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def get_or_compute(self, task: str, model_id: str, level: str, question: str, context: str, compute: Callable[[], str]) -> str:
+        key = cache_key(task, model_id, level, question, context)
+        result = self.get(key)
+        if result is not None:
+            return result
+        result = compute()
+        self.put(key, task, result)
+        return result
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT result, size FROM inference_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self._bump("misses", 1)
+                return None
+            self._conn.execute(
+                "UPDATE inference_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._bump("hits", 1)
+            self._bump("bytes_saved", row[1])
+        return row[0]
+
+    def put(self, key: str, task: str, result: str):
+        now = time.time()
+        size = len(result.encode("utf-8", "surrogatepass"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO inference_cache (key, task, result, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, task, result, size, now, now),
+            )
+            self._evict(now)
+
+    def _bump(self, name: str, amount: int):
+        self._conn.execute(
+            """
+            INSERT INTO inference_cache_stats (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+            """,
+            (name, amount),
+        )
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM inference_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM inference_cache").fetchone()[0]
+        while total > self.max_bytes:
+            # Least recently used first, in small batches.
+            rows = self._conn.execute(
+                "SELECT key, size FROM inference_cache ORDER BY last_access LIMIT 32"
+            ).fetchall()
+            if not rows:
+                break
+            # Only as many as it takes to get back under the budget.
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM inference_cache WHERE key = ?", doomed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM inference_cache_stats").fetchall())
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM inference_cache"
+            ).fetchone()
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "bytes_saved": counters.get("bytes_saved", 0),
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+inference_cache = InferenceCache()
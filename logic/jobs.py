@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.environ.get("EDUMATE_JOB_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.environ.get("EDUMATE_MAX_PENDING_JOBS", "16"))
+JOB_TIMEOUT_SECONDS = int(os.environ.get("EDUMATE_JOB_TIMEOUT_SECONDS", "300"))
+# Finished jobs are kept this long so the session that submitted them can
+# pick up the result on its next poll.
+FINISHED_JOB_TTL_SECONDS = 600
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FINISHED_STATES = (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobTimedOut(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, fn: Callable[["Job"], Any], session_id: Optional[str], timeout: float, on_done: Optional[Callable[["Job", Any], None]], meta: Dict):
+        self.id = str(uuid.uuid4())
+        self.fn = fn
+        self.session_id = session_id
+        self.timeout = timeout
+        self.on_done = on_done
+        self.meta = meta
+        self.status = QUEUED
+        self.progress: Optional[float] = None
+        self.message = ""
+        # Text generated so far, for jobs that stream their answer.
+        self.partial = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        # Called by the job body at safe points; this is where cancellation
+        # and the per-job timeout take effect.
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        if self.started_at is not None and time.time() - self.started_at > self.timeout:
+            raise JobTimedOut(self.id)
+
+    def report(self, progress: Optional[float] = None, message: str = ""):
+        self.check()
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message:
+            self.message = message
+
+    def stream(self, text: str):
+        self.check()
+        self.partial = text
+
+
+class JobManager:
+    """Runs model work on a bounded thread pool so script threads never block."""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS, timeout: float = JOB_TIMEOUT_SECONDS):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="edumate-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        fn: Callable[[Job], Any],
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_done: Optional[Callable[[Job, Any], None]] = None,
+        **meta,
+    ) -> str:
+        job = Job(fn, session_id, timeout or self.timeout, on_done, meta)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs already pending")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, session_id: str) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def cancel_session(self, session_id: str):
+        for job in self.jobs_for(session_id):
+            if not job.finished:
+                job.cancel()
+
+    def _run(self, job: Job):
+        job.started_at = time.time()
+        status = DONE
+        try:
+            job.check()
+            job.status = RUNNING
+            result = job.fn(job)
+            job.check()
+            if job.on_done is not None:
+                job.on_done(job, result)
+            job.result = result
+        except JobCancelled:
+            status = CANCELLED
+        except JobTimedOut:
+            status = TIMED_OUT
+            job.error = f"Timed out after {job.timeout:g}s"
+        except Exception as e:
+            status = FAILED
+            job.error = str(e)
+        # finished_at must be set before the status flips to a finished state.
+        job.finished_at = time.time()
+        job.status = status
+
+    def _prune(self):
+        cutoff = time.time() - FINISHED_JOB_TTL_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+
+job_manager = JobManager()
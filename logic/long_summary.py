@@ -0,0 +1,180 @@
+import os
+import re
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from logic.streaming import stream_text
+
+CHUNK_BATCH_SIZE = int(os.environ.get("EDUMATE_SUMMARY_BATCH_SIZE", "4"))
+MAX_REDUCE_DEPTH = int(os.environ.get("EDUMATE_SUMMARY_REDUCE_DEPTH", "3"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("EDUMATE_SUMMARY_CHUNK_OVERLAP", "32"))
+PARTIAL_MAX_LENGTH = 120
+# Lines are tokenized in groups so the fast tokenizer can batch them.
+_TOKENIZE_GROUP = 64
+# Some tokenizers report a huge sentinel when the model has no fixed limit.
+_FALLBACK_MAX_TOKENS = 512
+
+
+def input_budget(tokenizer, prefix: str = "") -> int:
+    max_tokens = getattr(tokenizer, "model_max_length", _FALLBACK_MAX_TOKENS)
+    if not max_tokens or max_tokens > 100_000:
+        max_tokens = _FALLBACK_MAX_TOKENS
+    prefix_tokens = len(tokenizer(prefix, add_special_tokens=False)["input_ids"]) if prefix else 0
+    # Leave room for the special tokens the pipeline adds back.
+    return max_tokens - prefix_tokens - 2
+
+
+def _iter_line_groups(text: str) -> Iterator[List[str]]:
+    group = []
+    for match in re.finditer(r"[^\n]+", text):
+        line = match.group().strip()
+        if line:
+            group.append(line)
+        if len(group) >= _TOKENIZE_GROUP:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def iter_token_chunks(tokenizer, text: str, max_tokens: int, overlap: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    # Streams the text a few lines at a time, so only one chunk's worth of
+    # token ids is ever held regardless of the document length.
+    overlap = min(overlap, max_tokens // 4)
+    buffer: List[int] = []
+    emitted = False
+    for group in _iter_line_groups(text):
+        for ids in tokenizer(group, add_special_tokens=False)["input_ids"]:
+            buffer.extend(ids)
+            while len(buffer) >= max_tokens:
+                yield tokenizer.decode(buffer[:max_tokens], skip_special_tokens=True)
+                emitted = True
+                buffer = buffer[max_tokens - overlap:]
+    # After the first chunk, the last `overlap` tokens were already emitted.
+    if len(buffer) > (overlap if emitted else 0):
+        yield tokenizer.decode(buffer, skip_special_tokens=True)
+
+
+def _count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+class _Reducer:
+    """Hierarchical reduce that folds partial summaries as they arrive.
+
+    Level k holds summaries of summaries k deep. A level is folded into the
+    next one as soon as it holds a full batch of chunks, so memory is bounded
+    by batch_size * max_depth chunks no matter how long the document is.
+    """
+
+    def __init__(self, summarize_batch: Callable[[List[str]], List[str]], tokenizer, budget: int, batch_size: int, max_depth: int):
+        self.summarize_batch = summarize_batch
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.batch_size = batch_size
+        self.max_depth = max(1, max_depth)
+        self.levels: List[List[str]] = [[] for _ in range(self.max_depth)]
+        self.level_tokens = [0] * self.max_depth
+        self.passes = 0
+
+    def add(self, level: int, summaries: List[str]):
+        self.levels[level].extend(summaries)
+        self.level_tokens[level] += sum(_count_tokens(self.tokenizer, s) for s in summaries)
+        if self.level_tokens[level] >= self.budget * self.batch_size:
+            self._fold(level)
+
+    def _fold(self, level: int):
+        texts, self.levels[level], self.level_tokens[level] = self.levels[level], [], 0
+        summaries = self.reduce_once(texts)
+        # The deepest level compacts into itself instead of growing forever.
+        self.add(min(level + 1, self.max_depth - 1), summaries)
+
+    def reduce_once(self, texts: List[str]) -> List[str]:
+        chunks = list(iter_token_chunks(self.tokenizer, "\n".join(texts), self.budget, overlap=0))
+        self.passes += 1
+        summaries = []
+        for start in range(0, len(chunks), self.batch_size):
+            summaries.extend(self.summarize_batch(chunks[start:start + self.batch_size]))
+        return summaries
+
+    def remaining(self) -> List[str]:
+        # Deeper levels summarize earlier parts of the document, so they come first.
+        texts = []
+        for level in reversed(self.levels):
+            texts.extend(level)
+        return texts
+
+
+def summarize_long(
+    pipe,
+    text: str,
+    max_length: int = 130,
+    min_length: int = 30,
+    prefix: str = "",
+    batch_size: int = CHUNK_BATCH_SIZE,
+    max_depth: int = MAX_REDUCE_DEPTH,
+    progress: Optional[Callable[[int], None]] = None,
+    stats: Optional[Dict] = None,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> str:
+    tokenizer = pipe.tokenizer
+    budget = input_budget(tokenizer, prefix)
+    partial_max = min(PARTIAL_MAX_LENGTH, max_length)
+    partial_min = min(min_length, partial_max // 2)
+
+    def summarize_batch(chunks: List[str], max_len: int = partial_max, min_len: int = partial_min) -> List[str]:
+        outputs = pipe(
+            [prefix + chunk for chunk in chunks],
+            max_length=max_len,
+            min_length=min_len,
+            truncation=True,
+            batch_size=len(chunks),
+        )
+        return [out["summary_text"] for out in outputs]
+
+    started = time.perf_counter()
+    reducer = _Reducer(summarize_batch, tokenizer, budget, batch_size, max_depth)
+    chunk_count = 0
+    first_chunk = None
+    batch: List[str] = []
+    for chunk in iter_token_chunks(tokenizer, text, budget):
+        chunk_count += 1
+        if chunk_count == 1:
+            # Hold the first chunk back: a document that fits in one window
+            # is summarized directly, exactly as before.
+            first_chunk = chunk
+            continue
+        if first_chunk is not None:
+            batch.append(first_chunk)
+            first_chunk = None
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            reducer.add(0, summarize_batch(batch))
+            batch = []
+            if progress:
+                progress(chunk_count)
+    if first_chunk is not None:
+        remaining = [first_chunk]
+    else:
+        if batch:
+            reducer.add(0, summarize_batch(batch))
+        remaining = reducer.remaining()
+        while sum(_count_tokens(tokenizer, t) for t in remaining) > budget:
+            remaining = reducer.reduce_once(remaining)
+
+    if not remaining:
+        summary = ""
+    elif on_text:
+        # Only the final pass is user-visible, so only it is streamed.
+        summary = stream_text(pipe, prefix + "\n".join(remaining), max_length, min_length, on_text)
+    else:
+        summary = summarize_batch(["\n".join(remaining)], max_length, min_length)[0]
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        stats.update(
+            chunks=chunk_count,
+            reduce_passes=reducer.passes,
+            seconds=round(elapsed, 3),
+            chunks_per_sec=round(chunk_count / elapsed, 2) if elapsed else 0.0,
+        )
+    return summary
@@ -0,0 +1,170 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+METRICS_DIR = os.environ.get("EDUMATE_METRICS_DIR", "data/metrics")
+EXPORT_INTERVAL_SECONDS = float(os.environ.get("EDUMATE_METRICS_EXPORT_SECONDS", "15"))
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation, capped at
+        # the worst one seen so the overflow bucket still reads sensibly.
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class Metrics:
+    """In-process latency histograms, keyed by dotted span name."""
+
+    def __init__(self):
+        self._histograms: Dict[str, _Histogram] = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def observe(self, name: str, elapsed_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.observe(elapsed_ms)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        # Also usable as a decorator: @metrics.span("history.get_chat").
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self, prefix: str = "") -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count,
+                    "avg_ms": round(h.total_ms / h.count, 3),
+                    "p50_ms": round(h.quantile(0.5), 3),
+                    "p95_ms": round(h.quantile(0.95), 3),
+                    "max_ms": round(h.max_ms, 3),
+                    "total_ms": round(h.total_ms, 3),
+                }
+                for name, h in sorted(self._histograms.items())
+                if name.startswith(prefix) and h.count
+            }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP edumate_span_seconds Time spent in an instrumented stage.",
+            "# TYPE edumate_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS, h.counts):
+                    cumulative += count
+                    lines.append(f'edumate_span_seconds_bucket{{span="{name}",le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'edumate_span_seconds_bucket{{span="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'edumate_span_seconds_sum{{span="{name}"}} {h.total_ms / 1000:.6f}')
+                lines.append(f'edumate_span_seconds_count{{span="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = METRICS_DIR) -> List[str]:
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for filename, body in (
+            ("edumate.prom", self.to_prometheus()),
+            ("edumate.json", json.dumps(self.snapshot(), indent=2)),
+        ):
+            path = os.path.join(directory, filename)
+            # Write-then-rename so a scraper never reads a half-written file.
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+            paths.append(path)
+        self._last_export = time.monotonic()
+        return paths
+
+    def maybe_export(self, directory: str = METRICS_DIR) -> Optional[List[str]]:
+        if time.monotonic() - self._last_export < EXPORT_INTERVAL_SECONDS:
+            return None
+        return self.export(directory)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class ProfileCapture:
+    """Profiles the calling thread from start() to stop() with cProfile or pyinstrument."""
+
+    def __init__(self, kind: str = "cprofile", directory: str = os.path.join(METRICS_DIR, "profiles")):
+        self.kind = kind
+        self.directory = directory
+        if kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError as e:
+                raise RuntimeError("pyinstrument profiling needs `pip install pyinstrument`") from e
+            self._profiler = Profiler()
+        else:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> "ProfileCapture":
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return self
+
+    def stop(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            path = os.path.join(self.directory, f"rerun-{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            return path
+        import io
+        import pstats
+
+        self._profiler.disable()
+        path = os.path.join(self.directory, f"rerun-{stamp}.txt")
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        self._profiler.dump_stats(path[:-4] + ".prof")
+        return path
+
+
+metrics = Metrics()
+span = metrics.span
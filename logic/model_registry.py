@@ -0,0 +1,211 @@
+import ctypes
+import gc
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from logic.backends import build_pipeline
+from logic.batching import BatchedPipeline
+from logic.metrics import span
+
+MEMORY_BUDGET_MB = int(os.environ.get("EDUMATE_MODEL_MEMORY_MB", "2048"))
+MICRO_BATCHING = os.environ.get("EDUMATE_MICRO_BATCHING", "1") == "1"
+IDLE_TIMEOUT_SECONDS = int(os.environ.get("EDUMATE_MODEL_IDLE_SECONDS", "1800"))
+# Session reference held by a preload; it ages out like a closed tab's.
+PRELOAD_SESSION = "<preload>"
+
+# (task, model, device, dtype)
+ModelKey = Tuple[str, str, int, str]
+
+
+@span("model.load")
+def load_pipeline(task: str, model: str, device: int, dtype: str):
+    # The backend (fp32, int8, onnx) is process-wide; see logic.backends.
+    pipe = build_pipeline(task, model, device, dtype)
+    # Concurrent callers share padded forward passes instead of batches of one.
+    return BatchedPipeline(pipe) if MICRO_BATCHING else pipe
+
+
+def resident_bytes(pipe) -> int:
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    seen = set()
+    total = 0
+    for tensor in itertools.chain(model.parameters(), model.buffers()):
+        # Tied weights (e.g. shared embeddings) are only resident once.
+        if tensor.data_ptr() in seen:
+            continue
+        seen.add(tensor.data_ptr())
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _release_freed_memory():
+    gc.collect()
+    # Nothing was ever put on a GPU if torch has not even been imported.
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    try:
+        # glibc keeps freed arenas mapped; hand them back to the OS.
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _Entry:
+    def __init__(self, pipe, size_bytes: int):
+        self.pipeline = pipe
+        self.size_bytes = size_bytes
+        self.sessions: Dict[str, float] = {}
+        self.last_used = time.monotonic()
+        self.load_seconds = 0.0
+
+
+class ModelRegistry:
+    """Process-wide, thread-safe cache of loaded pipelines shared by all sessions."""
+
+    def __init__(
+        self,
+        loader: Callable = load_pipeline,
+        memory_budget_mb: int = MEMORY_BUDGET_MB,
+        idle_timeout: int = IDLE_TIMEOUT_SECONDS,
+    ):
+        self._loader = loader
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+
+    def acquire(self, session_id: Optional[str], task: str, model: str, device: int = -1, dtype: str = "float32"):
+        key = (task, model, device, dtype)
+        # Lookup and session registration happen under one hold of the lock,
+        # so an eviction can never close a pipeline between the two.
+        with self._lock:
+            pipe = self._use(key, session_id)
+            if pipe is not None:
+                return pipe
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; the others wait for it here.
+        with load_lock:
+            with self._lock:
+                pipe = self._use(key, session_id)
+            if pipe is not None:
+                return pipe
+            started = time.perf_counter()
+            pipe = self._loader(task, model, device, dtype)
+            entry = _Entry(pipe, resident_bytes(pipe))
+            entry.load_seconds = time.perf_counter() - started
+            with self._lock:
+                self._entries[key] = entry
+                self._touch(key, entry, session_id)
+                freed = self._evict(keep=key)
+            if freed:
+                _release_freed_memory()
+            return entry.pipeline
+
+    def preload(self, task: str, model: str, device: int = -1, dtype: str = "float32"):
+        # Loads ahead of first use under a placeholder session, which keeps
+        # the model resident until a real session picks it up or the idle
+        # timeout expires the placeholder.
+        self.acquire(PRELOAD_SESSION, task, model, device, dtype)
+
+    def is_loaded(self, task: str, model: str, device: int = -1, dtype: str = "float32") -> bool:
+        with self._lock:
+            return (task, model, device, dtype) in self._entries
+
+    def release(self, session_id: Optional[str], key: Optional[ModelKey] = None):
+        with self._lock:
+            if key is None:
+                entries = list(self._entries.values())
+            else:
+                entries = [self._entries[key]] if key in self._entries else []
+            for entry in entries:
+                entry.sessions.pop(session_id, None)
+
+    def evict(self, unreferenced: bool = True) -> int:
+        # Returns the number of bytes released.
+        with self._lock:
+            freed = self._evict(drop_unreferenced=unreferenced)
+        if freed:
+            _release_freed_memory()
+        return freed
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._entries.values())
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "task": key[0],
+                    "model": key[1],
+                    "device": key[2],
+                    "dtype": key[3],
+                    "size_mb": round(entry.size_bytes / (1024 * 1024), 1),
+                    "sessions": len(entry.sessions),
+                    "idle_seconds": int(now - entry.last_used),
+                    "load_seconds": round(entry.load_seconds, 2),
+                    "batching": entry.pipeline.stats() if isinstance(entry.pipeline, BatchedPipeline) else None,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def _use(self, key: ModelKey, session_id: Optional[str]):
+        # Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._touch(key, entry, session_id)
+        return entry.pipeline
+
+    def _touch(self, key: ModelKey, entry: _Entry, session_id: Optional[str]):
+        entry.last_used = time.monotonic()
+        if session_id == PRELOAD_SESSION:
+            # Only holds a model no real session is using yet.
+            if not entry.sessions:
+                entry.sessions[session_id] = entry.last_used
+        elif session_id is not None:
+            entry.sessions[session_id] = entry.last_used
+            # A real session has picked the model up; the placeholder's job
+            # is done and must not pin it any longer.
+            entry.sessions.pop(PRELOAD_SESSION, None)
+        self._entries.move_to_end(key)
+
+    def _expire_sessions(self, entry: _Entry, now: float):
+        # Browser tabs that were closed never release; age them out instead.
+        for session_id, last_seen in list(entry.sessions.items()):
+            if now - last_seen > self.idle_timeout:
+                del entry.sessions[session_id]
+
+    def _evict(self, keep: Optional[ModelKey] = None, drop_unreferenced: bool = False) -> int:
+        now = time.monotonic()
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        freed = 0
+        # Least recently used first.
+        for key, entry in list(self._entries.items()):
+            if key == keep:
+                continue
+            self._expire_sessions(entry, now)
+            if entry.sessions:
+                continue
+            idle = now - entry.last_used > self.idle_timeout
+            if drop_unreferenced or idle or total - freed > self.memory_budget_bytes:
+                del self._entries[key]
+                close = getattr(entry.pipeline, "close", None)
+                if close is not None:
+                    close()
+                freed += entry.size_bytes
+        return freed
+
+
+registry = ModelRegistry()
@@ -0,0 +1,178 @@
+"""Local safetensors copies of the app's models, loaded through mmap.
+
+    python -m logic.model_store prepare
+    python -m logic.model_store report --match streamlit
+
+`prepare` downloads each model once and writes it as a single
+model.safetensors plus config and tokenizer files under MODEL_DIR. Workers
+then build pipelines from that directory without network access, and the
+weight tensors are views over a read-only file mapping, so every process
+on the host shares one physical copy through the page cache.
+"""
+import argparse
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+from logic.startup import import_module
+
+MODEL_DIR = os.environ.get("EDUMATE_MODEL_DIR", "data/models")
+WEIGHTS_FILE = "model.safetensors"
+
+# Every model app.py and logic/ load, as (task, model).
+MODELS: List[Tuple[str, str]] = [
+    ("question-answering", "deepset/tinyroberta-squad2"),
+    ("summarization", "t5-small"),
+    ("text2text-generation", "google/flan-t5-small"),
+    ("summarization", "facebook/bart-large-cnn"),
+]
+
+
+def _auto_class(task: str):
+    transformers = import_module("transformers")
+    if task == "question-answering":
+        return transformers.AutoModelForQuestionAnswering
+    return transformers.AutoModelForSeq2SeqLM
+
+
+def prepared_path(model: str, directory: str = MODEL_DIR) -> str:
+    return os.path.join(directory, model.replace("/", "--"))
+
+
+def is_prepared(model: str, directory: str = MODEL_DIR) -> bool:
+    return os.path.exists(os.path.join(prepared_path(model, directory), WEIGHTS_FILE))
+
+
+def prepare(task: str, model: str, directory: str = MODEL_DIR, force: bool = False) -> str:
+    path = prepared_path(model, directory)
+    if is_prepared(model, directory) and not force:
+        return path
+    transformers = import_module("transformers")
+    staging = path + ".partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    loaded = _auto_class(task).from_pretrained(model)
+    # One unsharded file, so a worker maps the whole model in one go.
+    loaded.save_pretrained(staging, safe_serialization=True, max_shard_size="100GB")
+    transformers.AutoTokenizer.from_pretrained(model).save_pretrained(staging)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return path
+
+
+def check_loaded_keys(built, result, path: str):
+    """Raises unless every weight came from the file.
+
+    With strict=False a missing or renamed tensor would silently keep its
+    random initialization. Only tied weights may be absent, since
+    tie_weights() points them at the tensor they share.
+    """
+    tied = set(getattr(built, "_tied_weights_keys", None) or ())
+    missing = sorted(set(result.missing_keys) - tied)
+    unexpected = sorted(result.unexpected_keys)
+    if missing or unexpected:
+        raise RuntimeError(
+            f"{path}/{WEIGHTS_FILE} does not match the model (missing: {missing or 'none'}, "
+            f"unexpected: {unexpected or 'none'}); rerun `python -m logic.model_store prepare --force`"
+        )
+
+
+def load_mmap_pipeline(task: str, model: str, device: int = -1, dtype: str = "float32", directory: str = MODEL_DIR):
+    torch = import_module("torch")
+    transformers = import_module("transformers")
+    safetensors_torch = import_module("safetensors.torch")
+    path = prepared_path(model, directory)
+
+    config = transformers.AutoConfig.from_pretrained(path, local_files_only=True)
+    built = _auto_class(task).from_config(config)
+    # safetensors hands back tensors over a private, read-only mapping of the
+    # file; assign=True makes them the parameters instead of copying into the
+    # freshly initialized ones, which are then freed.
+    state = safetensors_torch.load_file(os.path.join(path, WEIGHTS_FILE), device="cpu")
+    check_loaded_keys(built, built.load_state_dict(state, strict=False, assign=True), path)
+    built.tie_weights()
+    built.eval()
+    if dtype != "float32" or device != -1:
+        # Any cast or device move makes a private copy; only fp32 on CPU shares.
+        built = built.to(dtype=getattr(torch, dtype), device="cpu" if device == -1 else f"cuda:{device}")
+    tokenizer = transformers.AutoTokenizer.from_pretrained(path, local_files_only=True)
+    return transformers.pipeline(task, model=built, tokenizer=tokenizer, device=device)
+
+
+def _read_smaps_rollup(pid) -> Optional[Dict[str, int]]:
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+    return fields
+
+
+def memory_report(pid="self") -> Optional[Dict[str, float]]:
+    """Unique vs shared resident memory of one process, in MB (Linux only).
+
+    unique_mb is what the process would give back if it exited; shared_mb
+    is mapped pages other processes also hold, such as mmap'd weights.
+    """
+    fields = _read_smaps_rollup(pid)
+    if fields is None:
+        return None
+    unique = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "unique_mb": round(unique / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+    }
+
+
+def matching_pids(pattern: str) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if pattern in cmdline and int(entry) != os.getpid():
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    prepare_parser = commands.add_parser("prepare", help="write safetensors copies of the models")
+    prepare_parser.add_argument("--model", action="append", help="only this model (repeatable)")
+    prepare_parser.add_argument("--force", action="store_true")
+    report_parser = commands.add_parser("report", help="unique vs shared memory per process")
+    report_parser.add_argument("--match", default="streamlit", help="substring of the worker command line")
+    report_parser.add_argument("--pid", type=int, action="append")
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        for task, model in MODELS:
+            if args.model and model not in args.model:
+                continue
+            print(f"{model}: {prepare(task, model, force=args.force)}")
+        return
+
+    pids = args.pid or matching_pids(args.match)
+    processes = {pid: memory_report(pid) for pid in pids}
+    processes = {pid: report for pid, report in processes.items() if report}
+    total = {
+        "unique_mb": round(sum(r["unique_mb"] for r in processes.values()), 1),
+        "pss_mb": round(sum(r["pss_mb"] for r in processes.values()), 1),
+    }
+    print(json.dumps({"processes": processes, "total": total}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
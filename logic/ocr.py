@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List
+
+import pytesseract
+from PIL import Image, ImageOps, ImageSequence
+
+# Tesseract is found on PATH unless a binary is configured explicitly.
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "")
+OCR_LANG = os.environ.get("EDUMATE_OCR_LANG", "eng")
+TARGET_DPI = int(os.environ.get("EDUMATE_OCR_DPI", "300"))
+# Phone photos rarely carry a usable DPI; cap the long side instead.
+MAX_SIDE = int(os.environ.get("EDUMATE_OCR_MAX_SIDE", "2400"))
+STRIP_HEIGHT = int(os.environ.get("EDUMATE_OCR_STRIP_HEIGHT", "1200"))
+STRIP_OVERLAP = int(os.environ.get("EDUMATE_OCR_STRIP_OVERLAP", "60"))
+OCR_WORKERS = int(os.environ.get("EDUMATE_OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+# Strips already run in parallel; stop each tesseract process from also
+# spreading itself over every core.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def ocr_settings() -> Dict:
+    return {
+        "lang": OCR_LANG,
+        "dpi": TARGET_DPI,
+        "max_side": MAX_SIDE,
+        "strip_height": STRIP_HEIGHT,
+        "strip_overlap": STRIP_OVERLAP,
+    }
+
+
+def _otsu_threshold(gray: Image.Image) -> int:
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for threshold, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += threshold * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+
+def preprocess(image: Image.Image, target_dpi: int = TARGET_DPI, max_side: int = MAX_SIDE) -> Image.Image:
+    image = ImageOps.exif_transpose(image)
+    scale = 1.0
+    dpi = image.info.get("dpi", (0, 0))[0]
+    if dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+    scale = min(scale, max_side / max(image.size))
+    gray = image.convert("L")
+    if scale < 1.0:
+        gray = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))), Image.LANCZOS)
+    gray = ImageOps.autocontrast(gray)
+    threshold = _otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+
+def split_strips(image: Image.Image, strip_height: int = STRIP_HEIGHT, overlap: int = STRIP_OVERLAP) -> List[Image.Image]:
+    # Only split images tall enough to be worth it; strips overlap so a text
+    # line cut at one boundary is whole in the neighbouring strip.
+    if image.height <= strip_height * 1.5:
+        return [image]
+    strips = []
+    top = 0
+    while top < image.height:
+        bottom = min(top + strip_height, image.height)
+        strips.append(image.crop((0, top, image.width, bottom)))
+        if bottom == image.height:
+            break
+        top = bottom - overlap
+    return strips
+
+
+def _merge_strip_texts(texts: List[str]) -> str:
+    lines: List[str] = []
+    for text in texts:
+        new_lines = [line for line in text.splitlines() if line.strip()]
+        # Drop lines the overlap region made tesseract read twice.
+        for k in range(min(5, len(lines), len(new_lines)), 0, -1):
+            if [line.strip() for line in lines[-k:]] == [line.strip() for line in new_lines[:k]]:
+                new_lines = new_lines[k:]
+                break
+        lines.extend(new_lines)
+    return "\n".join(lines)
+
+
+def _ocr_strip(strip: Image.Image, lang: str) -> str:
+    return pytesseract.image_to_string(strip, lang=lang)
+
+
+def iter_frames(image: Image.Image) -> Iterator[Image.Image]:
+    # Multi-page TIFFs carry one page per frame.
+    for frame in ImageSequence.Iterator(image):
+        yield frame.copy()
+
+
+def _frame_strips(image_file) -> List[List[Image.Image]]:
+    image = Image.open(image_file)
+    return [split_strips(preprocess(frame)) for frame in iter_frames(image)]
+
+
+def ocr_batch(image_files: Iterable, lang: str = OCR_LANG, workers: int = OCR_WORKERS) -> List[str]:
+    documents = [_frame_strips(image_file) for image_file in image_files]
+    strips = [strip for frames in documents for strip_group in frames for strip in strip_group]
+    if not strips:
+        return ["" for _ in documents]
+
+    # pytesseract shells out to tesseract, so threads are enough to keep one
+    # tesseract process busy per core across every strip of every upload.
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(strips)))) as pool:
+        texts = iter(list(pool.map(lambda strip: _ocr_strip(strip, lang), strips)))
+
+    results = []
+    for frames in documents:
+        pages = [_merge_strip_texts([next(texts) for _ in strip_group]) for strip_group in frames]
+        results.append("\n\n".join(page for page in pages if page).strip())
+    return results
+
+
+def ocr_image(image_file, lang: str = OCR_LANG, workers: int = OCR_WORKERS) -> str:
+    return ocr_batch([image_file], lang=lang, workers=workers)[0]
@@ -0,0 +1,306 @@
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from logic import chat_history
+from logic.chat_history import ChatHistory
+from logic.inference_cache import normalize_question
+
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+
+class ProgressStore:
+    """Quiz attempts, answers and study-plan steps, in the chats database.
+
+    Per-student and per-topic counters live in rollup tables that triggers
+    keep current on every write, so reading a dashboard is a primary-key
+    lookup however many attempts lie behind it.
+    """
+
+    @staticmethod
+    def connection():
+        path = chat_history.DB_PATH
+        if path not in _initialized_paths:
+            ProgressStore.init_db()
+        return ChatHistory.connection()
+
+    @staticmethod
+    def init_db():
+        path = chat_history.DB_PATH
+        with _init_lock:
+            if path in _initialized_paths:
+                return
+            with ChatHistory.timed("progress.init_db"), ChatHistory.connection() as conn, conn:
+                ProgressStore._create(conn)
+            _initialized_paths.add(path)
+
+    @staticmethod
+    def _create(conn):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS quiz_attempts (
+                id INTEGER PRIMARY KEY,
+                student_id TEXT NOT NULL,
+                topic_key TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                level TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                correct INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                taken_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_attempts_student ON quiz_attempts(student_id, taken_at);
+
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                attempt_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                chosen INTEGER,
+                correct_index INTEGER NOT NULL,
+                is_correct INTEGER NOT NULL,
+                PRIMARY KEY (attempt_id, position)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS study_plans (
+                id TEXT PRIMARY KEY,
+                student_id TEXT NOT NULL,
+                goal TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_plans_student ON study_plans(student_id, created_at);
+
+            CREATE TABLE IF NOT EXISTS study_steps (
+                plan_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                student_id TEXT NOT NULL,
+                step TEXT NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                completed_at TEXT,
+                PRIMARY KEY (plan_id, position)
+            ) WITHOUT ROWID;
+
+            -- Rollups, written only by the triggers below.
+            CREATE TABLE IF NOT EXISTS student_stats (
+                student_id TEXT PRIMARY KEY,
+                quizzes_taken INTEGER NOT NULL DEFAULT 0,
+                questions_answered INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                current_streak INTEGER NOT NULL DEFAULT 0,
+                best_streak INTEGER NOT NULL DEFAULT 0,
+                last_day TEXT,
+                steps_completed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS topic_stats (
+                student_id TEXT NOT NULL,
+                topic_key TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                questions INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (student_id, topic_key)
+            ) WITHOUT ROWID;
+
+            -- A streak counts consecutive days with at least one quiz; a
+            -- quiz on the day after last_day extends it, a gap restarts it.
+            CREATE TRIGGER IF NOT EXISTS quiz_attempts_rollup_insert AFTER INSERT ON quiz_attempts BEGIN
+                INSERT INTO student_stats (student_id, quizzes_taken, questions_answered, correct,
+                                           current_streak, best_streak, last_day)
+                VALUES (new.student_id, 1, new.total, new.correct, 1, 1, new.day)
+                ON CONFLICT (student_id) DO UPDATE SET
+                    quizzes_taken = quizzes_taken + 1,
+                    questions_answered = questions_answered + excluded.questions_answered,
+                    correct = correct + excluded.correct,
+                    current_streak = CASE
+                        WHEN last_day >= excluded.last_day THEN current_streak
+                        WHEN last_day = date(excluded.last_day, '-1 day') THEN current_streak + 1
+                        ELSE 1 END,
+                    best_streak = MAX(best_streak, CASE
+                        WHEN last_day >= excluded.last_day THEN current_streak
+                        WHEN last_day = date(excluded.last_day, '-1 day') THEN current_streak + 1
+                        ELSE 1 END),
+                    last_day = MAX(last_day, excluded.last_day);
+                INSERT INTO topic_stats (student_id, topic_key, topic, attempts, questions, correct)
+                VALUES (new.student_id, new.topic_key, new.topic, 1, new.total, new.correct)
+                ON CONFLICT (student_id, topic_key) DO UPDATE SET
+                    topic = excluded.topic,
+                    attempts = attempts + 1,
+                    questions = questions + excluded.questions,
+                    correct = correct + excluded.correct;
+            END;
+            -- Deleting attempts takes back their counts; streaks are left as
+            -- they were, since they describe days already past.
+            CREATE TRIGGER IF NOT EXISTS quiz_attempts_rollup_delete AFTER DELETE ON quiz_attempts BEGIN
+                UPDATE student_stats SET
+                    quizzes_taken = quizzes_taken - 1,
+                    questions_answered = questions_answered - old.total,
+                    correct = correct - old.correct
+                WHERE student_id = old.student_id;
+                UPDATE topic_stats SET
+                    attempts = attempts - 1,
+                    questions = questions - old.total,
+                    correct = correct - old.correct
+                WHERE student_id = old.student_id AND topic_key = old.topic_key;
+                DELETE FROM topic_stats
+                WHERE student_id = old.student_id AND topic_key = old.topic_key AND attempts <= 0;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS study_steps_rollup_insert AFTER INSERT ON study_steps
+            WHEN new.completed BEGIN
+                INSERT INTO student_stats (student_id, steps_completed) VALUES (new.student_id, 1)
+                ON CONFLICT (student_id) DO UPDATE SET steps_completed = steps_completed + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS study_steps_rollup_update AFTER UPDATE OF completed ON study_steps
+            WHEN new.completed != old.completed BEGIN
+                INSERT INTO student_stats (student_id, steps_completed) VALUES (new.student_id, new.completed)
+                ON CONFLICT (student_id) DO UPDATE SET
+                    steps_completed = steps_completed + new.completed - old.completed;
+            END;
+            CREATE TRIGGER IF NOT EXISTS study_steps_rollup_delete AFTER DELETE ON study_steps
+            WHEN old.completed BEGIN
+                UPDATE student_stats SET steps_completed = steps_completed - 1
+                WHERE student_id = old.student_id;
+            END;
+            """
+        )
+
+    @staticmethod
+    def record_quiz(
+        student_id: str,
+        topic: str,
+        level: str,
+        questions: Sequence[str],
+        chosen: Sequence[Optional[int]],
+        correct_indices: Sequence[int],
+    ) -> int:
+        """Stores one submitted quiz with its answers; returns the attempt id."""
+        answers = [
+            (i, question, pick, answer, int(pick == answer))
+            for i, (question, pick, answer) in enumerate(zip(questions, chosen, correct_indices))
+        ]
+        now = datetime.now()
+        with ChatHistory.timed("progress.record_quiz"), ProgressStore.connection() as conn, conn:
+            attempt_id = conn.execute(
+                """
+                INSERT INTO quiz_attempts (student_id, topic_key, topic, level, total, correct, day, taken_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    student_id,
+                    normalize_question(topic),
+                    topic.strip(),
+                    level,
+                    len(answers),
+                    sum(row[4] for row in answers),
+                    now.date().isoformat(),
+                    now.isoformat(),
+                ),
+            ).lastrowid
+            conn.executemany(
+                """
+                INSERT INTO quiz_answers (attempt_id, position, question, chosen, correct_index, is_correct)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [(attempt_id, *row) for row in answers],
+            )
+        return attempt_id
+
+    @staticmethod
+    def save_plan(student_id: str, goal: str, steps: Sequence[str]) -> str:
+        plan_id = str(uuid.uuid4())
+        with ChatHistory.timed("progress.save_plan"), ProgressStore.connection() as conn, conn:
+            conn.execute(
+                "INSERT INTO study_plans (id, student_id, goal, created_at) VALUES (?, ?, ?, ?)",
+                (plan_id, student_id, goal, datetime.now().isoformat()),
+            )
+            conn.executemany(
+                "INSERT INTO study_steps (plan_id, position, student_id, step) VALUES (?, ?, ?, ?)",
+                [(plan_id, i, student_id, step) for i, step in enumerate(steps)],
+            )
+        return plan_id
+
+    @staticmethod
+    def latest_plan(student_id: str) -> Optional[Tuple[str, List[Dict]]]:
+        with ChatHistory.timed("progress.latest_plan"), ProgressStore.connection() as conn:
+            row = conn.execute(
+                "SELECT id FROM study_plans WHERE student_id = ? ORDER BY created_at DESC LIMIT 1",
+                (student_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            steps = conn.execute(
+                "SELECT step, completed FROM study_steps WHERE plan_id = ? ORDER BY position",
+                (row[0],),
+            ).fetchall()
+        return row[0], [{"step": step, "completed": bool(done)} for step, done in steps]
+
+    @staticmethod
+    def set_step(plan_id: str, position: int, completed: bool):
+        with ChatHistory.timed("progress.set_step"), ProgressStore.connection() as conn, conn:
+            conn.execute(
+                """
+                UPDATE study_steps SET completed = ?, completed_at = ?
+                WHERE plan_id = ? AND position = ? AND completed != ?
+                """,
+                (int(completed), datetime.now().isoformat() if completed else None, plan_id, position, int(completed)),
+            )
+
+    @staticmethod
+    def summary(student_id: str) -> Dict:
+        """The dashboard counters for one student, read from the rollup."""
+        with ChatHistory.timed("progress.summary"), ProgressStore.connection() as conn:
+            row = conn.execute(
+                """
+                SELECT quizzes_taken, questions_answered, correct, current_streak, best_streak,
+                       last_day, steps_completed
+                FROM student_stats WHERE student_id = ?
+                """,
+                (student_id,),
+            ).fetchone()
+        taken, answered, correct, streak, best, last_day, steps = row or (0, 0, 0, 0, 0, None, 0)
+        # A streak whose last quiz was before yesterday has already lapsed.
+        if last_day and (date.today() - date.fromisoformat(last_day)).days > 1:
+            streak = 0
+        return {
+            "quizzes_taken": taken,
+            "questions_answered": answered,
+            "correct": correct,
+            "average_score": correct / taken if taken else 0.0,
+            "accuracy": correct / answered if answered else 0.0,
+            "current_streak": streak,
+            "best_streak": best,
+            "steps_completed": steps,
+        }
+
+    @staticmethod
+    def topic_accuracy(student_id: str, limit: int = 10) -> List[Dict]:
+        with ChatHistory.timed("progress.topic_accuracy"), ProgressStore.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT topic, attempts, questions, correct FROM topic_stats
+                WHERE student_id = ? ORDER BY attempts DESC, topic_key LIMIT ?
+                """,
+                (student_id, limit),
+            ).fetchall()
+        return [
+            {"topic": topic, "attempts": attempts, "accuracy": correct / questions if questions else 0.0}
+            for topic, attempts, questions, correct in rows
+        ]
+
+    @staticmethod
+    def overview() -> Dict:
+        """Totals across every student, summed over the per-student rollup."""
+        with ChatHistory.timed("progress.overview"), ProgressStore.connection() as conn:
+            students, taken, answered, correct = conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(quizzes_taken), 0), COALESCE(SUM(questions_answered), 0),
+                       COALESCE(SUM(correct), 0)
+                FROM student_stats
+                """
+            ).fetchone()
+        return {
+            "students": students,
+            "quizzes_taken": taken,
+            "accuracy": correct / answered if answered else 0.0,
+        }
@@ -2,20 +2,19 @@ import os
 import streamlit as st
 
 os.environ["HF_HUB_DOWNLOAD_TIMEOUT"] = "1000"
-from transformers import pipeline
+from logic.backends import build_pipeline
+from logic.streaming import stream_text
 
 
+# Pipelines are built on the first question, not at import.
 @st.cache_resource
 def get_doc_qa():
-    return pipeline("question-answering", model="deepset/tinyroberta-squad2")
+    return build_pipeline("question-answering", "deepset/tinyroberta-squad2")
 
-doc_qa = get_doc_qa()
 
 @st.cache_resource
 def get_general_qa():
-    return pipeline("text2text-generation", model="google/flan-t5-small")
-
-general_qa = get_general_qa()
+    return build_pipeline("text2text-generation", "google/flan-t5-small")
 
 
 def ask_about_document(question, context):
@@ -23,18 +22,20 @@ def ask_about_document(question, context):
         return "Provide both question and document text."
 
     try:
-        result = doc_qa(question=question, context=context)
+        result = get_doc_qa()(question=question, context=context)
         return result["answer"]
     except Exception as e:
         return f"Document QA failed: {str(e)}"
 
 
-def ask_general_question(question):
+def ask_general_question(question, on_text=None):
     if not question.strip():
         return "Question cannot be empty."
 
     try:
-        result = general_qa(question, max_length=256)
+        if on_text:
+            return stream_text(get_general_qa(), question, max_length=256, on_text=on_text)
+        result = get_general_qa()(question, max_length=256)
         return result[0]["generated_text"]
     except Exception as e:
         return f"General QA failed: {str(e)}"
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from logic.inference_cache import normalize_question
+
+QUIZ_BANK_PATH = "data/quiz_bank.db"
+# Prompts per missing question; small models fail the format fairly often.
+OVERSAMPLE = float(os.environ.get("EDUMATE_QUIZ_OVERSAMPLE", "1.5"))
+MAX_ROUNDS = int(os.environ.get("EDUMATE_QUIZ_ROUNDS", "3"))
+QUESTION_MAX_LENGTH = 96
+LEVEL_AUDIENCE = {
+    "Basic": "primary school pupils",
+    "SHS": "senior high school students",
+    "Tertiary": "university students",
+}
+# Each prompt in a round asks about a different angle, so one batch does not
+# come back as the same question N times.
+ASPECTS = (
+    "a definition", "a key fact", "a cause", "an effect", "an example", "its history",
+    "why it matters", "how it works", "a comparison", "a real-world use", "a key term",
+    "a common mistake", "a process step", "a famous person or place", "a number or date",
+)
+
+_QUESTION = re.compile(r"(?:^|\n)\s*(?:Question|Q)\s*\d*\s*[:.)-]\s*(.+?)(?=\s*(?:\(?[A-Da-d][).:]\s)|\n|$)", re.S)
+_OPTION = re.compile(r"(?:^|\s)\(?([A-Da-d])[).:]\s*(.+?)(?=\s+\(?[A-Da-d][).:]\s|\s*(?:Answer|Correct)\b|\n|$)", re.S)
+_ANSWER = re.compile(r"(?:Answer|Correct(?:\s+answer)?)\s*(?:is)?\s*[:\-]?\s*\(?([A-Da-d])?\b[).]?\s*(.*)", re.I)
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip(" .;,-")
+
+
+def parse_question(text: str) -> Optional[Dict]:
+    """Parses one generated multiple-choice block.
+
+    Accepts the options on separate lines or inline ("A) x B) y C) z"), an
+    "Answer"/"Correct" line given as a letter or as the option text, and a
+    missing "Question:" label. Returns {"question"} alone when only the
+    question survived, so the caller can fill in the rest, or None.
+    """
+    text = text.strip()
+    answer_match = _ANSWER.search(text)
+    body = text[:answer_match.start()] if answer_match else text
+
+    match = _QUESTION.search(body)
+    if match:
+        question = _clean(match.group(1))
+    else:
+        first_option = re.search(r"\(?[A-Da-d][).:]\s", body)
+        question = _clean(body[:first_option.start()] if first_option else body.split("\n")[0])
+    if len(question) < 10:
+        return None
+    if not question.endswith("?"):
+        question += "?"
+
+    options, seen = [], set()
+    for _, option in _OPTION.findall(body[match.end() if match else 0:]):
+        option = _clean(option)
+        if option and option.casefold() not in seen and option.casefold() != question.casefold():
+            seen.add(option.casefold())
+            options.append(option)
+    options = options[:4]
+
+    correct = None
+    if answer_match and len(options) >= 3:
+        letter, rest = answer_match.group(1), _clean(answer_match.group(2))
+        if letter and ord(letter.upper()) - ord("A") < len(options):
+            correct = ord(letter.upper()) - ord("A")
+        elif rest:
+            folded = [o.casefold() for o in options]
+            correct = folded.index(rest.casefold()) if rest.casefold() in folded else None
+    if correct is None:
+        return {"question": question}
+    return {"question": question, "options": options, "correct": correct}
+
+
+def _shuffled(item: Dict) -> Dict:
+    # The model nearly always puts the right answer first; shuffle it away,
+    # deterministically so the same question keeps the same layout.
+    order = list(range(len(item["options"])))
+    random.Random(hashlib.sha256(item["question"].encode()).hexdigest()).shuffle(order)
+    return {
+        "question": item["question"],
+        "options": [item["options"][i] for i in order],
+        "correct": order.index(item["correct"]),
+    }
+
+
+def template_questions(topic: str, n: int) -> List[Dict]:
+    templates = [
+        (f"What is the main idea of {topic}?", ["It is a key concept.", "It is a random topic.", "It is not important."]),
+        (f"List one important fact about {topic}.", ["It is widely studied.", "It is rarely discussed.", "It is a new discovery."]),
+        (f"Why is {topic} important?", ["It has a big impact.", "It is not useful.", "It is only for fun."]),
+    ]
+    return [
+        {"question": templates[i % 3][0], "options": templates[i % 3][1], "correct": 0}
+        for i in range(n)
+    ]
+
+
+class QuizBank:
+    """Generated questions stored per (topic, level) and reused across sessions."""
+
+    def __init__(self, path: str = QUIZ_BANK_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quiz_bank (
+                    id INTEGER PRIMARY KEY,
+                    topic_key TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    correct INTEGER NOT NULL,
+                    served INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    UNIQUE (topic_key, level, question)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_quiz_topic ON quiz_bank(topic_key, level, served)")
+
+    def take(self, topic: str, level: str, n: int) -> List[Dict]:
+        # Least-served first, so repeat quizzes on a topic rotate through the bank.
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                """
+                SELECT id, question, options, correct FROM quiz_bank
+                WHERE topic_key = ? AND level = ?
+                ORDER BY served, random() LIMIT ?
+                """,
+                (normalize_question(topic), level, n),
+            ).fetchall()
+            self._conn.executemany("UPDATE quiz_bank SET served = served + 1 WHERE id = ?", [(row[0],) for row in rows])
+        return [{"question": q, "options": json.loads(options), "correct": correct} for _, q, options, correct in rows]
+
+    def add(self, topic: str, level: str, questions: List[Dict], served: int = 0):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR IGNORE INTO quiz_bank (topic_key, level, question, options, correct, served, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (normalize_question(topic), level, q["question"], json.dumps(q["options"]), q["correct"], served, now)
+                    for q in questions
+                ],
+            )
+
+    def count(self, topic: str, level: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM quiz_bank WHERE topic_key = ? AND level = ?",
+                (normalize_question(topic), level),
+            ).fetchone()[0]
+
+
+def _question_prompt(topic: str, level: str, aspect: str, passage: str = "") -> str:
+    source = f"Use this text:\n{passage}\n\n" if passage else ""
+    return (
+        f"{source}Write one multiple choice question for {LEVEL_AUDIENCE.get(level, 'students')} "
+        f"about {topic}, testing {aspect}. Give three options and the answer.\n"
+        "Format:\nQuestion: ...\nA) ...\nB) ...\nC) ...\nAnswer: A"
+    )
+
+
+def _complete(pipe, partial: List[Dict]) -> List[Dict]:
+    # Second batched pass for questions whose options did not parse: one
+    # call for the answers, one sampled call for three wrong answers each.
+    if not partial:
+        return []
+    answers = pipe(
+        [f"Answer the question briefly: {q['question']}" for q in partial],
+        max_length=32,
+    )
+    wrong = pipe(
+        [f"Give a wrong but believable answer to the question: {q['question']}" for q in partial],
+        max_length=32, do_sample=True, top_p=0.95, num_return_sequences=3,
+    )
+    completed = []
+    for item, answer, distractors in zip(partial, answers, wrong):
+        answer = _clean((answer[0] if isinstance(answer, list) else answer)["generated_text"])
+        options = [answer]
+        for out in distractors if isinstance(distractors, list) else [distractors]:
+            option = _clean(out["generated_text"])
+            if option and option.casefold() not in {o.casefold() for o in options}:
+                options.append(option)
+        if answer and len(options) >= 3:
+            completed.append({"question": item["question"], "options": options[:3], "correct": 0})
+    return completed
+
+
+def generate_quiz(
+    pipe,
+    topic: str,
+    level: str,
+    n: int,
+    passages: Sequence[str] = (),
+    bank: Optional[QuizBank] = None,
+    rounds: int = MAX_ROUNDS,
+    stats: Optional[Dict] = None,
+) -> List[Dict]:
+    """n multiple-choice questions, served from the bank first.
+
+    Only the shortfall is generated, one prompt per question (cycling over
+    `passages` when a document is given), as one batched call per round.
+    New questions go back into the bank; templates fill any final gap.
+    """
+    bank = bank if bank is not None else quiz_bank
+    # Questions grounded in an upload belong to that upload, not the topic.
+    use_bank = not passages
+    questions = bank.take(topic, level, n) if use_bank else []
+    from_bank = len(questions)
+    seen = {q["question"].casefold() for q in questions}
+    rng = random.Random()
+    generated = 0
+    for _ in range(rounds):
+        shortfall = n - len(questions)
+        if shortfall <= 0:
+            break
+        count = max(shortfall, int(shortfall * OVERSAMPLE + 0.5))
+        aspects = rng.sample(ASPECTS, min(count, len(ASPECTS))) * (count // len(ASPECTS) + 1)
+        prompts = [
+            _question_prompt(topic, level, aspects[i], passages[i % len(passages)] if passages else "")
+            for i in range(count)
+        ]
+        outputs = pipe(prompts, max_length=QUESTION_MAX_LENGTH, do_sample=True, top_p=0.92)
+        parsed = [parse_question((out[0] if isinstance(out, list) else out)["generated_text"]) for out in outputs]
+        parsed = [p for p in parsed if p and p["question"].casefold() not in seen]
+        complete = [p for p in parsed if "options" in p]
+        complete += _complete(pipe, [p for p in parsed if "options" not in p][:shortfall])
+        fresh = []
+        for item in complete:
+            if item["question"].casefold() not in seen:
+                seen.add(item["question"].casefold())
+                fresh.append(_shuffled(item))
+        if use_bank and fresh:
+            # Extras from oversampling are banked unserved for the next quiz.
+            bank.add(topic, level, fresh[:shortfall], served=1)
+            bank.add(topic, level, fresh[shortfall:])
+        generated += len(fresh)
+        questions.extend(fresh[:shortfall])
+    templated = n - len(questions)
+    if templated > 0:
+        questions.extend(template_questions(topic, templated))
+    if stats is not None:
+        stats.update(from_bank=from_bank, generated=generated, templated=max(0, templated))
+    return questions[:n]
+
+
+quiz_bank = QuizBank()
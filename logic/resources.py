@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, quote_plus
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from logic.inference_cache import normalize_question
+
+WIKIPEDIA_API = os.environ.get("EDUMATE_WIKIPEDIA_API", "https://en.wikipedia.org/w/api.php")
+WIKIBOOKS_API = os.environ.get("EDUMATE_WIKIBOOKS_API", "https://en.wikibooks.org/w/api.php")
+RESOURCE_CACHE_DIR = "data/resource_cache"
+# (connect, read) per request, and the most the UI ever waits on a cold topic.
+TIMEOUT = (3.05, float(os.environ.get("EDUMATE_RESOURCE_TIMEOUT", "5")))
+FETCH_DEADLINE_SECONDS = float(os.environ.get("EDUMATE_RESOURCE_DEADLINE", "6"))
+# Fresh for TTL; after that served stale while a refresh runs, up to MAX_STALE.
+TTL_SECONDS = int(os.environ.get("EDUMATE_RESOURCE_TTL", str(24 * 3600)))
+MAX_STALE_SECONDS = int(os.environ.get("EDUMATE_RESOURCE_MAX_STALE", str(30 * 24 * 3600)))
+FETCH_WORKERS = 4
+RESULTS_PER_SOURCE = 2
+USER_AGENT = "EduMate/1.0 (learning resources lookup)"
+
+Resource = Tuple[str, str]
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    # One retry for a dropped connection or a 5xx blip; anything slower than
+    # that is better answered from the cache than waited on.
+    retry = Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FETCH_WORKERS * 2, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def _mediawiki_search(session: requests.Session, api: str, topic: str) -> List[Resource]:
+    resp = session.get(
+        api,
+        params={"action": "query", "list": "search", "srsearch": topic, "format": "json", "srlimit": RESULTS_PER_SOURCE},
+        timeout=TIMEOUT,
+    )
+    resp.raise_for_status()
+    # /w/api.php -> /wiki/<Title>
+    site = api.rsplit("/w/", 1)[0]
+    return [
+        (item["title"], f"{site}/wiki/{quote(item['title'].replace(' ', '_'))}")
+        for item in resp.json()["query"]["search"][:RESULTS_PER_SOURCE]
+    ]
+
+
+def youtube_search(topic: str) -> List[Resource]:
+    # A search link needs no request; it is built locally.
+    return [("YouTube Search", f"https://www.youtube.com/results?search_query={quote_plus(topic)}")]
+
+
+class ResourceFetcher:
+    """Looks up learning resources for a topic across sources, concurrently.
+
+    Results are cached on disk per normalized topic. A fresh entry is served
+    as is; a stale one is served immediately while one background refresh
+    replaces it; only a topic never seen before waits on the network, and
+    then for at most deadline seconds.
+    """
+
+    def __init__(
+        self,
+        sources: Optional[Dict[str, str]] = None,
+        cache_dir: str = RESOURCE_CACHE_DIR,
+        ttl_seconds: int = TTL_SECONDS,
+        max_stale_seconds: int = MAX_STALE_SECONDS,
+        deadline: float = FETCH_DEADLINE_SECONDS,
+    ):
+        self.sources = sources if sources is not None else {"wikipedia": WIKIPEDIA_API, "wikibooks": WIKIBOOKS_API}
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.deadline = deadline
+        self._session = _build_session()
+        self._executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="edumate-fetch")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "errors": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, results: Dict[str, List[Resource]], complete: bool):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        entry = {"topic": key, "fetched_at": time.time(), "complete": complete, "results": results}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+
+    def _submit(self, topic: str) -> Dict[str, Future]:
+        return {
+            name: self._executor.submit(_mediawiki_search, self._session, api, topic)
+            for name, api in self.sources.items()
+        }
+
+    def _collect(self, futures: Dict[str, Future]) -> Tuple[Dict[str, List[Resource]], bool]:
+        results, complete = {}, True
+        for name, future in futures.items():
+            if future.done() and future.exception() is None:
+                results[name] = [tuple(r) for r in future.result()]
+            else:
+                # Timed out or failed: show nothing for this source for now.
+                results[name] = []
+                complete = False
+                with self._lock:
+                    self.stats["errors"] += 1
+        return results, complete
+
+    def _store(self, key: str, futures: Dict[str, Future]):
+        results, complete = self._collect(futures)
+        if any(results.values()):
+            self._write(key, results, complete)
+        return results, complete
+
+    def _refresh(self, key: str, futures: Dict[str, Future]):
+        try:
+            wait(futures.values())
+            self._store(key, futures)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _revalidate(self, key: str, futures: Dict[str, Future]):
+        # Its own thread: the refresh waits on fetches queued to the pool.
+        threading.Thread(target=self._refresh, args=(key, futures), name="edumate-revalidate", daemon=True).start()
+
+    def _claim(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def get(self, topic: str) -> Dict[str, List[Resource]]:
+        key = normalize_question(topic)
+        entry = self._read(key)
+        age = time.time() - entry["fetched_at"] if entry else None
+        if entry and age < self.ttl_seconds and entry.get("complete", True):
+            self._count("fresh")
+            results = entry["results"]
+        elif entry and age < self.max_stale_seconds:
+            self._count("stale")
+            if self._claim(key):
+                self._revalidate(key, self._submit(topic))
+            results = entry["results"]
+        else:
+            self._count("miss")
+            futures = self._submit(topic)
+            _, pending = wait(futures.values(), timeout=self.deadline)
+            if pending and self._claim(key):
+                # Answer now with what arrived; the slow source still lands
+                # in the cache for the next view.
+                self._revalidate(key, futures)
+            results = self._collect(futures)[0] if pending else self._store(key, futures)[0]
+        results = {name: [tuple(r) for r in items] for name, items in results.items()}
+        results["youtube"] = youtube_search(topic)
+        return results
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+resource_fetcher = ResourceFetcher()
@@ -0,0 +1,222 @@
+"""Retention, archiving and compaction for the chat history database.
+
+    python -m logic.retention run
+    python -m logic.retention run --max-age-days 90 --max-chats 2000
+    python -m logic.retention report
+
+Unpinned chats with no activity (an edit or a follow-up turn) for
+max_age_days, or beyond the newest max_chats, move to chats_archive with
+compressed bodies (ChatHistory.get_chat still reads them). Freed pages are
+then returned to the filesystem with incremental_vacuum, the WAL is
+truncated and ANALYZE refreshes the planner statistics. The app runs this
+in the background every INTERVAL_SECONDS. Archiving is opt-in: it only
+happens with EDUMATE_RETENTION_MAX_AGE_DAYS or EDUMATE_RETENTION_MAX_CHATS
+set, or the matching flags given.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from logic import chat_history
+from logic.chat_history import ChatHistory
+
+# Archived chats leave the sidebar listing and search, so both policies are
+# off (0) unless the operator sets them; compaction always runs.
+MAX_AGE_DAYS = int(os.environ.get("EDUMATE_RETENTION_MAX_AGE_DAYS", "0"))
+MAX_CHATS = int(os.environ.get("EDUMATE_RETENTION_MAX_CHATS", "0"))
+INTERVAL_SECONDS = int(os.environ.get("EDUMATE_RETENTION_INTERVAL", str(6 * 3600)))
+# Chats moved per transaction, and pages freed per incremental_vacuum step,
+# so neither holds the write lock for long.
+BATCH_SIZE = 500
+VACUUM_STEP_PAGES = 2000
+
+_lock = threading.Lock()
+_last_check = float("-inf")
+last_report: Optional[Dict] = None
+
+
+def database_size() -> Dict:
+    path = chat_history.DB_PATH
+    with ChatHistory.connection() as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        chats = conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+        archived = conn.execute("SELECT COUNT(*) FROM chats_archive").fetchone()[0]
+
+    def megabytes(file_path: str) -> float:
+        return round(os.path.getsize(file_path) / 2**20, 2) if os.path.exists(file_path) else 0.0
+
+    return {
+        "file_mb": megabytes(path),
+        "wal_mb": megabytes(path + "-wal"),
+        "used_mb": round((pages - free) * page_size / 2**20, 2),
+        "free_pages": free,
+        "chats": chats,
+        "archived": archived,
+    }
+
+
+def _expired(max_age_days: int, limit: int) -> List[str]:
+    # Age is time since the last activity: the chats row's own updated_at or
+    # its newest follow-up turn, read off the (thread_id, seq) key. Nothing
+    # created after the cutoff can qualify, so created_at narrows it first.
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    with ChatHistory.connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id FROM chats
+            WHERE created_at < :cutoff AND NOT pinned AND updated_at < :cutoff
+              AND COALESCE(
+                  (SELECT created_at FROM messages WHERE thread_id = chats.id ORDER BY seq DESC LIMIT 1), ''
+              ) < :cutoff
+            ORDER BY created_at LIMIT :limit
+            """,
+            {"cutoff": cutoff, "limit": limit},
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _overflow(max_chats: int, limit: int) -> List[str]:
+    # Everything unpinned past the newest max_chats, oldest first.
+    with ChatHistory.connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id FROM (
+                SELECT id, created_at FROM chats WHERE NOT pinned
+                ORDER BY created_at DESC, id DESC LIMIT -1 OFFSET ?
+            ) ORDER BY created_at LIMIT ?
+            """,
+            (max_chats, limit),
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def apply_retention(max_age_days: int = MAX_AGE_DAYS, max_chats: int = MAX_CHATS) -> Dict[str, int]:
+    """Archives what the age and count policies select; 0 turns one off."""
+    moved = {"by_age": 0, "by_count": 0}
+    for policy, select, limit in (("by_age", _expired, max_age_days), ("by_count", _overflow, max_chats)):
+        if limit <= 0:
+            continue
+        while True:
+            ids = select(limit, BATCH_SIZE)
+            archived = ChatHistory.archive_chats(ids) if ids else 0
+            moved[policy] += archived
+            if archived < BATCH_SIZE:
+                break
+    return moved
+
+
+def _rebuild_search(conn):
+    # A full VACUUM may renumber chats' implicit rowids, which the
+    # external-content FTS index is keyed on.
+    conn.execute("INSERT INTO chats_fts(chats_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def compact() -> Dict:
+    """Returns free pages to the filesystem and refreshes statistics.
+
+    A database created before auto_vacuum was enabled is converted with one
+    full VACUUM (and a search index rebuild); after that, compaction is
+    incremental and never rewrites the whole file.
+    """
+    with ChatHistory.timed("compact"), ChatHistory.connection() as conn:
+        full = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+        if full:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            _rebuild_search(conn)
+        free = start = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            # Each step is its own short write; fetchall runs it to the end.
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+            free, previous = conn.execute("PRAGMA freelist_count").fetchone()[0], free
+            if free >= previous:
+                break
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {"full_vacuum": full, "pages_freed": start - free}
+
+
+def run(max_age_days: int = MAX_AGE_DAYS, max_chats: int = MAX_CHATS) -> Dict:
+    global last_report
+    started = time.perf_counter()
+    with ChatHistory.timed("retention"):
+        before = database_size()
+        archived = apply_retention(max_age_days, max_chats)
+        compacted = compact()
+        after = database_size()
+    last_report = {
+        "ran_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 2),
+        "archived": archived,
+        "compaction": compacted,
+        "before": before,
+        "after": after,
+    }
+    return last_report
+
+
+def _due(conn) -> bool:
+    # Shared across worker processes through the database itself.
+    conn.execute("CREATE TABLE IF NOT EXISTS maintenance (name TEXT PRIMARY KEY, last_run REAL NOT NULL)")
+    row = conn.execute("SELECT last_run FROM maintenance WHERE name = 'retention'").fetchone()
+    if row and time.time() - row[0] < INTERVAL_SECONDS:
+        return False
+    conn.execute(
+        "INSERT OR REPLACE INTO maintenance (name, last_run) VALUES ('retention', ?)", (time.time(),)
+    )
+    return True
+
+
+def maybe_run() -> bool:
+    """Starts a background run when one is due; cheap to call every rerun."""
+    global _last_check
+    if time.monotonic() - _last_check < min(INTERVAL_SECONDS, 60) or not _lock.acquire(blocking=False):
+        return False
+    try:
+        _last_check = time.monotonic()
+        with ChatHistory.connection() as conn, conn:
+            due = _due(conn)
+    except Exception:
+        _lock.release()
+        raise
+    if not due:
+        _lock.release()
+        return False
+
+    def work():
+        try:
+            run()
+        finally:
+            _lock.release()
+
+    threading.Thread(target=work, name="edumate-retention", daemon=True).start()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=chat_history.DB_PATH, help="chat history database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="archive by policy, then compact")
+    run_parser.add_argument("--max-age-days", type=int, default=MAX_AGE_DAYS, help="0 disables the age policy")
+    run_parser.add_argument("--max-chats", type=int, default=MAX_CHATS, help="0 disables the count policy")
+    commands.add_parser("report", help="database size and row counts")
+    args = parser.parse_args(argv)
+
+    chat_history.DB_PATH = args.db
+    if args.command == "run":
+        print(json.dumps(run(args.max_age_days, args.max_chats), indent=2))
+    else:
+        print(json.dumps(database_size(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
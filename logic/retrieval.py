@@ -0,0 +1,116 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# ~250 tokens, comfortably inside tinyroberta's 384-token window.
+MAX_PASSAGE_CHARS = 1000
+TOP_K = 3
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _add_passage(passages: List[Tuple[int, str]], text: str, start: int, end: int):
+    raw = text[start:end]
+    passage = raw.strip()
+    if passage:
+        passages.append((start + len(raw) - len(raw.lstrip()), passage))
+
+
+def split_passages(text: str, max_chars: int = MAX_PASSAGE_CHARS) -> List[Tuple[int, str]]:
+    # Packs consecutive sentences into passages of up to max_chars, never
+    # crossing a paragraph break; returns (char offset, passage) pairs.
+    passages: List[Tuple[int, str]] = []
+    for paragraph in re.finditer(r"(?:[^\n]+\n?)+", text):
+        start = end = None
+        for sentence in _SENTENCE_RE.finditer(paragraph.group()):
+            s_start = paragraph.start() + sentence.start()
+            s_end = paragraph.start() + sentence.end()
+            if start is not None and s_end - start > max_chars:
+                _add_passage(passages, text, start, end)
+                start = None
+            if start is None:
+                start = s_start
+            end = s_end
+        if start is not None:
+            _add_passage(passages, text, start, end)
+    return passages
+
+
+class PassageIndex:
+    """BM25 index over the passages of one uploaded document."""
+
+    def __init__(self, text: str, max_chars: int = MAX_PASSAGE_CHARS):
+        pairs = split_passages(text, max_chars)
+        self.offsets = [offset for offset, _ in pairs]
+        self.passages = [passage for _, passage in pairs]
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        lengths = []
+        for i, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+
+        self.doc_len = np.asarray(lengths, dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if len(self.passages) else 0.0
+        self.norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avg_len or 1.0))
+        n = len(self.passages)
+        self.postings = {}
+        for term, (ids, tfs) in postings.items():
+            df = len(ids)
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            self.postings[term] = (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32), idf)
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs, idf = self.postings[term]
+            scores[ids] += idf * tfs * (BM25_K1 + 1) / (tfs + self.norm[ids])
+        return scores
+
+    def top_k(self, query: str, k: int = TOP_K) -> List[int]:
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        if not scores.any():
+            # Nothing matched; fall back to the opening passages.
+            return list(range(k))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+def answer_from_passages(qa_pipeline, question: str, index: PassageIndex, query: str = "", k: int = TOP_K) -> Dict:
+    ids = index.top_k(query or question, k)
+    if not ids:
+        return {"answer": "", "score": 0.0, "start": 0, "end": 0, "passage": -1}
+    inputs = [{"question": question, "context": index.passages[i]} for i in ids]
+    results = qa_pipeline(inputs, batch_size=len(inputs))
+    if isinstance(results, dict):
+        results = [results]
+    best_pos = max(range(len(results)), key=lambda pos: results[pos]["score"])
+    best, passage_id = results[best_pos], ids[best_pos]
+    offset = index.offsets[passage_id]
+    return {
+        "answer": best["answer"],
+        "score": best["score"],
+        "start": offset + best["start"],
+        "end": offset + best["end"],
+        "passage": passage_id,
+    }
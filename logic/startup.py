@@ -0,0 +1,73 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+# Set to 0 to load models on first use only, e.g. on memory-tight hosts.
+WARMUP = os.environ.get("EDUMATE_WARMUP", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+# Close enough to process start: this module is among the first app imports.
+_started = time.perf_counter()
+_imports: Dict[str, float] = {}
+_marks: Dict[str, float] = {}
+_warmups: Dict[str, Dict] = {}
+_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def import_module(name: str) -> ModuleType:
+    """importlib.import_module that records how long the first import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _imports.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+def mark(event: str):
+    # Seconds since startup at which `event` first happened.
+    with _lock:
+        _marks.setdefault(event, time.perf_counter() - _started)
+
+
+def _run_warmup(loaders: Dict[str, Callable[[], object]]):
+    for name, load in loaders.items():
+        started = time.perf_counter()
+        try:
+            load()
+            _warmups[name] = {"seconds": round(time.perf_counter() - started, 3), "error": None}
+        except Exception as e:
+            # The first real request will retry the load and surface the error.
+            logger.warning("Warm-up of %s failed: %s", name, e)
+            _warmups[name] = {"seconds": round(time.perf_counter() - started, 3), "error": str(e)}
+    mark("warmup_done")
+
+
+def warm_up(loaders: Dict[str, Callable[[], object]]) -> Optional[threading.Thread]:
+    """Runs the loaders once per process on a background thread."""
+    global _warmup_thread
+    with _lock:
+        if not WARMUP or _warmup_thread is not None:
+            return None
+        _warmup_thread = threading.Thread(target=_run_warmup, args=(loaders,), name="edumate-warmup", daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
+
+
+def startup_report() -> Dict:
+    with _lock:
+        return {
+            "imports_seconds": {name: round(seconds, 3) for name, seconds in _imports.items()},
+            "marks_seconds": {name: round(seconds, 3) for name, seconds in _marks.items()},
+            "warmup": dict(_warmups),
+            "warmup_running": _warmup_thread is not None and _warmup_thread.is_alive(),
+        }
@@ -0,0 +1,95 @@
+import copy
+import os
+import threading
+from typing import Callable, Iterator, Optional
+
+from logic.startup import import_module
+
+# How long the reader waits for the next token before giving up on a decode.
+TOKEN_TIMEOUT_SECONDS = float(os.environ.get("EDUMATE_STREAM_TOKEN_TIMEOUT", "60"))
+# Streamers take a single hypothesis. A model configured for beam search is
+# decoded with its beams and shown in one piece, unless this opts in to
+# streaming it greedily instead, trading some quality for live tokens.
+STREAM_GREEDY = os.environ.get("EDUMATE_STREAM_GREEDY", "0") == "1"
+
+
+def _stop_on(event: threading.Event):
+    transformers = import_module("transformers")
+
+    class StopOnEvent(transformers.StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return event.is_set()
+
+    return transformers.StoppingCriteriaList([StopOnEvent()])
+
+
+def generation_config(model, max_length: int, min_length: int = 0):
+    """The model's own generation config with the requested lengths.
+
+    model.generation_config already carries the pipeline's task settings
+    (beams, no_repeat_ngram_size, penalties, forced tokens), so the output
+    matches the non-streamed path. Beam search only becomes greedy decoding
+    when STREAM_GREEDY opts in.
+    """
+    config = copy.deepcopy(model.generation_config)
+    config.update(max_length=max_length, min_length=min_length)
+    if config.num_beams > 1 and STREAM_GREEDY:
+        config.update(num_beams=1, num_beam_groups=1, early_stopping=False)
+    return config
+
+
+def iter_generate(pipe, prompt: str, max_length: int, min_length: int = 0) -> Iterator[str]:
+    """Yields the decoded text so far each time the streamer flushes a word.
+
+    generate() runs on a worker thread and pushes tokens into the streamer;
+    this generator reads them on the caller's thread. If the caller stops
+    reading (done, cancelled or failed), the decode is stopped too. A beam
+    search decode cannot stream, so its text is yielded once, when done.
+    """
+    tokenizer, model = pipe.tokenizer, pipe.model
+    config = generation_config(model, max_length, min_length)
+    if config.num_beams > 1:
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True).to(model.device)
+        output = model.generate(**inputs, generation_config=config)
+        yield tokenizer.decode(output[0], skip_special_tokens=True)
+        return
+    streamer = import_module("transformers").TextIteratorStreamer(
+        tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=TOKEN_TIMEOUT_SECONDS
+    )
+    inputs = tokenizer(prompt, return_tensors="pt", truncation=True).to(model.device)
+    stop = threading.Event()
+    errors = []
+
+    def run():
+        try:
+            model.generate(
+                **inputs,
+                streamer=streamer,
+                generation_config=config,
+                stopping_criteria=_stop_on(stop),
+            )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=run, name="edumate-stream", daemon=True)
+    thread.start()
+    text = ""
+    try:
+        for piece in streamer:
+            if piece:
+                text += piece
+                yield text
+    finally:
+        stop.set()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def stream_text(pipe, prompt: str, max_length: int, min_length: int = 0, on_text: Optional[Callable[[str], None]] = None) -> str:
+    text = ""
+    for text in iter_generate(pipe, prompt, max_length, min_length):
+        if on_text:
+            on_text(text)
+    return text.strip()
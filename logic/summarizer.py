@@ -1,12 +1,14 @@
 import pdfplumber
-import pytesseract
 import streamlit as st
-from PIL import Image
-from transformers import pipeline
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from logic.backends import build_pipeline
+from logic.ocr import ocr_image
 
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+
+# Built on the first summary, not at import, so the page renders first.
+@st.cache_resource
+def get_summarizer():
+    return build_pipeline("summarization", "facebook/bart-large-cnn")
 
 
 def extract_text_from_pdf(uploaded_file):  # sourcery skip: use-named-expression
@@ -20,35 +22,40 @@ def extract_text_from_pdf(uploaded_file):  # sourcery skip: use-named-expression
 
 
 def extract_text_from_image(uploaded_file):
-    image = Image.open(uploaded_file)
-    return pytesseract.image_to_string(image)
+    return ocr_image(uploaded_file)
 
 
 def summarize_text(text):
     if len(text.strip()) < 50:
         return "Text is too short to summarize."
-    return summarizer(text, max_length=300, min_length=100, truncation=True)[0][
+    return get_summarizer()(text, max_length=300, min_length=100, truncation=True)[0][
         "summary_text"
     ]
 
 
-# sourcery skip: use-fstring-for-concatenation, use-named-expression
-st.title("EduMate Document Summarizer")
+def main():
+    # sourcery skip: use-fstring-for-concatenation, use-named-expression
+    st.title("EduMate Document Summarizer")
+
+    uploaded_file = st.file_uploader(
+        "Upload PDF or Image", type=["pdf", "png", "jpg", "jpeg"]
+    )
+
+    if uploaded_file:
+        if uploaded_file.type == "application/pdf":
+            text = extract_text_from_pdf(uploaded_file)
+        else:
+            text = extract_text_from_image(uploaded_file)
 
-uploaded_file = st.file_uploader(
-    "Upload PDF or Image", type=["pdf", "png", "jpg", "jpeg"]
-)
+        if st.button("Summarize"):
+            with st.spinner("Generating summary..."):
+                summary = summarize_text(text)
+                st.subheader("Summary")
+                st.write(summary)
+                st.subheader("Extracted Text")
+                st.text(text[:2000] + "...")
 
-if uploaded_file:
-    if uploaded_file.type == "application/pdf":
-        text = extract_text_from_pdf(uploaded_file)
-    else:
-        text = extract_text_from_image(uploaded_file)
 
-    if st.button("Summarize"):
-        with st.spinner("Generating summary..."):
-            summary = summarize_text(text)
-            st.subheader("Summary")
-            st.write(summary)
-            st.subheader("Extracted Text")
-            st.text(text[:2000] + "...")
+# `streamlit run logic/summarizer.py` runs the script as __main__.
+if __name__ == "__main__":
+    main()
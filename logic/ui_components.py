@@ -2,12 +2,19 @@ import uuid
 from datetime import datetime
 import streamlit as st
 
-def chat_message_ui(chat, is_user=True):
+from logic import chat_history
+from logic.chat_history import ChatHistory
+
+
+def chat_message_ui(chat, is_user=True, streaming=False):
     with st.chat_message("user" if is_user else "assistant"):
         st.markdown(
-            f"{'👤' if is_user else '🤖'} {chat['message']}", unsafe_allow_html=True
+            f"{'👤' if is_user else '🤖'} {chat['message']}{' ▌' if streaming else ''}", unsafe_allow_html=True
         )
         st.markdown(f"<small>{chat['timestamp']}</small>", unsafe_allow_html=True)
+        # A message still being generated has nothing to edit, copy or pin yet.
+        if streaming:
+            return
 
         cols = st.columns([0.1, 0.1, 0.1])
         with cols[0]:
@@ -24,61 +31,131 @@ def chat_message_ui(chat, is_user=True):
                 st.toast("", icon="📌")
 
 
-def sidebar_chat_history_ui(chat_list):  # sourcery skip: use-named-expression
-    st.sidebar.subheader("📚 Chat History")
+# Chats rendered at once; "load more" grows the window by a step up to the
+# cap, after which it slides, so the widget count never tracks history size.
+HISTORY_WINDOW_STEP = 20
+HISTORY_WINDOW_MAX = 100
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _history_page(db_path, version, cursor):
+    # One keyset page per (database, version, cursor): pages are shared by all
+    # sessions and every rerun until a write bumps the version.
+    return ChatHistory.load_page(after=cursor)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _search_page(db_path, version, query, limit):
+    return ChatHistory.search(query, limit=limit)
+
+
+def _history_rows(key, start, stop):
+    """Listing rows [start, stop) and whether more exist past stop.
 
-    # 🔍 Search bar
-    search_query = st.sidebar.text_input("Search chats...", key="search_chats")
-    filtered_chats = [
-        c for c in chat_list if search_query.lower() in c["title"].lower()
-    ] if search_query else chat_list
+    The cursor each page starts from is kept in the session, so a window deep
+    in the history is read from its own first page instead of from the top.
+    After a write the kept cursor still anchors the window on the same chats,
+    and the pages inside it are chained from freshly returned cursors.
+    """
+    cursors = st.session_state.setdefault(f"{key}_history_cursors", [None])
+    version = ChatHistory.version()
+    index = min(start // chat_history.PAGE_SIZE, len(cursors) - 1)
+    first_row = index * chat_history.PAGE_SIZE
+    rows, cursor = [], cursors[index]
+    while first_row + len(rows) < stop:
+        page, cursor = _history_page(chat_history.DB_PATH, version, cursor)
+        rows += page
+        index += 1
+        if cursor is None:
+            del cursors[index:]
+            break
+        cursors[index:index + 1] = [cursor]
+    return rows[start - first_row:stop - first_row], cursor is not None or first_row + len(rows) > stop
 
-    seen_ids = set()
-    pinned_chats = [c for c in filtered_chats if c.get("pinned") and c["id"] not in seen_ids and not seen_ids.add(c["id"])]
+
+@st.fragment
+def sidebar_chat_history_ui(key="sidebar"):
+    # A fragment: searching, paging, pinning or opening a menu reruns only
+    # this function. Actions that change the main page rerun the whole app.
+    st.subheader("📚 Chat History")
+
+    # 🔍 Search bar (full-text search runs in SQLite)
+    search_query = st.text_input("Search chats...", key=f"{key}_search_chats").strip()
+    # The listing and the search results page separately, and a new query
+    # starts again from its first result.
+    if search_query:
+        search = st.session_state.get(f"{key}_search_window")
+        if search is None or search[0] != search_query:
+            search = st.session_state[f"{key}_search_window"] = [search_query, [0, HISTORY_WINDOW_STEP]]
+        window = search[1]
+    else:
+        window = st.session_state.setdefault(f"{key}_history_window", [0, HISTORY_WINDOW_STEP])
+    if search_query:
+        found = _search_page(chat_history.DB_PATH, ChatHistory.version(), search_query, window[1] + 1)
+        chats, has_more = found[window[0]:window[1]], len(found) > window[1]
+    else:
+        chats, has_more = _history_rows(key, *window)
+
+    if window[0] > 0 and st.button("⬆️ Newer chats", key=f"{key}_newer_history"):
+        window[0] = max(0, window[0] - HISTORY_WINDOW_STEP)
+        window[1] = window[0] + HISTORY_WINDOW_MAX
+        st.rerun(scope="fragment")
+
+    pinned_chats = [c for c in chats if c.get("pinned")]
     if pinned_chats:
-        st.sidebar.subheader("📌 Pinned")
+        st.subheader("📌 Pinned")
         for chat in pinned_chats:
-            render_chat_item(chat)
+            render_chat_item(chat, key)
 
-    recent_chats = [c for c in filtered_chats if not c.get("pinned") and c["id"] not in seen_ids and not seen_ids.add(c["id"])]
+    recent_chats = [c for c in chats if not c.get("pinned")]
     if recent_chats:
-        st.sidebar.subheader("⏱️ Recent")
+        st.subheader("⏱️ Recent")
         for chat in recent_chats:
-            render_chat_item(chat)
+            render_chat_item(chat, key)
 
-    st.sidebar.markdown("---")
+    if has_more and st.button("⬇️ Load more chats", key=f"{key}_load_more_history"):
+        window[1] += HISTORY_WINDOW_STEP
+        window[0] = max(window[0], window[1] - HISTORY_WINDOW_MAX)
+        st.rerun(scope="fragment")
 
+    st.markdown("---")
 
-def render_chat_item(chat):
-    cols = st.sidebar.columns([0.7, 0.15, 0.15])
+
+def render_chat_item(chat, key="sidebar"):
+    # Two widgets per row; the options only exist for the one open menu.
+    cols = st.columns([0.85, 0.15])
     with cols[0]:
-        if st.button(f"💬 {chat['title']}", key=f"load-{chat['id']}"):
+        label = f"{'📌 ' if chat.get('pinned') else ''}💬 {chat['title']}"
+        if st.button(label, key=f"{key}-load-{chat['id']}"):
             st.session_state["active_chat_id"] = chat["id"]
             st.toast("Chat loaded!", icon="📂")
+            st.rerun()
+        if chat.get("snippet"):
+            st.caption(chat["snippet"])
     with cols[1]:
-        if st.button("📌", key=f"sidebar-pin-{chat['id']}"):
-            st.session_state["pin_chat"] = chat["id"]
-    with cols[2]:
-        if st.button("⋮", key=f"menu-{chat['id']}"):
-            st.session_state["show_menu_for"] = chat["id"]
-    
+        if st.button("⋮", key=f"{key}-menu-{chat['id']}"):
+            st.session_state["show_menu_for"] = None if st.session_state.get("show_menu_for") == chat["id"] else chat["id"]
+            st.rerun(scope="fragment")
+
     if st.session_state.get("show_menu_for") == chat["id"]:
         with st.expander("Chat Options", expanded=True):
             st.markdown("<div style='font-size: 0.9em;'>", unsafe_allow_html=True)
-            if st.button("✏️ Edit Chat Title", key=f"edit-title-{chat['id']}", help="Edit the title of this chat"):
+            if st.button("✏️ Edit Chat Title", key=f"{key}-edit-title-{chat['id']}", help="Edit the title of this chat"):
                 st.session_state["edit_title_for"] = chat["id"]
                 st.session_state["show_menu_for"] = None
                 st.toast("Edit mode enabled!", icon="✏️")
-            if st.button("🗑️ Delete Chat", key=f"delete-chat-{chat['id']}", help="Delete this chat"):
+            if st.button("🗑️ Delete Chat", key=f"{key}-delete-chat-{chat['id']}", help="Delete this chat"):
                 st.session_state["delete_chat"] = chat["id"]
                 st.session_state["show_menu_for"] = None
-                st.toast("Chat deleted!", icon="🗑️")
-            if st.button("📌 Pin/Unpin", key=f"pin-chat-{chat['id']}", help="Pin or unpin this chat"):
-                st.session_state["pin_chat"] = chat["id"]
+                st.rerun()
+            if st.button("📌 Pin/Unpin", key=f"{key}-pin-chat-{chat['id']}", help="Pin or unpin this chat"):
+                ChatHistory.toggle_pin(chat["id"])
                 st.session_state["show_menu_for"] = None
                 st.toast("Pin toggled!", icon="📌")
-            if st.button("✕ Close", key=f"close-modal-{chat['id']}", help="Close this menu"):
+                st.rerun(scope="fragment")
+            if st.button("✕ Close", key=f"{key}-close-modal-{chat['id']}", help="Close this menu"):
                 st.session_state["show_menu_for"] = None
+                st.rerun(scope="fragment")
             st.markdown("</div>", unsafe_allow_html=True)
 
 
@@ -96,5 +173,5 @@ def user_input_ui(pause_key="pause"):
         if st.button("⏸️" if not paused else "▶️", key=pause_key, help="Pause" if not paused else "Resume"):
             st.session_state["paused"] = not paused
             st.toast("Paused!" if not paused else "Resumed!", icon="⏸️" if not paused else "▶️")
-            st.experimental_rerun()
+            st.rerun()
     return user_input
@@ -1,21 +1,85 @@
+import io
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import get_context
+from typing import Iterable, Iterator, Optional, Tuple
+
 import pdfplumber
-import pytesseract
-from PIL import Image
 
+from logic.metrics import span
+from logic.ocr import ocr_image
 
-def extract_text_from_pdf(pdf_file):     # sourcery skip: use-named-expression
+# Bump when extraction output changes so cached text is not reused.
+EXTRACTOR_VERSION = "2"
 
-    text = ""
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text.strip()
+PDF_WORKERS = int(os.environ.get("EDUMATE_PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+# Below this many pages, spinning up worker processes costs more than it saves.
+PARALLEL_MIN_PAGES = int(os.environ.get("EDUMATE_PDF_PARALLEL_MIN_PAGES", "40"))
 
+_worker_pdf = None
+
+
+def _read_bytes(pdf_file) -> bytes:
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def _init_pdf_worker(data: bytes):
+    # Each worker parses the document once and then serves pages from it.
+    global _worker_pdf
+    _worker_pdf = pdfplumber.open(io.BytesIO(data))
+
+
+def _extract_page(pdf, page_no: int) -> Tuple[int, str]:
+    page = pdf.pages[page_no - 1]
+    text = page.extract_text() or ""
+    # Drop the parsed layout objects so only in-flight pages stay resident.
+    page.close()
+    return page_no, text
 
-def extract_text_from_image(image_file):
 
-    image = Image.open(image_file)
-    text = pytesseract.image_to_string(image)
-    return text.strip()
+def _extract_worker_page(page_no: int) -> Tuple[int, str]:
+    return _extract_page(_worker_pdf, page_no)
+
+
+def iter_pdf_pages(pdf_file, pages: Optional[Iterable[int]] = None, workers: int = PDF_WORKERS) -> Iterator[Tuple[int, str]]:
+    # Yields (page_no, text) as pages finish; page numbers are 1-based and
+    # pages may complete out of order when workers > 1.
+    data = _read_bytes(pdf_file)
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        page_numbers = list(pages) if pages is not None else list(range(1, len(pdf.pages) + 1))
+        if workers <= 1 or len(page_numbers) < PARALLEL_MIN_PAGES:
+            for page_no in page_numbers:
+                yield _extract_page(pdf, page_no)
+            return
+
+    # spawn, not fork: the app process may already hold torch/OpenMP threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_pdf_worker, initargs=(data,)) as pool:
+        remaining = iter(page_numbers)
+        in_flight = {pool.submit(_extract_worker_page, n) for n in islice(remaining, workers * 2)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_page = next(remaining, None)
+                if next_page is not None:
+                    in_flight.add(pool.submit(_extract_worker_page, next_page))
+
+
+@span("extract.pdf")
+def extract_text_from_pdf(pdf_file, pages: Optional[Iterable[int]] = None, workers: int = PDF_WORKERS):
+    page_texts = sorted(iter_pdf_pages(pdf_file, pages, workers))
+    return "\n".join(text for _, text in page_texts if text).strip()
+
+
+@span("extract.image")
+def extract_text_from_image(image_file):
+    return ocr_image(image_file)
@@ -0,0 +1,12 @@
+import pytest
+
+from logic import chat_history
+from logic.chat_history import ChatHistory
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.db")
+    monkeypatch.setattr(chat_history, "DB_PATH", path)
+    ChatHistory.init_db()
+    return path
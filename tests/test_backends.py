@@ -0,0 +1,61 @@
+import pytest
+
+from logic import backends
+from logic.backends import token_f1
+
+
+class Pipe:
+    def __init__(self, name, answers=None):
+        self.name = name
+        self.answers = answers
+
+    def __call__(self, question=None, context=None, **kwargs):
+        return {"answer": self.answers.pop(0) if self.answers else context.split(".")[0]}
+
+
+@pytest.fixture(autouse=True)
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(backends, "ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setattr(backends, "_torch_pipeline", lambda task, model, device=-1, dtype="float32": Pipe("fp32"))
+
+
+def test_token_f1():
+    assert token_f1("Chinua Achebe", "chinua achebe") == 1.0
+    assert token_f1("Achebe", "Chinua Achebe") == pytest.approx(2 / 3)
+    assert token_f1("Accra", "Kumasi") == 0.0
+    assert token_f1("", "") == 1.0
+
+
+def test_a_backend_that_matches_fp32_is_served_and_its_report_cached(monkeypatch):
+    monkeypatch.setattr(backends, "_build", lambda task, model, backend: Pipe("int8"))
+    assert backends.build_pipeline("question-answering", "m", backend="int8").name == "int8"
+
+    def rebuilt(*args, **kwargs):
+        raise AssertionError("accuracy was re-checked")
+
+    monkeypatch.setattr(backends, "check_accuracy", rebuilt)
+    assert backends.build_pipeline("question-answering", "m", backend="int8").name == "int8"
+
+
+def test_a_backend_that_drifts_falls_back_to_fp32(monkeypatch):
+    wrong = ["nothing"] * len(backends.ACCURACY_FIXTURES["question-answering"])
+    monkeypatch.setattr(backends, "_build", lambda task, model, backend: Pipe("int8", answers=list(wrong)))
+    assert backends.build_pipeline("question-answering", "m", backend="int8").name == "fp32"
+
+
+def test_a_stricter_threshold_invalidates_the_cached_verdict(monkeypatch):
+    monkeypatch.setattr(backends, "_build", lambda task, model, backend: Pipe("int8"))
+    backends.build_pipeline("question-answering", "m", backend="int8")
+    monkeypatch.setattr(backends, "ACCURACY_THRESHOLD", 0.99)
+    assert backends._cached_report("question-answering", "m", "int8") is None
+
+
+def test_gpu_and_torch_always_use_fp32(monkeypatch):
+    monkeypatch.setattr(backends, "_build", lambda *args: pytest.fail("built a CPU backend"))
+    assert backends.build_pipeline("question-answering", "m", device=0, backend="int8").name == "fp32"
+    assert backends.build_pipeline("question-answering", "m", backend="torch").name == "fp32"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown inference backend"):
+        backends._build("question-answering", "m", "tpu")
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from logic.batching import BatchedPipeline
+
+
+class EchoPipeline:
+    # Shaped like question-answering: one input gives a bare dict.
+    task = "question-answering"
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, list):
+            return [{"echo": item} for item in inputs]
+        return {"echo": inputs}
+
+
+class Text2TextPipeline:
+    # Shaped like text2text-generation and summarization: every input gives
+    # a list of candidates, flattened for a list input with one sequence each.
+    task = "text2text-generation"
+
+    def __call__(self, inputs, num_return_sequences=1, **kwargs):
+        def generate(text):
+            return [{"generated_text": f"{text}-{i}"} for i in range(num_return_sequences)]
+
+        if isinstance(inputs, list):
+            outputs = [generate(text) for text in inputs]
+            return [output[0] for output in outputs] if num_return_sequences == 1 else outputs
+        return generate(inputs)
+
+
+def call_with_timeout(fn, timeout=5.0):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn()
+        except Exception as e:  # surfaced to the test below
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call blocked after close()"
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def test_batches_calls():
+    pipe = BatchedPipeline(EchoPipeline(), max_wait_ms=1)
+    assert pipe("a") == {"echo": "a"}
+    assert pipe(["b", "c"]) == [{"echo": "b"}, {"echo": "c"}]
+    pipe.close()
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"num_return_sequences": 2}])
+@pytest.mark.parametrize("inputs", ["a", ["b"], ["c", "d"]])
+def test_returns_what_the_wrapped_pipeline_returns(inputs, kwargs):
+    raw = Text2TextPipeline()
+    pipe = BatchedPipeline(raw, max_wait_ms=1)
+    assert pipe(inputs, **kwargs) == raw(inputs, **kwargs)
+    pipe.close()
+
+
+def test_call_after_close_does_not_block():
+    pipe = BatchedPipeline(EchoPipeline(), max_wait_ms=1)
+    pipe.close()
+    pipe._worker.join(5)
+    assert call_with_timeout(lambda: pipe("late")) == {"echo": "late"}
+    assert call_with_timeout(lambda: pipe(["x", "y"])) == [{"echo": "x"}, {"echo": "y"}]
+
+
+def test_close_fails_requests_stranded_behind_stop():
+    pipe = BatchedPipeline(EchoPipeline(), max_wait_ms=1)
+    pipe.close()
+    pipe._worker.join(5)
+    # A request that slipped in behind the stop marker is failed, not hung.
+    from logic.batching import _Request
+
+    request = _Request("stranded", {})
+    pipe._queue.put(request)
+    pipe._fail_pending()
+    with pytest.raises(RuntimeError):
+        request.future.result(timeout=1)
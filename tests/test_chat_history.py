@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+
+from logic.chat_history import ChatHistory
+
+
+def test_version_moves_on_own_writes(db):
+    before = ChatHistory.version()
+    ChatHistory.save_chat({"title": "t", "question": "q", "answer": "a"})
+    assert ChatHistory.version() != before
+
+
+def test_version_moves_on_writes_from_another_process(db):
+    before = ChatHistory.version()
+    assert ChatHistory.version() == before
+    other = sqlite3.connect(db)
+    with other:
+        other.execute(
+            "INSERT INTO chats (id, title, question, answer, created_at, updated_at) VALUES ('x', 't', 'q', 'a', '', '')"
+        )
+    other.close()
+    assert ChatHistory.version() != before
+
+
+# --- Pooled connections ---
+def test_connections_are_pooled_in_wal_mode(db):
+    with ChatHistory.connection() as first:
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with ChatHistory.connection() as second:
+        assert second is first
+
+
+def test_uncommitted_work_is_rolled_back_on_return(db):
+    with ChatHistory.connection() as conn:
+        conn.execute(
+            "INSERT INTO chats (id, title, question, answer, created_at, updated_at) VALUES ('x', 't', 'q', 'a', '', '')"
+        )
+    with ChatHistory.connection() as conn:
+        assert not conn.in_transaction
+    assert ChatHistory.get_chat("x") is None
+
+
+def test_concurrent_writers_all_land(db):
+    def save(n):
+        ChatHistory.save_chat({"title": f"t{n}", "question": "q", "answer": "a"})
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ChatHistory.load_history()) == 20
+
+
+# --- Keyset pagination ---
+def save_listing(chats):
+    ChatHistory.save_chats(
+        [
+            {"id": chat_id, "title": chat_id, "question": "q", "answer": "a", "pinned": pinned, "created_at": created_at}
+            for chat_id, pinned, created_at in chats
+        ]
+    )
+
+
+def walk(limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor = ChatHistory.load_page(limit=limit, after=cursor)
+        pages.append([chat["id"] for chat in page])
+        if cursor is None:
+            return pages
+
+
+def test_pages_list_pinned_first_then_newest(db):
+    save_listing([("a", False, "2024-01-01"), ("b", True, "2023-01-01"), ("c", False, "2024-06-01"), ("d", True, "2024-02-01")])
+    assert walk(limit=2) == [["d", "b"], ["c", "a"]]
+
+
+def test_an_exactly_full_last_page_ends_the_walk(db):
+    save_listing([(f"c{n}", False, f"2024-01-{n + 1:02d}") for n in range(4)])
+    page, cursor = ChatHistory.load_page(limit=2)
+    page, cursor = ChatHistory.load_page(limit=2, after=cursor)
+    assert [chat["id"] for chat in page] == ["c1", "c0"] and cursor is None
+    assert ChatHistory.load_page(limit=4)[1] is None
+    assert ChatHistory.load_page(limit=3)[1] is not None
+
+
+def test_ties_on_created_at_are_split_by_id_without_gaps_or_repeats(db):
+    save_listing([(f"c{n}", False, "2024-01-01") for n in range(7)])
+    pages = walk(limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == [f"c{n}" for n in reversed(range(7))]
+
+
+def test_rows_added_ahead_of_a_cursor_do_not_shift_later_pages(db):
+    save_listing([(f"c{n}", False, f"2024-01-{n + 1:02d}") for n in range(4)])
+    first, cursor = ChatHistory.load_page(limit=2)
+    save_listing([("new", False, "2025-01-01")])
+    second, _ = ChatHistory.load_page(limit=2, after=cursor)
+    assert [chat["id"] for chat in first + second] == ["c3", "c2", "c1", "c0"]
+
+
+# --- Full-text search ---
+def found(query):
+    return [chat["id"] for chat in ChatHistory.search(query)]
+
+
+def test_search_matches_prefixes_across_fields(db):
+    ChatHistory.save_chats([
+        {"id": "bio", "title": "Biology", "question": "What is photosynthesis?", "answer": "Plants make sugar."},
+        {"id": "math", "title": "Algebra", "question": "Solve x", "answer": "x is two"},
+    ])
+    assert found("photo") == ["bio"]
+    assert found("plants sugar") == ["bio"]
+    assert found("algebra photosynthesis") == []
+    assert found("?!") == []
+
+
+def test_search_follows_edits(db):
+    ChatHistory.save_chat({"id": "c", "title": "Old title", "question": "q", "answer": "a"})
+    ChatHistory.update_title("c", "Volcanoes")
+    assert found("volcano") == ["c"]
+    assert found("old") == []
+    ChatHistory.update_chat("c", answer="magma rises")
+    assert found("magma") == ["c"]
+
+
+def test_search_forgets_deleted_chats(db):
+    ChatHistory.save_chats([
+        {"id": "keep", "title": "Rivers", "question": "q", "answer": "a"},
+        {"id": "gone", "title": "Rivers too", "question": "q", "answer": "a"},
+    ])
+    ChatHistory.delete_chat("gone")
+    assert found("rivers") == ["keep"]
+    with ChatHistory.connection() as conn:
+        # Raises if the index disagrees with the chats table.
+        conn.execute("INSERT INTO chats_fts(chats_fts, rank) VALUES ('integrity-check', 1)")
+
+
+# --- Threaded turns ---
+def test_turns_append_after_the_opening_pair(db):
+    ChatHistory.save_chat({"id": "t", "title": "Cells", "question": "What is a cell?", "answer": "A unit of life."})
+    assert ChatHistory.append_messages("t", [("user", "And a nucleus?"), ("assistant", "Its control centre.")]) == 2
+    assert ChatHistory.append_messages("t", [("user", "Thanks")]) == 3
+
+    turns = ChatHistory.last_messages("t")
+    assert [(turn["seq"], turn["role"], turn["content"]) for turn in turns] == [
+        (0, "user", "What is a cell?"),
+        (0, "assistant", "A unit of life."),
+        (1, "user", "And a nucleus?"),
+        (2, "assistant", "Its control centre."),
+        (3, "user", "Thanks"),
+    ]
+
+
+def test_last_messages_keeps_only_the_newest(db):
+    ChatHistory.save_chat({"id": "t", "title": "Cells", "question": "q", "answer": "a"})
+    ChatHistory.append_messages("t", [("user", f"m{n}") for n in range(1, 6)])
+    assert [turn["content"] for turn in ChatHistory.last_messages("t", n=3)] == ["m3", "m4", "m5"]
+    assert [turn["content"] for turn in ChatHistory.last_messages("t", n=6)] == ["a", "m1", "m2", "m3", "m4", "m5"]
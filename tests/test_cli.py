@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize(
+    "command", [["logic.retention", "--db", "other.db", "report"], ["logic.history_io", "--db", "other.db", "export", "out.jsonl"]]
+)
+def test_db_flag_leaves_the_default_database_alone(tmp_path, command):
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    subprocess.run([sys.executable, "-m", *command], cwd=tmp_path, env=env, check=True, capture_output=True)
+    assert (tmp_path / "other.db").exists()
+    assert not (tmp_path / "data" / "history.db").exists()
@@ -0,0 +1,69 @@
+from benchmarks.stubs import StubTokenizer
+from logic.context import RESERVED_TOKENS, ContextAssembler, get_assembler
+
+
+def turn(seq, role, content, thread_id="t"):
+    return {"thread_id": thread_id, "seq": seq, "role": role, "content": content}
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_everything_fits_in_conversation_order():
+    assembler = ContextAssembler(StubTokenizer(), budget=RESERVED_TOKENS + 100)
+    turns = [turn(0, "user", "What is a cell?"), turn(0, "assistant", "A unit of life."), turn(1, "user", "Nucleus?")]
+    context = assembler.assemble("Why?", turns, ["Cells divide."])
+    assert context.split("\n") == [
+        "Student: What is a cell?", "EduMate: A unit of life.", "Student: Nucleus?", "Cells divide.",
+    ]
+
+
+def test_newest_turns_are_kept_when_over_budget():
+    tokenizer = StubTokenizer()
+    assembler = ContextAssembler(tokenizer, budget=RESERVED_TOKENS + 1 + 25)
+    turns = [turn(n, "user", words(f"t{n}w", 9)) for n in range(1, 5)]  # ten tokens each, with the label
+    context = assembler.assemble("question", turns)
+    assert len(tokenizer(context)["input_ids"]) <= 25
+    lines = context.split("\n")
+    assert lines[-2:] == [f"Student: {words('t3w', 9)}", f"Student: {words('t4w', 9)}"]
+    # The turn that did not fit whole is cut down, the older one dropped.
+    assert lines[0] == f"Student: {words('t2w', 4)}"
+    assert len(lines) == 3
+
+
+def test_turns_leave_room_for_passages():
+    tokenizer = StubTokenizer()
+    assembler = ContextAssembler(tokenizer, budget=RESERVED_TOKENS + 1 + 40)
+    turns = [turn(n, "user", words(f"t{n}w", 9)) for n in range(1, 6)]
+    context = assembler.assemble("question", turns, [words("p", 30)])
+    turn_lines = [line for line in context.split("\n") if line.startswith("Student:")]
+    assert len(tokenizer("\n".join(turn_lines))["input_ids"]) <= 20
+    assert context.split("\n")[-1] == words("p", 20)
+
+
+def test_follow_ups_only_tokenize_new_turns():
+    assembler = ContextAssembler(StubTokenizer(), budget=1024)
+    turns = [turn(0, "user", "Opening?"), turn(0, "assistant", "Answer."), turn(1, "user", "More?")]
+    assembler.assemble("q", turns)
+    assert assembler.stats == {"hits": 0, "misses": 3}
+
+    assembler.assemble("q", turns + [turn(2, "assistant", "Sure."), turn(3, "user", "Again?")])
+    assert assembler.stats == {"hits": 3, "misses": 5}
+
+    # The opening pair is keyed by its text, so an edit is tokenized afresh.
+    turns[1] = turn(0, "assistant", "A better answer.")
+    assembler.assemble("q", turns)
+    assert assembler.stats["misses"] == 6
+
+
+def test_token_cache_is_bounded():
+    assembler = ContextAssembler(StubTokenizer(), budget=1024, cache_size=2)
+    assembler.assemble("q", [turn(n, "user", f"m{n}") for n in range(1, 6)])
+    assert len(assembler._ids) == 2
+
+
+def test_one_assembler_per_tokenizer():
+    tokenizer = StubTokenizer()
+    assert get_assembler(tokenizer) is get_assembler(tokenizer)
+    assert get_assembler(StubTokenizer()) is not get_assembler(tokenizer)
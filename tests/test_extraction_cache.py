@@ -0,0 +1,28 @@
+import os
+
+from logic.extraction_cache import ExtractionCache
+
+
+def test_failed_touch_counts_as_a_miss(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path))
+    cache.get_or_extract(b"doc", "pdf", "1", lambda: "text")
+    cache._memory.clear()
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.get_or_extract(b"doc", "pdf", "1", lambda: "fresh") == "fresh"
+    assert (cache.disk_hits, cache.misses) == (0, 2)
+
+
+def test_stats_do_not_rescan_the_disk(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path))
+    cache.get_or_extract(b"a", "pdf", "1", lambda: "x" * 10)
+    cache.get_or_extract(b"b", "pdf", "1", lambda: "y" * 5)
+
+    def scanned():
+        raise AssertionError("stats() scanned the cache directory")
+
+    monkeypatch.setattr(cache, "_disk_entries", scanned)
+    assert cache.stats()["disk_bytes"] == 15
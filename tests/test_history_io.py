@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from logic import history_io
+from logic.chat_history import ChatHistory
+
+
+@pytest.mark.parametrize("suffix", ["jsonl", "csv"])
+def test_archive_round_trips(db, tmp_path, suffix):
+    ChatHistory.save_chat({"id": "c1", "title": "t", "question": "q", "answer": "a"})
+    ChatHistory.append_messages("c1", [("user", "more"), ("assistant", "ok")])
+    ChatHistory.archive_chats(["c1"])
+    before = ChatHistory.get_chat("c1")
+
+    path = str(tmp_path / f"archive.{suffix}")
+    assert history_io.export(path, "chats_archive") == 1
+    with ChatHistory.connection() as conn, conn:
+        conn.execute("DELETE FROM chats_archive")
+    assert history_io.import_rows(path, "chats_archive") == 1
+    assert ChatHistory.get_chat("c1") == before
+    assert [turn["content"] for turn in ChatHistory.last_messages("c1")] == ["q", "a", "more", "ok"]
+
+
+@pytest.mark.parametrize("suffix", ["jsonl", "csv"])
+def test_chats_and_messages_round_trip(db, tmp_path, suffix):
+    ChatHistory.save_chats([
+        {"id": f"c{n}", "title": f"Title, {n}", "question": f"q\n{n}", "answer": "a \"quoted\"", "pinned": n == 2}
+        for n in range(5)
+    ])
+    ChatHistory.append_messages("c1", [("user", "more"), ("assistant", "ok")])
+    chats, turns = ChatHistory.load_history(), ChatHistory.last_messages("c1")
+
+    chats_path, messages_path = str(tmp_path / f"chats.{suffix}"), str(tmp_path / f"messages.{suffix}")
+    assert history_io.export(chats_path, batch_size=2) == 5
+    assert history_io.export(messages_path, "messages", batch_size=2) == 2
+    with ChatHistory.connection() as conn, conn:
+        conn.execute("DELETE FROM chats")
+        conn.execute("DELETE FROM messages")
+
+    assert history_io.import_rows(chats_path, batch_size=2) == 5
+    assert history_io.import_rows(messages_path, "messages") == 2
+    assert ChatHistory.load_history() == chats
+    assert ChatHistory.last_messages("c1") == turns
+    # The search index follows imported rows through its triggers.
+    assert len(ChatHistory.search("title")) == 5
+
+
+def test_reimport_keeps_existing_rows_unless_replacing(db, tmp_path):
+    ChatHistory.save_chat({"id": "c", "title": "Original", "question": "q", "answer": "a"})
+    path = str(tmp_path / "chats.jsonl")
+    history_io.export(path)
+    ChatHistory.update_title("c", "Edited")
+
+    assert history_io.import_rows(path) == 0
+    assert ChatHistory.get_chat("c")["title"] == "Edited"
+    assert history_io.import_rows(path, replace=True) == 1
+    assert ChatHistory.get_chat("c")["title"] == "Original"
+
+
+def legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history (id TEXT, title TEXT, question TEXT, answer TEXT, pinned INTEGER, timestamp TEXT)"
+        )
+        conn.executemany("INSERT INTO chat_history VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+
+def test_migration_resumes_from_its_checkpoint(db, tmp_path, monkeypatch):
+    source = str(tmp_path / "legacy.db")
+    # No ids, as early versions wrote them: a re-read row would be a duplicate.
+    legacy_db(source, [(None, f"t{n}", f"q{n}", f"a{n}", 0, f"2023-01-0{n + 1} 10:00:00") for n in range(5)])
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupt(self, rows):
+        raise Interrupted
+
+    with monkeypatch.context() as patch:
+        patch.setattr(history_io.Progress, "update", interrupt)
+        with pytest.raises(Interrupted):
+            history_io.migrate_legacy(source, batch_size=2)
+    assert len(ChatHistory.load_history()) == 2
+
+    assert history_io.migrate_legacy(source, batch_size=2) == {"migrated": 5, "legacy_rows": 5}
+    chats = ChatHistory.load_history()
+    assert sorted(chat["question"] for chat in chats) == [f"q{n}" for n in range(5)]
+    assert {chat["created_at"] for chat in chats} == {f"2023-01-0{n + 1}T10:00:00" for n in range(5)}
+
+    # Finished: a rerun only picks up rows added since.
+    legacy_db(source, [(None, "t5", "q5", "a5", 1, None)])
+    assert history_io.migrate_legacy(source, batch_size=2) == {"migrated": 6, "legacy_rows": 6}
+    assert len(ChatHistory.load_history()) == 6
+
+
+def test_migration_can_drop_the_legacy_table_in_place(db):
+    legacy_db(db, [("old", "t", "q", "a", 0, "2023-01-01")])
+    assert history_io.migrate_legacy(db, drop_legacy=True) == {"migrated": 1, "legacy_rows": 1}
+    assert ChatHistory.get_chat("old")["question"] == "q"
+    with ChatHistory.connection() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'chat_history'").fetchone() is None
@@ -0,0 +1,61 @@
+import pytest
+
+from logic import inference_cache as module
+from logic.inference_cache import InferenceCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return InferenceCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+
+
+def test_equivalent_questions_share_a_key():
+    assert cache_key("qa", "m", "Basic", "  What is  DNA? ", "") == cache_key("qa", "m", "Basic", "what is dna", "")
+    assert cache_key("qa", "m", "Basic", "What is DNA?", "") != cache_key("qa", "m", "SHS", "What is DNA?", "")
+    assert cache_key("qa", "m", "Basic", "What is DNA?", "a") != cache_key("qa", "m", "Basic", "What is DNA?", "b")
+
+
+def test_a_hit_skips_the_model(cache):
+    calls = []
+    compute = lambda: calls.append(1) or "answer"
+    assert cache.get_or_compute("qa", "m", "Basic", "q", "", compute) == "answer"
+    assert cache.get_or_compute("qa", "m", "Basic", "q?", "", compute) == "answer"
+    assert len(calls) == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put("k", "qa", "old")
+    clock.now += 59
+    assert cache.get("k") == "old"
+    clock.now += 2
+    assert cache.get("k") is None
+    cache.put("other", "qa", "x")
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_goes_first_and_only_down_to_the_budget(cache, clock):
+    cache.max_bytes = 25
+    for key in ("a", "b"):
+        cache.put(key, "qa", "x" * 10)
+        clock.now += 1
+    cache.get("a")
+    clock.now += 1
+    cache.put("c", "qa", "x" * 10)
+    assert [cache.get(key) is not None for key in ("a", "b", "c")] == [True, False, True]
+    assert cache.stats()["size_bytes"] == 20
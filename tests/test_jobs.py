@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from logic.jobs import CANCELLED, DONE, FAILED, TIMED_OUT, JobManager, QueueFull
+
+
+def wait_for(manager, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_result_is_saved_through_on_done():
+    manager = JobManager(workers=1)
+    saved = []
+    job = wait_for(manager, manager.submit(lambda job: 42, on_done=lambda job, result: saved.append(result)))
+    assert (job.status, job.result, saved) == (DONE, 42, [42])
+
+
+def test_errors_mark_the_job_failed():
+    manager = JobManager(workers=1)
+
+    def boom(job):
+        raise ValueError("bad input")
+
+    job = wait_for(manager, manager.submit(boom))
+    assert (job.status, job.error) == (FAILED, "bad input")
+
+
+def test_cancel_stops_the_job_at_its_next_check():
+    manager = JobManager(workers=1)
+    started, saved = threading.Event(), []
+
+    def work(job):
+        started.set()
+        while True:
+            job.report(message="working")
+            time.sleep(0.01)
+
+    job_id = manager.submit(work, session_id="s", on_done=lambda job, result: saved.append(result))
+    assert started.wait(5)
+    manager.cancel_session("s")
+    assert wait_for(manager, job_id).status == CANCELLED
+    assert saved == []
+
+
+def test_a_job_past_its_timeout_stops_at_its_next_check():
+    manager = JobManager(workers=1, timeout=0.05)
+
+    def work(job):
+        while True:
+            job.stream("partial")
+            time.sleep(0.01)
+
+    job = wait_for(manager, manager.submit(work))
+    assert job.status == TIMED_OUT
+    assert "Timed out" in job.error
+
+
+def test_a_job_cancelled_while_queued_never_runs():
+    manager = JobManager(workers=1)
+    release, ran = threading.Event(), []
+    blocker = manager.submit(lambda job: release.wait(5))
+    queued = manager.submit(lambda job: ran.append(1))
+    manager.cancel(queued)
+    release.set()
+    assert wait_for(manager, queued).status == CANCELLED
+    assert wait_for(manager, blocker).status == DONE
+    assert ran == []
+
+
+def test_submissions_beyond_the_pending_limit_are_refused():
+    manager = JobManager(workers=1, max_pending=2)
+    release = threading.Event()
+    for _ in range(2):
+        manager.submit(lambda job: release.wait(5))
+    with pytest.raises(QueueFull):
+        manager.submit(lambda job: None)
+    release.set()
@@ -0,0 +1,55 @@
+from benchmarks.stubs import StubSummarizer, StubTokenizer
+from logic.long_summary import input_budget, iter_token_chunks, summarize_long
+
+
+def numbered(count: int) -> str:
+    # Distinct words, eight to a line, so order and coverage are checkable.
+    words = [f"w{i}" for i in range(count)]
+    return "\n".join(" ".join(words[i:i + 8]) for i in range(0, count, 8))
+
+
+class CountingSummarizer(StubSummarizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def __call__(self, inputs, **kwargs):
+        self.calls.append(inputs if isinstance(inputs, list) else [inputs])
+        return super().__call__(inputs, **kwargs)
+
+
+def test_chunks_cover_the_text_in_order_within_the_budget():
+    text = numbered(1000)
+    chunks = list(iter_token_chunks(StubTokenizer(), text, max_tokens=100, overlap=0))
+    assert all(len(chunk.split()) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_overlapping_chunks_repeat_only_the_overlap():
+    text = numbered(250)
+    chunks = [chunk.split() for chunk in iter_token_chunks(StubTokenizer(), text, max_tokens=100, overlap=10)]
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current[:10] == previous[-10:]
+    assert sum(len(chunk) for chunk in chunks) - 10 * (len(chunks) - 1) == 250
+
+
+def test_a_document_that_fits_is_summarized_in_one_call():
+    pipe = CountingSummarizer()
+    stats = {}
+    summary = summarize_long(pipe, numbered(40), max_length=20, min_length=0, stats=stats)
+    assert summary.split() == [f"w{i}" for i in range(10)]
+    assert len(pipe.calls) == 1 and stats["chunks"] == 1 and stats["reduce_passes"] == 0
+
+
+def test_a_long_document_is_mapped_then_reduced_into_the_budget():
+    pipe = CountingSummarizer()
+    budget = input_budget(pipe.tokenizer)
+    stats = {}
+    progress = []
+    summary = summarize_long(
+        pipe, numbered(20 * budget), max_length=60, min_length=0, batch_size=4, stats=stats, progress=progress.append
+    )
+    assert stats["chunks"] > 4 and progress
+    assert all(len(text.split()) <= budget for call in pipe.calls for text in call)
+    # The final pass summarizes partial summaries that start with the first chunk's opening words.
+    assert summary.split()[0] == "w0"
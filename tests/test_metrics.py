@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from logic.metrics import Metrics, ProfileCapture
+
+
+def test_quantiles_read_bucket_bounds_capped_at_the_worst_seen():
+    metrics = Metrics()
+    for elapsed in [3] * 90 + [40] * 9 + [70]:
+        metrics.observe("stage", elapsed)
+    stats = metrics.snapshot()["stage"]
+    assert (stats["count"], stats["p50_ms"], stats["p95_ms"], stats["max_ms"]) == (100, 5, 50, 70)
+    metrics.observe("huge", 90_000)
+    assert metrics.snapshot("huge")["huge"]["p95_ms"] == 90_000
+
+
+def test_span_times_a_block_and_a_decorated_function():
+    metrics = Metrics()
+    with pytest.raises(RuntimeError):
+        with metrics.span("block"):
+            raise RuntimeError
+    decorated = metrics.span("call")(lambda: "ok")
+    assert decorated() == "ok"
+    assert {name: s["count"] for name, s in metrics.snapshot().items()} == {"block": 1, "call": 1}
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = Metrics()
+    for elapsed in (1, 4, 4000):
+        metrics.observe("x", elapsed)
+    text = metrics.to_prometheus()
+    assert 'edumate_span_seconds_bucket{span="x",le="0.001"} 1' in text
+    assert 'edumate_span_seconds_bucket{span="x",le="0.005"} 2' in text
+    assert 'edumate_span_seconds_bucket{span="x",le="+Inf"} 3' in text
+    assert 'edumate_span_seconds_count{span="x"} 3' in text
+
+
+def test_export_writes_both_formats(tmp_path):
+    metrics = Metrics()
+    metrics.observe("x", 2)
+    prom, snapshot = metrics.export(str(tmp_path))
+    assert json.load(open(snapshot))["x"]["count"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["edumate.json", "edumate.prom"]
+    assert metrics.maybe_export(str(tmp_path)) is None
+
+
+def test_cprofile_capture_writes_a_report(tmp_path):
+    capture = ProfileCapture(directory=str(tmp_path)).start()
+    sum(range(1000))
+    path = capture.stop()
+    assert path.endswith(".txt") and os.path.exists(path[:-4] + ".prof")
@@ -0,0 +1,52 @@
+import time
+
+from logic.model_registry import ModelRegistry
+
+
+class Pipe:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reuses_a_loaded_pipeline():
+    loads = []
+    registry = ModelRegistry(loader=lambda *key: loads.append(key) or Pipe())
+    first = registry.acquire("a", "qa", "m")
+    assert registry.acquire("b", "qa", "m") is first
+    assert len(loads) == 1
+    assert registry.stats()[0]["sessions"] == 2
+
+
+def test_preload_holds_the_model_until_it_idles_out():
+    registry = ModelRegistry(loader=lambda *key: Pipe(), idle_timeout=0.05)
+    registry.preload("qa", "m")
+    registry.evict(unreferenced=False)
+    assert registry.is_loaded("qa", "m")
+
+    time.sleep(0.1)
+    registry.evict(unreferenced=False)
+    assert not registry.is_loaded("qa", "m")
+
+
+
+def test_preloaded_model_frees_once_its_session_releases():
+    registry = ModelRegistry(loader=lambda *key: Pipe())
+    registry.preload("qa", "m")
+    pipe = registry.acquire("a", "qa", "m")
+    assert registry.stats()[0]["sessions"] == 1
+
+    registry.release("a")
+    registry.evict()
+    assert not registry.is_loaded("qa", "m")
+    assert pipe.closed
+
+
+def test_preload_does_not_pin_a_model_already_in_use():
+    registry = ModelRegistry(loader=lambda *key: Pipe())
+    registry.acquire("a", "qa", "m")
+    registry.preload("qa", "m")
+    registry.release("a")
+    registry.evict()
+    assert not registry.is_loaded("qa", "m")
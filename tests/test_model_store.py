@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+import pytest
+
+from logic import model_store
+from logic.model_store import WEIGHTS_FILE, check_loaded_keys, is_prepared, prepared_path
+
+Result = namedtuple("Result", "missing_keys unexpected_keys")
+
+
+class Model:
+    _tied_weights_keys = ["lm_head.weight"]
+
+
+def test_tied_weights_may_be_missing():
+    check_loaded_keys(Model(), Result(["lm_head.weight"], []), "m")
+
+
+@pytest.mark.parametrize(
+    "result", [Result(["encoder.layer.0.weight"], []), Result([], ["old_name.weight"])]
+)
+def test_any_other_mismatch_raises(result):
+    with pytest.raises(RuntimeError, match="does not match"):
+        check_loaded_keys(Model(), result, "m")
+
+
+def test_prepared_models_are_found_by_their_weights_file(tmp_path):
+    assert prepared_path("google/flan-t5-small", str(tmp_path)).endswith("google--flan-t5-small")
+    assert not is_prepared("google/flan-t5-small", str(tmp_path))
+    path = tmp_path / "google--flan-t5-small"
+    path.mkdir()
+    (path / WEIGHTS_FILE).write_bytes(b"")
+    assert is_prepared("google/flan-t5-small", str(tmp_path))
+
+
+def test_memory_report_splits_unique_from_shared(monkeypatch):
+    fields = {"Rss": 4096, "Pss": 2048, "Private_Clean": 512, "Private_Dirty": 512, "Shared_Clean": 3072}
+    monkeypatch.setattr(model_store, "_read_smaps_rollup", lambda pid: fields)
+    assert model_store.memory_report() == {"rss_mb": 4.0, "pss_mb": 2.0, "unique_mb": 1.0, "shared_mb": 3.0}
+    monkeypatch.setattr(model_store, "_read_smaps_rollup", lambda pid: None)
+    assert model_store.memory_report() is None
@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+pytest.importorskip("pytesseract")
+Image = pytest.importorskip("PIL.Image")
+
+from logic import ocr
+
+
+def test_preprocess_caps_the_long_side_and_binarizes():
+    image = Image.new("L", (4000, 1000), 200)
+    image.paste(30, (100, 100, 600, 200))
+    out = ocr.preprocess(image, max_side=2000)
+    assert out.size == (2000, 500)
+    assert out.mode == "1"
+    assert out.convert("L").getextrema() == (0, 255)
+
+
+def test_preprocess_downsamples_high_dpi_scans():
+    image = Image.new("L", (1200, 600), 255)
+    image.info["dpi"] = (600, 600)
+    assert ocr.preprocess(image, target_dpi=300, max_side=10000).size == (600, 300)
+
+
+def test_strips_overlap_and_cover_the_image():
+    strips = ocr.split_strips(Image.new("1", (100, 1000)), strip_height=300, overlap=20)
+    assert [s.height for s in strips] == [300, 300, 300, 160]
+    assert sum(s.height for s in strips) - 20 * (len(strips) - 1) == 1000
+    assert len(ocr.split_strips(Image.new("1", (100, 400)), strip_height=300)) == 1
+
+
+def test_lines_read_twice_in_the_overlap_are_dropped():
+    merged = ocr._merge_strip_texts(["one\ntwo\nthree", "two\nthree\nfour", "five"])
+    assert merged.split("\n") == ["one", "two", "three", "four", "five"]
+
+
+def test_batch_returns_one_text_per_upload_in_order(monkeypatch):
+    def png(height):
+        buffer = io.BytesIO()
+        Image.new("L", (200, height), 255).save(buffer, format="PNG")
+        buffer.seek(0)
+        return buffer
+
+    read = []
+
+    def fake_tesseract(strip, lang):
+        read.append(strip.height)
+        return f"h{strip.height}"
+
+    monkeypatch.setattr(ocr, "_ocr_strip", fake_tesseract)
+    texts = ocr.ocr_batch([png(50), png(80)], workers=4)
+    assert texts == ["h50", "h80"]
+    assert sorted(read) == [50, 80]
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("pdfplumber")
+pytest.importorskip("pytesseract")
+
+from benchmarks.suite import make_pdf
+from logic import utils
+
+PAGES = [f"page {n} line one\npage {n} line two" for n in range(1, 7)]
+
+
+@pytest.fixture
+def pdf():
+    return make_pdf(PAGES)
+
+
+def test_serial_pages_come_back_in_order(pdf):
+    pages = list(utils.iter_pdf_pages(pdf, workers=1))
+    assert [n for n, _ in pages] == list(range(1, 7))
+    assert "page 3 line two" in pages[2][1]
+
+
+def test_parallel_extraction_matches_serial(pdf, monkeypatch):
+    monkeypatch.setattr(utils, "PARALLEL_MIN_PAGES", 2)
+    parallel = list(utils.iter_pdf_pages(pdf, workers=2))
+    assert sorted(n for n, _ in parallel) == list(range(1, 7))
+    assert utils.extract_text_from_pdf(pdf, workers=2) == utils.extract_text_from_pdf(pdf, workers=1)
+
+
+def test_selected_pages_only(pdf):
+    assert [n for n, _ in utils.iter_pdf_pages(pdf, pages=[5, 2], workers=1)] == [5, 2]
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import pytest
+
+from logic.progress import ProgressStore
+
+
+def quiz(student, topic, picks, answers=None):
+    answers = answers or [0] * len(picks)
+    return ProgressStore.record_quiz(student, topic, "SHS", [f"q{i}" for i in range(len(picks))], picks, answers)
+
+
+def attempt_on(student, day, total=1, correct=1):
+    # Straight into the table, as an attempt taken on `day`.
+    with ProgressStore.connection() as conn, conn:
+        conn.execute(
+            """
+            INSERT INTO quiz_attempts (student_id, topic_key, topic, level, total, correct, day, taken_at)
+            VALUES (?, 'cells', 'Cells', 'SHS', ?, ?, ?, ?)
+            """,
+            (student, total, correct, day.isoformat(), day.isoformat()),
+        )
+
+
+def recomputed(student):
+    with ProgressStore.connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0), COALESCE(SUM(correct), 0) FROM quiz_attempts WHERE student_id = ?",
+            (student,),
+        ).fetchone()
+
+
+def test_quiz_rollups_match_the_attempts(db):
+    quiz("ama", "Cells", [0, 1, 0])
+    quiz("ama", " cells ", [0, 0])
+    quiz("ama", "Plants", [None, 2])
+    quiz("kofi", "Cells", [0])
+
+    summary = ProgressStore.summary("ama")
+    assert (summary["quizzes_taken"], summary["questions_answered"], summary["correct"]) == recomputed("ama") == (3, 7, 4)
+    assert summary["average_score"] == pytest.approx(4 / 3)
+    assert summary["accuracy"] == pytest.approx(4 / 7)
+    assert ProgressStore.topic_accuracy("ama") == [
+        {"topic": "cells", "attempts": 2, "accuracy": pytest.approx(4 / 5)},
+        {"topic": "Plants", "attempts": 1, "accuracy": 0.0},
+    ]
+    assert ProgressStore.overview() == {"students": 2, "quizzes_taken": 4, "accuracy": pytest.approx(5 / 8)}
+
+
+def test_deleting_an_attempt_takes_back_its_counts(db):
+    quiz("ama", "Cells", [0, 0])
+    plants = quiz("ama", "Plants", [0, 1])
+    with ProgressStore.connection() as conn, conn:
+        conn.execute("DELETE FROM quiz_attempts WHERE id = ?", (plants,))
+
+    summary = ProgressStore.summary("ama")
+    assert (summary["quizzes_taken"], summary["questions_answered"], summary["correct"]) == recomputed("ama") == (1, 2, 2)
+    assert [row["topic"] for row in ProgressStore.topic_accuracy("ama")] == ["Cells"]
+
+
+def test_streak_counts_consecutive_days(db):
+    today = date.today()
+    for days_ago in (5, 4, 3, 1, 0, 0):
+        attempt_on("ama", today - timedelta(days=days_ago))
+    summary = ProgressStore.summary("ama")
+    assert summary["current_streak"] == 2
+    assert summary["best_streak"] == 3
+
+
+def test_lapsed_streak_reads_as_zero(db):
+    attempt_on("ama", date.today() - timedelta(days=3))
+    attempt_on("ama", date.today() - timedelta(days=2))
+    summary = ProgressStore.summary("ama")
+    assert summary["current_streak"] == 0
+    assert summary["best_streak"] == 2
+
+
+def test_completed_steps_are_counted_once(db):
+    plan_id = ProgressStore.save_plan("ama", "Pass biology", ["Read", "Practise", "Revise"])
+    ProgressStore.set_step(plan_id, 0, True)
+    ProgressStore.set_step(plan_id, 0, True)
+    ProgressStore.set_step(plan_id, 2, True)
+    assert ProgressStore.summary("ama")["steps_completed"] == 2
+
+    ProgressStore.set_step(plan_id, 2, False)
+    assert ProgressStore.summary("ama")["steps_completed"] == 1
+    assert ProgressStore.latest_plan("ama") == (
+        plan_id,
+        [{"step": "Read", "completed": True}, {"step": "Practise", "completed": False}, {"step": "Revise", "completed": False}],
+    )
+
+    with ProgressStore.connection() as conn, conn:
+        conn.execute("DELETE FROM study_steps WHERE plan_id = ?", (plan_id,))
+    assert ProgressStore.summary("ama")["steps_completed"] == 0
+
+
+def test_unknown_student_has_empty_summary(db):
+    summary = ProgressStore.summary("nobody")
+    assert summary["quizzes_taken"] == 0 and summary["accuracy"] == 0.0
+    assert ProgressStore.latest_plan("nobody") is None
@@ -0,0 +1,87 @@
+from logic.quiz import QuizBank, generate_quiz, parse_question
+
+
+class QuizPipeline:
+    # Answers every question prompt with `blocks` in turn, then the
+    # completion prompts with a fixed answer and three distractors.
+    def __init__(self, blocks):
+        self.blocks = list(blocks)
+        self.calls = []
+
+    def __call__(self, prompts, num_return_sequences=1, **kwargs):
+        self.calls.append(list(prompts))
+        if prompts[0].startswith("Answer the question"):
+            return [[{"generated_text": "Photosynthesis"}] for _ in prompts]
+        if prompts[0].startswith("Give a wrong"):
+            return [
+                [{"generated_text": f"Wrong {i}"} for i in range(num_return_sequences)]
+                for _ in prompts
+            ]
+        return [[{"generated_text": self.blocks.pop(0) if self.blocks else ""}] for _ in prompts]
+
+
+def block(i):
+    return f"Question: What is fact number {i} about plants?\nA) Right {i}\nB) Wrong {i}\nC) Other {i}\nAnswer: A"
+
+
+def test_parse_question_reads_lines_and_inline_options():
+    assert parse_question(block(1)) == {
+        "question": "What is fact number 1 about plants?",
+        "options": ["Right 1", "Wrong 1", "Other 1"],
+        "correct": 0,
+    }
+    inline = parse_question("Q: Which gas do plants take in A) Oxygen B) Carbon dioxide C) Helium Answer: B")
+    assert inline["options"] == ["Oxygen", "Carbon dioxide", "Helium"]
+    assert inline["correct"] == 1
+
+
+def test_parse_question_keeps_a_question_without_options():
+    assert parse_question("Question: Why do leaves change colour in autumn") == {
+        "question": "Why do leaves change colour in autumn?",
+    }
+    assert parse_question("Too short") is None
+
+
+def test_generates_only_the_shortfall_and_banks_the_extras(tmp_path):
+    bank = QuizBank(str(tmp_path / "quiz.db"))
+    pipe = QuizPipeline(block(i) for i in range(10))
+    stats = {}
+
+    questions = generate_quiz(pipe, "Plants", "SHS", 2, bank=bank, stats=stats)
+
+    assert len(questions) == 2
+    assert len(pipe.calls) == 1  # one batched round
+    assert stats == {"from_bank": 0, "generated": 3, "templated": 0}
+    assert bank.count("plants", "SHS") == 3
+
+    # The oversampled extra was banked unserved, so it comes back first.
+    pipe.calls.clear()
+    again = generate_quiz(pipe, "  plants ", "SHS", 1, bank=bank, stats=stats)
+    assert not pipe.calls
+    assert stats["from_bank"] == 1
+    assert again[0]["question"] not in {q["question"] for q in questions}
+
+
+def test_questions_without_options_are_completed(tmp_path):
+    bank = QuizBank(str(tmp_path / "quiz.db"))
+    pipe = QuizPipeline(["Question: How do plants make their food"] * 2)
+
+    questions = generate_quiz(pipe, "Plants", "Basic", 1, bank=bank)
+
+    assert questions[0]["question"] == "How do plants make their food?"
+    assert set(questions[0]["options"]) == {"Photosynthesis", "Wrong 0", "Wrong 1"}
+    assert questions[0]["options"][questions[0]["correct"]] == "Photosynthesis"
+
+
+def test_templates_fill_what_the_model_could_not(tmp_path):
+    bank = QuizBank(str(tmp_path / "quiz.db"))
+    stats = {}
+    questions = generate_quiz(QuizPipeline([]), "Plants", "SHS", 2, bank=bank, rounds=2, stats=stats)
+    assert len(questions) == 2
+    assert stats == {"from_bank": 0, "generated": 0, "templated": 2}
+
+
+def test_document_quizzes_bypass_the_bank(tmp_path):
+    bank = QuizBank(str(tmp_path / "quiz.db"))
+    generate_quiz(QuizPipeline(block(i) for i in range(5)), "Plants", "SHS", 2, passages=["Leaves are green."], bank=bank)
+    assert bank.count("Plants", "SHS") == 0
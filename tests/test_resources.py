@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from benchmarks.stubs import StubMediaWiki
+from logic.resources import ResourceFetcher
+
+
+@pytest.fixture
+def wiki():
+    stub = StubMediaWiki()
+    yield stub
+    stub.close()
+
+
+def fetcher(wiki, tmp_path, sources=("wikipedia",), **kwargs):
+    return ResourceFetcher(
+        sources={name: wiki.api_url for name in sources},
+        cache_dir=str(tmp_path / "resources"),
+        **kwargs,
+    )
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_cold_topic_is_fetched_then_served_from_cache(wiki, tmp_path):
+    f = fetcher(wiki, tmp_path)
+    first = f.get("Photosynthesis")
+    assert first["wikipedia"][0] == ("Photosynthesis 1", f"{wiki.api_url.rsplit('/w/', 1)[0]}/wiki/Photosynthesis_1")
+    assert first["youtube"][0][0] == "YouTube Search"
+
+    # Same topic after normalization: no second request.
+    assert f.get("  photosynthesis ")["wikipedia"] == first["wikipedia"]
+    assert wiki.requests == 1
+    assert f.stats["miss"] == 1 and f.stats["fresh"] == 1
+
+
+def test_sources_are_queried_concurrently(wiki, tmp_path):
+    wiki.delay = 0.3
+    f = fetcher(wiki, tmp_path, sources=("wikipedia", "wikibooks"))
+    start = time.monotonic()
+    results = f.get("Cells")
+    assert time.monotonic() - start < 0.55
+    assert results["wikipedia"] and results["wikibooks"]
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(wiki, tmp_path):
+    f = fetcher(wiki, tmp_path, ttl_seconds=0)
+    f.get("Cells")
+    wiki.delay = 0.2
+    start = time.monotonic()
+    for _ in range(3):
+        assert f.get("Cells")["wikipedia"]
+    assert time.monotonic() - start < 0.2
+    assert f.stats["stale"] == 3
+    wait_for(lambda: wiki.requests == 2 and not f._refreshing)
+    time.sleep(0.1)
+    assert wiki.requests == 2
+
+
+def test_slow_source_misses_the_deadline_but_lands_in_cache(wiki, tmp_path):
+    wiki.delay = 0.3
+    f = fetcher(wiki, tmp_path, deadline=0.05)
+    assert f.get("Cells")["wikipedia"] == []
+    wait_for(lambda: not f._refreshing)
+    wiki.delay = 0
+    assert f.get("Cells")["wikipedia"]
+    assert wiki.requests == 1
@@ -0,0 +1,19 @@
+from logic import retention
+from logic.chat_history import ChatHistory
+
+OLD = "2000-01-01T00:00:00"
+
+
+def test_follow_up_keeps_an_old_chat_out_of_the_archive(db):
+    ChatHistory.save_chats([
+        {"id": "idle", "title": "t", "question": "q", "answer": "a", "created_at": OLD},
+        {"id": "active", "title": "t", "question": "q", "answer": "a", "created_at": OLD},
+    ])
+    with ChatHistory.connection() as conn, conn:
+        conn.execute("UPDATE chats SET updated_at = ?", (OLD,))
+    ChatHistory.append_messages("active", [("user", "again"), ("assistant", "sure")])
+
+    assert retention.apply_retention(max_age_days=30, max_chats=0) == {"by_age": 1, "by_count": 0}
+    assert ChatHistory.get_chat("active")["question"] == "q"
+    with ChatHistory.connection() as conn:
+        assert conn.execute("SELECT id FROM chats_archive").fetchall() == [("idle",)]
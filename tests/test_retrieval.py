@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from logic.retrieval import split_passages, tokenize
+
+TEXTS = [
+    "Photosynthesis\nLight reactions happen in the thylakoid. The Calvin cycle follows!\nNo terminator here\n\nKey terms\n- chlorophyll\n- stroma",
+    "Heading without a period\nBody line one\nBody line two.",
+    "A single line with no punctuation at all",
+    "Q? A! Then a list:\n1) first\n2) second\n",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_every_token_lands_in_a_passage(text):
+    covered = set()
+    for _, passage in split_passages(text):
+        covered.update(tokenize(passage))
+    assert set(tokenize(text)) <= covered
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_offsets_point_at_passages(text):
+    for offset, passage in split_passages(text, max_chars=40):
+        assert text[offset:offset + len(passage)] == passage
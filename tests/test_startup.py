@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from logic import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(startup, "_warmup_thread", None)
+    monkeypatch.setattr(startup, "_warmups", {})
+    monkeypatch.setattr(startup, "WARMUP", True)
+
+
+def test_import_module_records_the_first_import_only():
+    sys.modules.pop("colorsys", None)
+    module = startup.import_module("colorsys")
+    assert startup.import_module("colorsys") is module
+    assert "colorsys" in startup.startup_report()["imports_seconds"]
+
+
+def test_warm_up_runs_once_and_survives_a_failing_loader():
+    loaded = []
+
+    def broken():
+        raise OSError("offline")
+
+    thread = startup.warm_up({"bad": broken, "good": lambda: loaded.append("good")})
+    thread.join(5)
+    assert startup.warm_up({"again": lambda: loaded.append("again")}) is None
+    assert loaded == ["good"]
+    report = startup.startup_report()
+    assert report["warmup"]["bad"]["error"] == "offline"
+    assert report["warmup"]["good"]["error"] is None
+    assert "warmup_done" in report["marks_seconds"]
+
+
+def test_warm_up_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(startup, "WARMUP", False)
+    assert startup.warm_up({"model": lambda: pytest.fail("loaded")}) is None
+
+
+def test_model_modules_do_not_import_torch_or_transformers():
+    code = (
+        "import sys\n"
+        "import logic.backends, logic.model_registry, logic.model_store, logic.long_summary, logic.streaming\n"
+        "print(sorted({'torch', 'transformers'} & set(sys.modules)))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,30 @@
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+from logic import streaming
+from logic.streaming import generation_config
+
+
+class Model:
+    def __init__(self, config):
+        self.generation_config = config
+
+
+def beam_config():
+    return transformers.GenerationConfig(num_beams=4, no_repeat_ngram_size=3, length_penalty=2.0, max_length=142)
+
+
+def test_keeps_the_model_config_with_the_requested_lengths():
+    config = beam_config()
+    streamed = generation_config(Model(config), max_length=64, min_length=8)
+    assert (streamed.num_beams, streamed.max_length, streamed.min_length) == (4, 64, 8)
+    assert streamed.no_repeat_ngram_size == 3
+    assert (config.num_beams, config.max_length) == (4, 142)
+
+
+def test_greedy_streaming_is_opt_in(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_GREEDY", True)
+    streamed = generation_config(Model(beam_config()), max_length=64)
+    assert streamed.num_beams == 1
+    assert streamed.no_repeat_ngram_size == 3